@@ -1,7 +1,7 @@
 """
 Authentication utilities
 """
-from fasthtml.common import RedirectResponse
+from fasthtml.common import RedirectResponse, Response
 from config import VALID_CREDENTIALS
 
 
@@ -17,6 +17,13 @@ def require_auth(sess: dict):
     return None
 
 
+def require_auth_partial(sess: dict):
+    """Like require_auth, for HTMX partials: redirect the whole page rather than the swapped fragment"""
+    if not sess.get('authenticated'):
+        return Response("", headers={"HX-Redirect": "/"})
+    return None
+
+
 def login_user(sess: dict, email: str):
     """Set session for authenticated user"""
     sess['authenticated'] = True
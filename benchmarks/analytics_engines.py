@@ -0,0 +1,132 @@
+"""
+Benchmark and parity check: the KPI aggregation engines (db/analytics.py)
+
+Runs fetch_user_kpis_sqlite with every engine for each user and period and
+compares the result with the pandas engine, the reference implementation:
+counts and frames must match exactly, average processing time to 1e-9.
+Exits with status 1 on any mismatch. With --memory the cells show the
+peak Python/numpy allocation of each call (tracemalloc) instead of time.
+
+Usage:
+    python -m benchmarks.analytics_engines
+    python -m benchmarks.analytics_engines --db sample_users.db --users 11 12 --repeat 5
+    python -m benchmarks.analytics_engines --snapshot    # Read SNAPSHOT_PERIODS from the Parquet snapshot
+    python -m benchmarks.analytics_engines --memory      # Peak memory per engine (pandas vs stream)
+"""
+import argparse
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+import pandas as pd
+from db import sqlite_queries
+from db.analytics import ENGINES
+from config import SNAPSHOT_PERIODS
+from utils.kpis import PERIODS
+
+REFERENCE = "pandas"
+
+SCALARS = ('total_companies', 'successful_scrapes', 'success_rate', 'emergency_count', 'avg_processing_time')
+FRAMES = {'status_counts': 'Status', 'scraper_counts': 'Scraper Status', 'timeline': 'date',
+          'processing_bins': 'processing_time'}
+
+
+def differences(expected: dict, actual: dict) -> list:
+    """Names of the KPIs that differ between two fetch_user_kpis results"""
+    diffs = [name for name in SCALARS
+             if not math.isclose(expected[name], actual[name], rel_tol=1e-9, abs_tol=1e-9)]
+    for name, key in FRAMES.items():
+        a, b = expected[name], actual[name]
+        if a.empty and b.empty:
+            continue
+        # Rows with equal counts may come back in either order
+        a = a.sort_values(key).reset_index(drop=True) if not a.empty else a
+        b = b.sort_values(key).reset_index(drop=True) if not b.empty else b
+        try:
+            pd.testing.assert_frame_equal(a, b, check_dtype=False)
+        except AssertionError:
+            diffs.append(name)
+    return diffs
+
+
+def timed(repeat: int, fn, *args):
+    """Best of `repeat` runs: (result, seconds)"""
+    best, result = math.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def peak_memory(fn, *args):
+    """(result, peak bytes allocated during the call)"""
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="KPI engine benchmark and parity check")
+    parser.add_argument("--db", default=str(sqlite_queries.SAMPLE_DB_PATH), help="SQLite database to aggregate")
+    parser.add_argument("--users", type=int, nargs="+", default=[11, 12])
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--snapshot", action="store_true", help="Serve SNAPSHOT_PERIODS from the Parquet snapshot")
+    parser.add_argument("--memory", action="store_true", help="Report peak memory instead of time")
+    args = parser.parse_args()
+
+    sqlite_queries.SAMPLE_DB_PATH = Path(args.db)
+    fetch = sqlite_queries.fetch_user_kpis_sqlite
+
+    print("=" * 72)
+    print("KPI ENGINE BENCHMARK")
+    print("=" * 72)
+    print(f"Database: {args.db}{' (+ Parquet snapshot)' if args.snapshot else ''}")
+    print(f"Reference: {REFERENCE}; " + ("peak memory" if args.memory else f"best of {args.repeat} runs"))
+    print()
+    print(f"{'user':>4}  {'period':<10} {'rows':>9}  " + "  ".join(f"{engine:>10}" for engine in args.engines))
+
+    unavailable, mismatches = {}, []
+    for user_id in args.users:
+        for period, _, _, _ in PERIODS:
+            use_snapshot = args.snapshot and period in SNAPSHOT_PERIODS
+            expected = fetch(user_id, period, use_snapshot, REFERENCE)
+            cells = []
+            for engine in args.engines:
+                if engine in unavailable:
+                    cells.append(f"{'n/a':>10}")
+                    continue
+                try:
+                    if args.memory:
+                        actual, peak = peak_memory(fetch, user_id, period, use_snapshot, engine)
+                    else:
+                        actual, seconds = timed(args.repeat, fetch, user_id, period, use_snapshot, engine)
+                except Exception as e:  # e.g. duckdb not installed, or its sqlite extension not downloadable
+                    unavailable[engine] = e
+                    cells.append(f"{'n/a':>10}")
+                    continue
+                diffs = differences(expected, actual)
+                if diffs:
+                    mismatches.append((user_id, period, engine, diffs))
+                cell = f"{peak / (1024 * 1024):>8.1f}MB" if args.memory else f"{seconds * 1000:>8.1f}ms"
+                cells.append(cell + ("!" if diffs else " "))
+            print(f"{user_id:>4}  {period:<10} {expected['total_companies']:>9,}  " + "  ".join(cells))
+
+    print()
+    for engine, error in unavailable.items():
+        print(f"[SKIP] {engine}: {error}")
+    for user_id, period, engine, diffs in mismatches:
+        print(f"[DIFF] user {user_id} {period} {engine}: {', '.join(diffs)}")
+    if mismatches:
+        sys.exit(1)
+    print(f"[OK] All engines match {REFERENCE}")
+
+
+if __name__ == "__main__":
+    main()
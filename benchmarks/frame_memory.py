@@ -0,0 +1,71 @@
+"""
+Benchmark: memory of a user's DataFrame with driver dtypes vs compact dtypes
+
+Loads the same rows twice from a SQLite database, once as pd.read_sql_query
+returns them (every column a Python object) and once through
+utils.frames.read_frame, and prints the deep memory per column.
+
+Usage:
+    python -m benchmarks.frame_memory
+    python -m benchmarks.frame_memory --db sample_users.db --user-id 12
+    python -m benchmarks.frame_memory --all-columns   # Include ticker_eod, recycled_datetime_task and id
+"""
+import argparse
+import sqlite3
+import time
+import pandas as pd
+from config import DEFAULT_USER_ID
+from db.sqlite_queries import SAMPLE_DB_PATH
+from utils.frames import USER_DATA_COLUMNS, read_frame, frame_memory
+
+ALL_COLUMNS = USER_DATA_COLUMNS + ('ticker_eod', 'recycled_datetime_task', 'id')
+
+
+def mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="DataFrame memory benchmark")
+    parser.add_argument("--db", default=str(SAMPLE_DB_PATH))
+    parser.add_argument("--user-id", type=int, default=DEFAULT_USER_ID)
+    parser.add_argument("--all-columns", action="store_true", help="Compact all ten columns, not only the shown ones")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    query = "SELECT {} FROM url_status_company WHERE user_id = ?"
+
+    # Before: all ten columns, as the driver returns them
+    start = time.perf_counter()
+    before = pd.read_sql_query(query.format(", ".join(ALL_COLUMNS)), conn, params=(args.user_id,))
+    before_time = time.perf_counter() - start
+
+    columns = ALL_COLUMNS if args.all_columns else USER_DATA_COLUMNS
+    start = time.perf_counter()
+    after = read_frame('benchmark', query.format(", ".join(columns)), conn, params=(args.user_id,))
+    after_time = time.perf_counter() - start
+    conn.close()
+
+    before_sizes, after_sizes = frame_memory(before), frame_memory(after)
+
+    print("=" * 72)
+    print("DATAFRAME MEMORY BENCHMARK")
+    print("=" * 72)
+    print(f"Database: {args.db}, user {args.user_id}, {len(before):,} rows")
+    print()
+    print(f"{'column':<24} {'driver dtype':<14} {'size':>10}   {'compact dtype':<16} {'size':>10}")
+    for column in ALL_COLUMNS:
+        compact = (str(after[column].dtype), mb(after_sizes[column])) if column in after_sizes else ("(skipped)", "-")
+        print(f"{column:<24} {str(before[column].dtype):<14} {mb(before_sizes[column]):>10}   "
+              f"{compact[0]:<16} {compact[1]:>10}")
+    print()
+    total_before, total_after = sum(before_sizes.values()), sum(after_sizes.values())
+    print(f"Total: {mb(total_before)} -> {mb(total_after)} "
+          f"({(1 - total_after / max(total_before, 1)) * 100:.0f}% less; "
+          f"{total_before / max(len(before), 1):.0f} -> {total_after / max(len(after), 1):.0f} bytes per row)")
+    print(f"Load time: {before_time * 1000:.0f} ms -> {after_time * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
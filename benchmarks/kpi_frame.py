@@ -0,0 +1,133 @@
+"""
+Benchmark: the single-pass KPI computation (utils/kpi_frame.py) against the
+original dashboard code, over rows from generate_bulk_data.py
+
+The legacy version is the computation the dashboard used to run on the
+full user frame: df.copy(), the period filter, a scan per metric, two
+value_counts, a date column with a groupby, and a full sort for the
+latest entries. Both run on the same compact frame; results are checked
+to agree before the timings are printed.
+
+CSV files are generated on first use into --data-dir (as user_<rows>, the
+user id being the row count) and reused afterwards; 5M rows take a few
+minutes to generate.
+
+Usage:
+    python -m benchmarks.kpi_frame
+    python -m benchmarks.kpi_frame --rows 100000 1000000 --periods overall monthly --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import math
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import generate_bulk_data
+from config import MAX_PROCESSING_TIME
+from utils.frames import compact_frame
+from utils.kpis import get_period_cutoff, build_kpi_result
+from utils.kpi_frame import KPI_COLUMNS, KpiAccumulator
+
+LATEST = 20
+
+
+def load_rows(data_dir: Path, rows: int) -> pd.DataFrame:
+    """The generated CSV with `rows` rows as a compact frame (generated if missing)"""
+    generate_bulk_data.OUTPUT_DIR = data_dir
+    path = data_dir / f"user_{rows}_data.csv"
+    if not path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        print(f"Generating {rows:,} rows into {path}...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_bulk_data.generate_csv_for_user(rows, rows)
+    df = compact_frame(pd.read_csv(path, usecols=KPI_COLUMNS + ['linkedin_url']))
+    df['id'] = np.arange(1, len(df) + 1)
+    return df
+
+
+def legacy_kpis(df: pd.DataFrame, cutoff) -> dict:
+    """The original linkedin_dashboard computation"""
+    df_filtered = df.copy()
+    if cutoff is not None:
+        df_filtered = df_filtered[df_filtered['compute_datetime'] >= cutoff]
+
+    total_companies = len(df_filtered)
+    successful_scrapes = len(df_filtered[df_filtered['status'] == 'done'])
+    emergency_count = len(df_filtered[df_filtered['emergency'] == True])  # noqa: E712
+
+    df_filtered['processing_time'] = \
+        (df_filtered['last_update'] - df_filtered['compute_datetime']).dt.total_seconds() / 3600
+    df_valid_time = df_filtered[(df_filtered['processing_time'] > 0) &
+                                (df_filtered['processing_time'] <= MAX_PROCESSING_TIME)]
+    avg_processing_time = df_valid_time['processing_time'].mean() if len(df_valid_time) > 0 else 0
+
+    status_counts = df_filtered['status'].value_counts().reset_index()
+    scraper_counts = df_filtered['scraper_status'].value_counts().reset_index()
+    df_filtered['date'] = df_filtered['compute_datetime'].dt.date
+    daily_activity = df_filtered.groupby('date').size().reset_index(name='Count')
+    latest_df = df_filtered.sort_values(by='compute_datetime', ascending=False).head(LATEST)
+
+    return {'total_companies': total_companies, 'successful_scrapes': successful_scrapes,
+            'emergency_count': emergency_count, 'avg_processing_time': avg_processing_time,
+            'status_counts': status_counts, 'scraper_counts': scraper_counts,
+            'days': len(daily_activity), 'latest': latest_df}
+
+
+def single_pass_kpis(df: pd.DataFrame, cutoff) -> dict:
+    """The same figures from one KpiAccumulator pass"""
+    accumulator = KpiAccumulator(latest=LATEST).update(df, cutoff)
+    kpis = build_kpi_result(accumulator.rows())
+    kpis['days'] = len(kpis['timeline'])
+    kpis['latest'] = accumulator.latest()
+    return kpis
+
+
+def check_agree(legacy: dict, single: dict):
+    for name in ('total_companies', 'successful_scrapes', 'emergency_count', 'days'):
+        assert legacy[name] == single[name], (name, legacy[name], single[name])
+    assert math.isclose(legacy['avg_processing_time'], single['avg_processing_time'], rel_tol=1e-9)
+    for name in ('status_counts', 'scraper_counts'):
+        assert dict(legacy[name].itertuples(index=False)) == dict(single[name].itertuples(index=False)), name
+    # Ties on compute_datetime may be ordered differently, the timestamps may not
+    assert list(legacy['latest']['compute_datetime']) == list(single['latest']['compute_datetime'])
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Single-pass KPI computation benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--periods", nargs="+", default=["overall", "yearly", "monthly"])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--data-dir", default=str(generate_bulk_data.OUTPUT_DIR / "benchmark"))
+    args = parser.parse_args()
+
+    frames = {rows: load_rows(Path(args.data_dir), rows) for rows in args.rows}
+
+    print("=" * 60)
+    print("KPI COMPUTATION BENCHMARK")
+    print("=" * 60)
+    print(f"Best of {args.repeat} runs; both versions on the same compact frame")
+    print()
+    print(f"{'rows':>10}  {'period':<10} {'legacy':>10} {'single pass':>12} {'speedup':>8}")
+    for rows, df in frames.items():
+        for period in args.periods:
+            cutoff = get_period_cutoff(period)
+            check_agree(legacy_kpis(df, cutoff), single_pass_kpis(df, cutoff))
+            legacy = best_of(args.repeat, legacy_kpis, df, cutoff)
+            single = best_of(args.repeat, single_pass_kpis, df, cutoff)
+            print(f"{rows:>10,}  {period:<10} {legacy * 1000:>8.1f}ms {single * 1000:>10.1f}ms {legacy / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Benchmark: the dashboard and system-health routes end to end, and the bulk loader
+
+Builds a deterministic SQLite database with generate_bulk_data.py and
+load_bulk_data.py (the same seed gives the same rows, relative to today),
+timing the CSV generation and the load (rows per second) separately, then calls the route handlers in-process through Starlette's TestClient,
+logged in, on the SQLite backend. For every route and period it reports
+p50/p95/p99 latency, the time spent in SQL statements against the rest
+(rendering), the response size and the peak memory allocated while
+serving one request, and writes the results to a JSON file that can be
+compared with an earlier run (--compare). Section and Latest Entries
+requests carry HX-Request, so they return the partial htmx swaps in.
+
+Caches are cleared before every request unless --warm is given, so the
+default numbers are the cold path. DB time is the sql entry of the
+response's Server-Timing header: the summed duration of the request's
+statements, so statements the handler runs in parallel add up and it
+can exceed the latency. Peak memory comes from a separate tracemalloc
+pass (one more request per route, untimed, since tracing slows Python
+down); it counts Python and NumPy allocations, not Arrow's own buffers.
+
+Usage:
+    python -m benchmarks.routes
+    python -m benchmarks.routes --rows 1000000 --requests 50 --periods overall monthly
+    python -m benchmarks.routes --db /tmp/bench_routes.db    # Build once, reuse on later runs
+    python -m benchmarks.routes --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import config
+import generate_bulk_data
+import load_bulk_data
+from db import async_queries, sqlite_queries
+from utils.cache import disable_shared_cache, invalidate_all
+from utils.kpis import PERIODS
+
+CHARTS = ("status", "scraper", "timeline", "processing_time")
+CONFIG_FLAGS = ('ANALYTICS_ENGINE', 'USE_DAILY_ROLLUP', 'USE_PARQUET_SNAPSHOT', 'USE_SYSTEM_COUNTERS',
+                'SYSTEM_STATS_APPROXIMATE', 'DASHBOARD_LAZY_SECTIONS', 'CHART_RENDER_MODE')
+HTMX_HEADERS = {'HX-Request': 'true'}
+_SQL_TIMING = re.compile(r"(?:^|,)\s*sql;dur=([0-9.]+)")
+
+
+class _PinnedDatetime(datetime):
+    """datetime whose now() is fixed, so generate_bulk_data's rows depend on the seed alone"""
+    pinned = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.pinned
+
+
+def build_database(path: Path, rows: int, health_rows: int, seed: int) -> dict:
+    """
+    Generate the CSVs for the dashboard and health check users and load them into a new database at path
+    Returns the seconds each step took and the loader's rows per second
+    """
+    _PinnedDatetime.pinned = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with tempfile.TemporaryDirectory() as csv_dir, contextlib.redirect_stdout(io.StringIO()):
+        generate_bulk_data.OUTPUT_DIR = Path(csv_dir)
+        generate_bulk_data.datetime = _PinnedDatetime
+        start = time.perf_counter()
+        for user_id, count in ((config.DEFAULT_USER_ID, rows), (config.HEALTH_CHECK_USER_ID, health_rows)):
+            random.seed(f"{seed}:{user_id}")
+            generate_bulk_data.generate_csv_for_user(user_id, count)
+        generated = time.perf_counter()
+        load_bulk_data.DB_FILE = str(path)
+        load_bulk_data.CSV_DIR = Path(csv_dir)
+        load_bulk_data.main()
+        loaded = time.perf_counter()
+    return {
+        'generate_s': round(generated - start, 3),
+        'load_s': round(loaded - generated, 3),
+        'load_rows_per_s': round((rows + health_rows) / (loaded - generated)) if loaded > generated else None,
+    }
+
+
+def count_rows(path: Path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM url_status_company").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def use_database(path: Path):
+    """Point the app at the SQLite database; in-process caches only"""
+    sqlite_queries.SAMPLE_DB_PATH = path
+    async_queries.DB_BACKEND = "sqlite"
+    # Keep a running server's shared cache out of it (and its results out of the measurements)
+    disable_shared_cache()
+
+
+def route_urls(periods: list) -> list:
+    """(route, period, url, headers) for every route measured"""
+    from routes.linkedin_routes import DASHBOARD_SECTIONS
+    urls = []
+    for period in periods:
+        urls.append(("dashboard", period, f"/linkedin/dashboard?period={period}", None))
+        urls.extend((f"section/{name}", period, f"/linkedin/dashboard/section/{name}?period={period}", HTMX_HEADERS)
+                    for name in DASHBOARD_SECTIONS)
+        urls.append(("latest-entries", period, f"/linkedin/latest-entries?period={period}", HTMX_HEADERS))
+        urls.extend((f"charts/{name}", period, f"/linkedin/charts/{name}?period={period}", None) for name in CHARTS)
+    urls.append(("system-health", None, "/system-health", None))
+    return urls
+
+
+def sql_ms(response) -> float:
+    """Time the request spent in SQL statements, from its Server-Timing header"""
+    match = _SQL_TIMING.search(response.headers.get("server-timing", ""))
+    return float(match.group(1)) if match else 0.0
+
+
+def peak_alloc_mb(client, url: str, headers: dict, warm: bool) -> float:
+    """Peak memory traced while serving one more request of url"""
+    if not warm:
+        invalidate_all()
+    tracemalloc.start()
+    try:
+        client.get(url, headers=headers)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def measure(client, url: str, headers: dict, requests: int, warm: bool) -> dict:
+    """Latency percentiles, DB/render split, response size and peak allocation of `requests` GETs of url"""
+    if warm:
+        client.get(url, headers=headers)
+    latencies, db_times, statuses, size = [], [], set(), 0
+    for _ in range(requests):
+        if not warm:
+            invalidate_all()
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        db_times.append(sql_ms(response))
+        statuses.add(response.status_code)
+        size = len(response.content)
+
+    latencies, db_times = np.array(latencies) * 1000, np.array(db_times)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'status': sorted(statuses),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'db_ms': round(float(db_times.mean()), 2),
+        'render_ms': round(float(np.maximum(latencies - db_times, 0).mean()), 2),
+        'response_bytes': size,
+        'peak_alloc_mb': round(peak_alloc_mb(client, url, headers, warm), 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results: list, baseline_path: str):
+    """p50/p95 and peak allocation of this run against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = {(r['route'], r['period']): r for r in json.load(f)['results']}
+    print()
+    print(f"Compared with {baseline_path}:")
+    print(f"{'route':<22} {'period':<10} {'p50':>10} {'change':>8} {'p95':>10} {'change':>8} "
+          f"{'alloc':>10} {'change':>8}")
+    for result in results:
+        before = baseline.get((result['route'], result['period']))
+        if before is None:
+            continue
+        cells = []
+        for name, unit in (('p50_ms', 'ms'), ('p95_ms', 'ms'), ('peak_alloc_mb', 'MB')):
+            if name not in before:
+                continue  # Results files from before the column existed
+            change = (result[name] / before[name] - 1) * 100 if before[name] else 0.0
+            cells.append(f"{result[name]:>8.1f}{unit} {change:>+7.1f}%")
+        print(f"{result['route']:<22} {result['period'] or '-':<10} " + " ".join(cells))
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Route latency, memory and response size benchmark")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows for the dashboard user")
+    parser.add_argument("--health-rows", type=int, default=5_000, help="Rows for the health check user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="Database to use; built here first if it does not exist (default: a temp file)")
+    parser.add_argument("--periods", nargs="+", choices=[p[0] for p in PERIODS], default=[p[0] for p in PERIODS])
+    parser.add_argument("--requests", type=int, default=30, help="Timed requests per route and period")
+    parser.add_argument("--warm", action="store_true", help="Keep the caches between requests")
+    parser.add_argument("--output", default="routes_benchmark.json")
+    parser.add_argument("--compare", help="Earlier --output file to compare with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db) if args.db else Path(tmp) / "bench_routes.db"
+        built = not db_path.exists()
+        build = None
+        if built:
+            print(f"Building {db_path} ({args.rows:,} + {args.health_rows:,} rows, seed {args.seed})...")
+            build = build_database(db_path, args.rows, args.health_rows, args.seed)
+            print(f"[OK] Generated in {build['generate_s']:.1f}s, loaded in {build['load_s']:.1f}s "
+                  f"({build['load_rows_per_s'] or 0:,} rows/s)")
+        rows = count_rows(db_path)
+        use_database(db_path)
+        if not (config.TRACING_ENABLED and config.SERVER_TIMING_HEADER):
+            sys.exit("[ERROR] DB time is read from the Server-Timing header: enable TRACING_ENABLED "
+                     "and SERVER_TIMING_HEADER in config.py")
+
+        from starlette.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+        email, password = next(iter(config.VALID_CREDENTIALS.items()))
+        client.post("/login", data={'email': email, 'password': password}, follow_redirects=False)
+        if client.get("/system-health", follow_redirects=False).status_code != 200:
+            sys.exit("[ERROR] Login did not stick: the routes never saw an authenticated session")
+
+        print()
+        print("=" * 96)
+        print("ROUTE BENCHMARK")
+        print("=" * 96)
+        print(f"Database: {db_path} ({rows:,} rows); {args.requests} requests per route, "
+              f"{'warm' if args.warm else 'cold'} caches")
+        print()
+        print(f"{'route':<22} {'period':<10} {'p50':>9} {'p95':>9} {'p99':>9} {'db':>9} {'render':>9} "
+              f"{'bytes':>10} {'alloc':>8}")
+        results = []
+        for route, period, url, headers in route_urls(args.periods):
+            result = {'route': route, 'period': period, **measure(client, url, headers, args.requests, args.warm)}
+            results.append(result)
+            flag = "" if result['status'] == [200] else f"  status {result['status']}"
+            print(f"{route:<22} {period or '-':<10} {result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms "
+                  f"{result['p99_ms']:>7.1f}ms {result['db_ms']:>7.1f}ms {result['render_ms']:>7.1f}ms "
+                  f"{result['response_bytes']:>10,} {result['peak_alloc_mb']:>6.1f}MB{flag}")
+
+    report = {
+        'meta': {
+            'rows': rows,
+            'seed': args.seed if built else None,  # None: an existing --db was reused
+            'build': build,  # Generation and load timings; None when an existing --db was reused
+            'requests': args.requests,
+            'warm': args.warm,
+            'commit': git_commit(),
+            'run_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'config': {name: getattr(config, name) for name in CONFIG_FLAGS},
+        },
+        'results': results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print()
+    print(f"[OK] Results written to {args.output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: database query count with and without the cross-worker shared cache
+
+Starts N processes (like gunicorn workers), each with its own in-process
+TTLCache, and has all of them request the same dashboard keys at once.
+Without the shared store every worker computes every key; with it each
+key is computed once and the other workers read the result.
+
+Usage:
+    python -m benchmarks.shared_cache
+    python -m benchmarks.shared_cache --workers 17 --keys 12 --query-ms 200
+    python -m benchmarks.shared_cache --db sample_users.db   # Run real SQLite KPI queries
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from utils.cache import TTLCache
+from utils.kpis import PERIODS
+from utils.shared_cache import SQLiteSharedStore
+
+
+def make_compute(key, query_count, query_ms: float, db_path: str):
+    """Return the coroutine factory that stands in for the dashboard queries"""
+    _, user_id, _, period = key
+
+    async def compute():
+        with query_count.get_lock():
+            query_count.value += 1
+        if db_path:
+            from db import sqlite_queries
+            sqlite_queries.SAMPLE_DB_PATH = Path(db_path)
+            return await asyncio.to_thread(sqlite_queries.fetch_user_kpis_sqlite, user_id, period)
+        await asyncio.sleep(query_ms / 1000)
+        return {'user_id': user_id, 'period': period}
+
+    return compute
+
+
+def worker(keys, store_path, query_count, start_event, query_ms, db_path, seed):
+    """One simulated gunicorn worker serving a burst of concurrent dashboard requests"""
+    factory = (lambda: SQLiteSharedStore(store_path)) if store_path else None
+    cache = TTLCache("bench", shared_factory=factory, default_ttl=300)
+    order = list(keys)
+    random.Random(seed).shuffle(order)
+
+    async def run():
+        await asyncio.gather(*[
+            cache.get_or_compute_async(key, make_compute(key, query_count, query_ms, db_path))
+            for key in order
+        ])
+
+    start_event.wait()
+    asyncio.run(run())
+
+
+def run_round(keys, workers: int, shared: bool, query_ms: float, db_path: str) -> dict:
+    """Run all workers at once and count the queries they issued"""
+    ctx = multiprocessing.get_context("fork")
+    query_count = ctx.Value('i', 0)
+    start_event = ctx.Event()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "shared_cache.db") if shared else None
+        if store_path:
+            SQLiteSharedStore(store_path)  # Create the schema before the workers race for it
+
+        processes = [
+            ctx.Process(target=worker, args=(keys, store_path, query_count, start_event, query_ms, db_path, i))
+            for i in range(workers)
+        ]
+        for p in processes:
+            p.start()
+        start = time.perf_counter()
+        start_event.set()
+        for p in processes:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+    return {'queries': query_count.value, 'elapsed': elapsed}
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Shared cache benchmark")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count() * 2 + 1)
+    parser.add_argument("--keys", type=int, default=12, help="Distinct (user, period) keys requested")
+    parser.add_argument("--query-ms", type=float, default=200, help="Simulated query time per key")
+    parser.add_argument("--db", default=None, help="SQLite database to run real KPI queries against")
+    args = parser.parse_args()
+
+    periods = [p for p, _, _, _ in PERIODS]
+    keys = [('dashboard', 11 + i // len(periods), 'private', periods[i % len(periods)])
+            for i in range(args.keys)]
+
+    print("=" * 60)
+    print("SHARED CACHE BENCHMARK")
+    print("=" * 60)
+    print(f"Workers: {args.workers}")
+    print(f"Keys requested by every worker: {len(keys)}")
+    print(f"Query: {'real SQLite KPIs from ' + args.db if args.db else f'simulated {args.query_ms:.0f}ms'}")
+    print()
+
+    results = {}
+    for shared in (False, True):
+        label = "shared cache" if shared else "in-process only"
+        results[shared] = run_round(keys, args.workers, shared, args.query_ms, args.db)
+        print(f"{label:>16}: {results[shared]['queries']:>5} queries, {results[shared]['elapsed']:.2f}s")
+
+    print()
+    print(f"Ideal (one query per key): {len(keys)}")
+    saved = results[False]['queries'] - results[True]['queries']
+    print(f"Queries saved by the shared cache: {saved} ({saved / max(results[False]['queries'], 1) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: the bulk table renderer (components/tables.py) against building
+the table with iterrows and a Tr/Td element per cell, as the dashboard did
+
+Both render the same Latest Entries-shaped frame to the HTML that is sent
+(to_xml included, since that is where per-cell elements cost the most);
+the cell text of both is checked to agree before the timings are printed.
+
+Usage:
+    python -m benchmarks.tables
+    python -m benchmarks.tables --rows 20 1000 10000 100000 --repeat 10
+"""
+import argparse
+import html
+import re
+import time
+import numpy as np
+import pandas as pd
+from fasthtml.common import Div, Table, Thead, Tbody, Tr, Th, Td, to_xml
+from components.tables import render_table
+
+_CELL = re.compile(r"<td>(.*?)</td>", re.DOTALL)
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Rows shaped like the Latest Entries table (whole-second datetimes, as the database stores them)"""
+    rng = np.random.default_rng(seed)
+    compute = pd.Timestamp("2026-01-01") + pd.to_timedelta(rng.integers(0, 300 * 86400, rows), unit="s")
+    return pd.DataFrame({
+        'compute_datetime': compute,
+        'linkedin_url': [f"https://www.linkedin.com/company/company-{i}" for i in rng.integers(0, 100_000, rows)],
+        'status': pd.Categorical(rng.choice(["done", "error", "pending", "todo"], rows)),
+        'last_update': compute + pd.to_timedelta(rng.integers(60, 6 * 3600, rows), unit="s"),
+        'emergency': rng.random(rows) < 0.05,
+        'scraper_status': pd.Categorical(rng.choice(["success", "timeout", "blocked"], rows)),
+    })
+
+
+def legacy_table(df: pd.DataFrame) -> str:
+    """The original dashboard code"""
+    headers = [Th(col) for col in df.columns]
+    rows = []
+    for _, row in df.iterrows():
+        cells = [Td(str(val)) for val in row]
+        rows.append(Tr(*cells))
+    return to_xml(Div(Table(Thead(Tr(*headers)), Tbody(*rows))))
+
+
+def bulk_table(df: pd.DataFrame) -> str:
+    return to_xml(Div(render_table(df, formatters={'emergency': lambda values: values.astype(str)})))
+
+
+def cells(markup: str) -> list:
+    return [html.unescape(cell.strip()) for cell in _CELL.findall(markup)]
+
+
+def best_of(func, df: pd.DataFrame, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        markup = func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), markup
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Table rendering benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size (the best is reported)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("TABLE RENDERING BENCHMARK")
+    print("=" * 60)
+    print(f"{'rows':>9} {'iterrows + FT':>15} {'bulk':>12} {'speedup':>9} {'HTML':>10}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        legacy_time, legacy_html = best_of(legacy_table, df, args.repeat)
+        bulk_time, bulk_html = best_of(bulk_table, df, args.repeat)
+        if cells(legacy_html) != cells(bulk_html):
+            print(f"[ERROR] Cell text differs at {rows:,} rows")
+            return
+        print(f"{rows:>9,} {legacy_time * 1000:>12.2f} ms {bulk_time * 1000:>9.2f} ms "
+              f"{legacy_time / bulk_time:>8.1f}x {len(bulk_html) / 1024:>7.0f} KB")
+    print()
+    print("[OK] Same cell text from both renderers")
+
+
+if __name__ == "__main__":
+    main()
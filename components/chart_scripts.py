@@ -0,0 +1,111 @@
+"""
+Client-side chart rendering
+The dashboard ships only the aggregated series for each chart; this script
+fetches them and builds the same figures plotly.express would, in the browser
+"""
+import plotly.io as pio
+
+# plotly.express applies the "plotly" template server-side; Plotly.js needs it passed in
+_TEMPLATE_JSON = pio.json.to_json_plotly(pio.templates['plotly'].to_plotly_json())
+
+CHART_SCRIPT = """
+(function () {
+    var TEMPLATE = __TEMPLATE__;
+    var COLORWAY = TEMPLATE.layout.colorway;
+    var PASTEL = ['rgb(102, 197, 204)', 'rgb(246, 207, 113)', 'rgb(248, 156, 116)', 'rgb(220, 176, 242)',
+                  'rgb(135, 197, 95)', 'rgb(158, 185, 243)', 'rgb(254, 136, 177)', 'rgb(201, 219, 116)',
+                  'rgb(139, 224, 164)', 'rgb(180, 151, 231)', 'rgb(179, 179, 179)'];
+    var MARGIN = {t: 40, b: 0, l: 0, r: 0};
+
+    function baseLayout(title, extra) {
+        var layout = {template: TEMPLATE, title: {text: title}, margin: MARGIN, legend: {tracegroupgap: 0}};
+        for (var k in extra) { layout[k] = extra[k]; }
+        return layout;
+    }
+
+    function axes(xTitle, yTitle, categories) {
+        var xaxis = {anchor: 'y', domain: [0, 1], title: {text: xTitle}};
+        if (categories) { xaxis.categoryorder = 'array'; xaxis.categoryarray = categories; }
+        return {xaxis: xaxis, yaxis: {anchor: 'x', domain: [0, 1], title: {text: yTitle}}};
+    }
+
+    // One trace per category, like px.bar(color=x, text=y)
+    function categoryBars(s, xTitle, title, colors, showlegend) {
+        var traces = s.x.map(function (x, i) {
+            return {
+                type: 'bar', x: [x], y: [s.y[i]], text: [s.y[i]], textposition: 'auto',
+                name: x, legendgroup: x, showlegend: showlegend, orientation: 'v',
+                marker: {color: (colors || COLORWAY)[i % (colors || COLORWAY).length]},
+                hovertemplate: xTitle + '=%{x}<br>Count=%{text}<extra></extra>'
+            };
+        });
+        var extra = axes(xTitle, 'Count', s.x);
+        extra.barmode = 'relative';
+        extra.showlegend = showlegend;
+        if (showlegend) { extra.legend = {title: {text: xTitle}, tracegroupgap: 0}; }
+        return {data: traces, layout: baseLayout(title, extra)};
+    }
+
+    var BUILDERS = {
+        status: function (s) {
+            return {
+                data: [{type: 'pie', labels: s.labels, values: s.values, hole: 0.4, name: '', showlegend: true,
+                        domain: {x: [0, 1], y: [0, 1]},
+                        hovertemplate: 'Status=%{label}<br>Count=%{value}<extra></extra>'}],
+                layout: baseLayout('Status Distribution', {piecolorway: PASTEL})
+            };
+        },
+        scraper: function (s) {
+            return categoryBars(s, 'Scraper Status', 'Scraper Status Breakdown', null, true);
+        },
+        infrastructure: function (s) {
+            return categoryBars(s, 'Category', 'Infrastructure Overview', ['#28a745', '#ffc107', '#007bff'], false);
+        },
+        timeline: function (s) {
+            return {
+                data: [{type: 'scatter', mode: 'lines+markers', x: s.x, y: s.y, name: '', showlegend: false,
+                        line: {color: COLORWAY[0], dash: 'solid'}, marker: {symbol: 'circle'},
+                        hovertemplate: 'date=%{x}<br>Count=%{y}<extra></extra>'}],
+                layout: baseLayout(s.title, axes('date', 'Count'))
+            };
+        },
+        processing_time: function (s) {
+            var extra = axes('Hours', 'Count');
+            extra.barmode = 'relative';
+            extra.bargap = 0;
+            return {
+                data: [{type: 'bar', x: s.x, y: s.y, name: '', showlegend: false, textposition: 'auto',
+                        marker: {color: COLORWAY[0]},
+                        hovertemplate: 'Hours=%{x}<br>Count=%{y}<extra></extra>'}],
+                layout: baseLayout('Processing Time Distribution (Hours)', extra)
+            };
+        }
+    };
+
+    function renderChart(el) {
+        var build = BUILDERS[el.dataset.chart];
+        if (!build || el.dataset.rendered) { return; }
+        el.dataset.rendered = '1';
+        fetch(el.dataset.src, {credentials: 'same-origin'})
+            .then(function (r) { if (!r.ok) { throw new Error(r.status); } return r.json(); })
+            .then(function (series) {
+                var fig = build(series);
+                Plotly.newPlot(el, fig.data, fig.layout, {responsive: true});
+            })
+            .catch(function (e) { el.textContent = 'Chart unavailable (' + e.message + ')'; });
+    }
+
+    function renderAll(root) {
+        (root || document).querySelectorAll('[data-chart][data-src]').forEach(renderChart);
+    }
+
+    window.renderCharts = renderAll;
+    // Sections loaded as HTMX partials bring their own placeholders
+    document.addEventListener('htmx:load', function (e) { renderAll(e.target); });
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', function () { renderAll(); });
+    } else {
+        renderAll();
+    }
+})();
+""".replace("__TEMPLATE__", _TEMPLATE_JSON)
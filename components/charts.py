@@ -1,10 +1,18 @@
 """
 Chart generation utilities
 """
+import hashlib
+import threading
+import time
 import pandas as pd
 import plotly.express as px
 import plotly.io as pio
 from fasthtml.common import NotStr
+from utils.cache import chart_cache
+from utils.tracing import record_span
+
+_render_stats = {}  # chart name -> build/serialize counters
+_render_stats_lock = threading.Lock()
 
 
 def generate_plot_html(fig):
@@ -66,3 +74,138 @@ def create_processing_time_histogram(df: pd.DataFrame):
                       labels={'processing_time': 'Hours'})
     fig.update_layout(margin=dict(t=40, b=0, l=0, r=0))
     return fig
+
+
+def create_processing_time_binned_chart(df_bins: pd.DataFrame):
+    """Create histogram-style bar chart from pre-binned processing times"""
+    fig = px.bar(df_bins, x='processing_time', y='Count',
+                 title="Processing Time Distribution (Hours)",
+                 labels={'processing_time': 'Hours'})
+    fig.update_layout(margin=dict(t=40, b=0, l=0, r=0), bargap=0)
+    return fig
+
+
+def create_status_distribution_chart(df_status: pd.DataFrame):
+    """Create pie chart from pre-aggregated status counts (Status, Count)"""
+    fig = px.pie(df_status, values='Count', names='Status', hole=0.4,
+                 color_discrete_sequence=px.colors.qualitative.Pastel,
+                 title="Status Distribution")
+    fig.update_layout(margin=dict(t=40, b=0, l=0, r=0))
+    return fig
+
+
+def create_scraper_distribution_chart(df_scraper: pd.DataFrame):
+    """Create bar chart from pre-aggregated scraper status counts (Scraper Status, Count)"""
+    fig = px.bar(df_scraper, x='Scraper Status', y='Count',
+                 color='Scraper Status', text='Count',
+                 title="Scraper Status Breakdown")
+    fig.update_layout(margin=dict(t=40, b=0, l=0, r=0))
+    return fig
+
+
+def create_daily_timeline_chart(df_timeline: pd.DataFrame, period_label: str = "All Time"):
+    """Create timeline chart from pre-aggregated daily counts (date, Count)"""
+    fig = px.line(df_timeline, x='date', y='Count', markers=True,
+                  title=f"Scraped Companies Over Time ({period_label})")
+    fig.update_layout(margin=dict(t=40, b=0, l=0, r=0))
+    return fig
+
+
+def chart_fingerprint(*args) -> str:
+    """Hash of the data a chart is built from (DataFrames by content, everything else by repr)"""
+    h = hashlib.blake2b(digest_size=16)
+    for arg in args:
+        if isinstance(arg, pd.DataFrame):
+            h.update(repr((list(arg.columns), [str(t) for t in arg.dtypes])).encode())
+            h.update(pd.util.hash_pandas_object(arg, index=False).values.tobytes())
+        else:
+            h.update(repr(arg).encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _record_render(name: str, hit: bool, build_ms: float = 0.0, serialize_ms: float = 0.0):
+    with _render_stats_lock:
+        stats = _render_stats.setdefault(name, {
+            'name': name, 'hits': 0, 'renders': 0,
+            'build_ms': 0.0, 'serialize_ms': 0.0, 'last_build_ms': 0.0, 'last_serialize_ms': 0.0
+        })
+        if hit:
+            stats['hits'] += 1
+            return
+        stats['renders'] += 1
+        stats['build_ms'] += build_ms
+        stats['serialize_ms'] += serialize_ms
+        stats['last_build_ms'] = build_ms
+        stats['last_serialize_ms'] = serialize_ms
+
+
+def render_chart(name: str, builder, *args):
+    """
+    Return the chart HTML for builder(*args), reusing the cached fragment when
+    the data is unchanged so neither the figure nor its JSON is rebuilt
+    """
+    key = (name, chart_fingerprint(*args))
+    found, html = chart_cache.get(key)
+    if found:
+        _record_render(name, hit=True)
+        return NotStr(html)
+
+    start = time.perf_counter()
+    fig = builder(*args)
+    built = time.perf_counter()
+    html = pio.to_html(fig, full_html=False, include_plotlyjs=False, config={'responsive': True})
+    done = time.perf_counter()
+
+    chart_cache.set(key, html)
+    _record_render(name, hit=False, build_ms=(built - start) * 1000, serialize_ms=(done - built) * 1000)
+    record_span("plotly_build", built - start)
+    record_span("plotly_to_html", done - built)
+    return NotStr(html)
+
+
+def get_chart_render_stats() -> list:
+    """Per-chart cache hits and average build/serialize time in this worker"""
+    with _render_stats_lock:
+        rows = [dict(s) for s in _render_stats.values()]
+    for row in rows:
+        renders = row['renders']
+        row['avg_build_ms'] = row['build_ms'] / renders if renders else 0.0
+        row['avg_serialize_ms'] = row['serialize_ms'] / renders if renders else 0.0
+        lookups = renders + row['hits']
+        row['hit_rate'] = row['hits'] / lookups if lookups else 0.0
+    return sorted(rows, key=lambda r: r['name'])
+
+
+def _series_values(values) -> list:
+    """Plain JSON-ready numbers (ints stay ints, floats are rounded)"""
+    return [round(float(v), 4) if isinstance(v, float) else int(v) for v in values.tolist()]
+
+
+def _date_labels(dates: pd.Series) -> list:
+    timestamps = pd.to_datetime(dates)
+    fmt = '%Y-%m-%d' if (timestamps == timestamps.dt.normalize()).all() else '%Y-%m-%d %H:%M'
+    return timestamps.dt.strftime(fmt).tolist()
+
+
+def chart_series(name: str, data: dict, period_label: str = "All Time") -> dict:
+    """Aggregated series for one dashboard chart, for the client-side renderer"""
+    if name == "status":
+        df = data['status_counts']
+        return {'labels': df['Status'].astype(str).tolist(), 'values': _series_values(df['Count'])}
+    if name == "scraper":
+        df = data['scraper_counts']
+        return {'x': df['Scraper Status'].astype(str).tolist(), 'y': _series_values(df['Count'])}
+    if name == "infrastructure":
+        return {'x': ['Active Accounts', 'Accounts On Hold', 'Active Workers'],
+                'y': [int(data['active_accounts']), int(data['accounts_on_hold']), int(data['active_workers'])]}
+    if name == "timeline":
+        df = data['timeline']
+        return {'x': _date_labels(df['date']) if len(df) else [], 'y': _series_values(df['Count']) if len(df) else [],
+                'title': f"Scraped Companies Over Time ({period_label})"}
+    if name == "processing_time":
+        df = data['processing_bins']
+        if df.empty:
+            return {'x': [], 'y': []}
+        return {'x': _series_values(df['processing_time']), 'y': _series_values(df['Count'])}
+    raise KeyError(name)
@@ -0,0 +1,143 @@
+"""
+Client-side virtual scrolling for the all-entries view
+Rows arrive as NDJSON batches from /linkedin/entries/stream; only the rows
+in (and just around) the viewport are in the DOM, with spacer rows standing
+in for the rest, and the next batches are requested near the bottom
+"""
+
+ROW_BROWSER_SCRIPT = """
+(function () {
+    var OVERSCAN = 10;    // Rows rendered above and below the viewport
+    var PREFETCH = 300;   // Request more when fewer rows than this are left below the viewport
+
+    function spacer(height, columns) {
+        var tr = document.createElement('tr');
+        tr.className = 'row-spacer';
+        var td = document.createElement('td');
+        td.colSpan = Math.max(columns, 1);
+        td.style.height = height + 'px';
+        tr.appendChild(td);
+        return tr;
+    }
+
+    function RowBrowser(el) {
+        this.src = el.dataset.src;
+        this.viewport = el.querySelector('.row-viewport');
+        this.head = el.querySelector('thead tr');
+        this.body = el.querySelector('tbody');
+        this.status = el.querySelector('.row-status');
+        this.rowHeight = 33;  // Measured once the first rows are drawn
+        this.columns = 0;
+        this.rows = [];
+        this.cursor = null;
+        this.done = false;
+        this.loading = false;
+        this.first = this.last = -1;
+        var self = this;
+        this.viewport.addEventListener('scroll', function () { self.render(false); self.maybeLoad(); });
+        window.addEventListener('resize', function () { self.render(true); });
+        this.load();
+    }
+
+    RowBrowser.prototype.render = function (force) {
+        var top = this.viewport.scrollTop;
+        var first = Math.max(0, Math.floor(top / this.rowHeight) - OVERSCAN);
+        var last = Math.min(this.rows.length,
+                            Math.ceil((top + this.viewport.clientHeight) / this.rowHeight) + OVERSCAN);
+        if (!force && first === this.first && last === this.last) { return; }
+        this.first = first;
+        this.last = last;
+
+        var fragment = document.createDocumentFragment();
+        fragment.appendChild(spacer(first * this.rowHeight, this.columns));
+        for (var i = first; i < last; i++) {
+            var tr = document.createElement('tr');
+            var row = this.rows[i];
+            for (var j = 0; j < row.length; j++) {
+                var td = document.createElement('td');
+                td.textContent = row[j];
+                td.title = row[j];
+                tr.appendChild(td);
+            }
+            fragment.appendChild(tr);
+        }
+        fragment.appendChild(spacer((this.rows.length - last) * this.rowHeight, this.columns));
+        this.body.replaceChildren(fragment);
+
+        var drawn = this.body.children[1];
+        if (last > first && drawn.offsetHeight && drawn.offsetHeight !== this.rowHeight) {
+            this.rowHeight = drawn.offsetHeight;
+            this.render(true);
+        }
+    };
+
+    RowBrowser.prototype.addBatch = function (batch) {
+        if (batch.error) { throw new Error(batch.error); }
+        if (!this.columns) {
+            this.columns = batch.columns.length;
+            var head = this.head;
+            batch.columns.forEach(function (name) {
+                var th = document.createElement('th');
+                th.textContent = name;
+                head.appendChild(th);
+            });
+        }
+        for (var i = 0; i < batch.rows.length; i++) { this.rows.push(batch.rows[i]); }
+        this.cursor = batch.next_cursor;
+        this.done = !batch.next_cursor;
+        this.render(true);
+        this.status.textContent = (this.done ? 'All ' : '') + this.rows.length.toLocaleString() + ' rows loaded';
+    };
+
+    RowBrowser.prototype.maybeLoad = function () {
+        if (!this.done && !this.loading && this.rows.length - this.last < PREFETCH) { this.load(); }
+    };
+
+    RowBrowser.prototype.load = function () {
+        var self = this;
+        var url = this.src + (this.cursor ? '&cursor=' + encodeURIComponent(this.cursor) : '');
+        var decoder = new TextDecoder();
+        var buffer = '';
+        this.loading = true;
+
+        function readLines(text) {
+            buffer += text;
+            var lines = buffer.split('\\n');
+            buffer = lines.pop();
+            lines.forEach(function (line) { if (line) { self.addBatch(JSON.parse(line)); } });
+        }
+
+        fetch(url, {credentials: 'same-origin'})
+            .then(function (r) {
+                if (!r.ok) { throw new Error(r.status); }
+                var reader = r.body.getReader();
+                function pump() {
+                    return reader.read().then(function (chunk) {
+                        if (chunk.done) { readLines(decoder.decode() + '\\n'); return; }
+                        readLines(decoder.decode(chunk.value, {stream: true}));
+                        return pump();
+                    });
+                }
+                return pump();
+            })
+            .then(function () { self.loading = false; self.maybeLoad(); })
+            .catch(function (e) {
+                self.loading = false;
+                self.done = true;
+                self.status.textContent = 'Could not load rows (' + e.message + ')';
+            });
+    };
+
+    function start() {
+        document.querySelectorAll('.row-browser[data-src]').forEach(function (el) {
+            if (!el.dataset.started) { el.dataset.started = '1'; new RowBrowser(el); }
+        });
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', start);
+    } else {
+        start();
+    }
+})();
+"""
@@ -259,6 +259,60 @@ APP_STYLES = """
         margin: 20px 0;
         flex-wrap: wrap;
     }
+    .table-filters {
+        display: flex;
+        gap: 10px;
+        margin: 10px 0;
+        flex-wrap: wrap;
+    }
+    .table-filter {
+        padding: 6px 10px;
+        border: 1px solid #ccc;
+        border-radius: 5px;
+        font-size: 14px;
+    }
+    .row-viewport {
+        height: 70vh;
+        overflow-y: auto;
+        border: 1px solid #ddd;
+        border-radius: 5px;
+    }
+    .row-viewport table {
+        margin-top: 0;
+        table-layout: fixed;
+    }
+    .row-viewport th {
+        position: sticky;
+        top: 0;
+    }
+    .row-viewport td {
+        padding: 6px 12px;
+        white-space: nowrap;
+        overflow: hidden;
+        text-overflow: ellipsis;
+    }
+    .row-viewport .row-spacer td {
+        padding: 0;
+        border: 0;
+    }
+    .row-status {
+        color: #666;
+        font-size: 0.9em;
+        margin: 10px 0;
+    }
+    .section-loading {
+        min-height: 120px;
+        margin: 20px 0;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        background: #f8f9fa;
+        border-radius: 8px;
+    }
+    .section-loading-text {
+        color: #999;
+        font-size: 0.9em;
+    }
     .filter-btn {
         padding: 10px 20px;
         border: 2px solid #007bff;
@@ -0,0 +1,68 @@
+"""
+DataFrame tables rendered to HTML in bulk
+
+Building a Tr/Td element per cell (with a pandas Series per row from
+iterrows) costs far more than the data itself once a table has more
+than a few dozen rows. Here each column is formatted and escaped as a
+whole and the rows are joined into one string.
+"""
+from html import escape
+import numpy as np
+import pandas as pd
+from fasthtml.common import NotStr
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def datetime_formatter(fmt: str = DATETIME_FORMAT):
+    """Column formatter for datetimes (and strings that parse as them)"""
+    def format_column(values: pd.Series) -> pd.Series:
+        return pd.to_datetime(values, errors="coerce").dt.strftime(fmt)
+    return format_column
+
+
+def bool_formatter(true: str = "Yes", false: str = "No"):
+    """Column formatter for booleans, also 0/1 integers"""
+    def format_column(values: pd.Series) -> pd.Series:
+        flags = values.where(values.notna(), False).astype(bool).to_numpy()
+        return pd.Series(np.where(flags, true, false), index=values.index)
+    return format_column
+
+
+def _default_formatter(values: pd.Series):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return datetime_formatter()
+    if pd.api.types.is_bool_dtype(values):
+        return bool_formatter()
+    return lambda column: column.astype(str)
+
+
+def column_text(values: pd.Series, formatter=None, na_rep: str = "") -> list:
+    """Display text for a column; missing values (and those the formatter leaves out) show as na_rep"""
+    formatter = formatter or _default_formatter(values)
+    text = formatter(values).to_numpy(dtype=object, copy=True)
+    text[values.isna().to_numpy()] = None
+    return [na_rep if cell is None or cell != cell else cell for cell in text.tolist()]
+
+
+def frame_text(df: pd.DataFrame, formatters: dict = None, na_rep: str = "") -> list:
+    """Display text of every column (a list per column); formatters maps column -> formatter"""
+    formatters = formatters or {}
+    return [column_text(df.iloc[:, i], formatters.get(column), na_rep) for i, column in enumerate(df.columns)]
+
+
+def render_rows(df: pd.DataFrame, formatters: dict = None, na_rep: str = "") -> str:
+    """The <tr> rows of a table body, escaped"""
+    columns = [[escape(cell) for cell in column] for column in frame_text(df, formatters, na_rep)]
+    return "".join(f"<tr><td>{'</td><td>'.join(cells)}</td></tr>" for cells in zip(*columns))
+
+
+def render_table(df: pd.DataFrame, formatters: dict = None, na_rep: str = "") -> NotStr:
+    """<table> with a header row and one row per DataFrame row
+
+    formatters maps a column name to a function from the column (a Series)
+    to a Series of strings; other columns are formatted by dtype.
+    """
+    head = "".join(f"<th>{escape(str(column))}</th>" for column in df.columns)
+    body = render_rows(df, formatters, na_rep)
+    return NotStr(f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>")
@@ -18,11 +18,104 @@ ACTIVE_WORKERS = 10
 
 # Processing Time Limits (in hours)
 MAX_PROCESSING_TIME = 6  # Scrapers work during business hours only
+PROCESSING_TIME_BINS = 30  # Histogram bins between 0 and MAX_PROCESSING_TIME
+
+# Database backend: "postgres" (RDS) or "sqlite" (sample_users.db, for local runs and benchmarks)
+DB_BACKEND = "postgres"
+
+# Engine that aggregates the dashboard KPIs (see db/analytics.py): "sql" (in the database), "pandas" (the raw rows
+# in-process, the reference implementation), "stream" (the pandas aggregation over STREAM_CHUNK_ROWS chunks, constant
+# memory) or "duckdb" (embedded DuckDB over sample_users.db and the Parquet snapshot; pip install duckdb)
+ANALYTICS_ENGINE = "sql"
+STREAM_CHUNK_ROWS = 50_000
+DUCKDB_THREADS = 4
+
+# Read dashboard KPIs from the daily rollup table (build it first: python refresh_rollup.py backfill)
+USE_DAILY_ROLLUP = False
+
+# Serve the long periods from the Parquet snapshot (build it first: python export_snapshot.py full)
+USE_PARQUET_SNAPSHOT = False
+SNAPSHOT_PERIODS = ("overall", "yearly")
+SNAPSHOT_DIR = "snapshots/url_status_company"
+SNAPSHOT_BATCH_ROWS = 100_000  # Rows per export batch (one Parquet file per user-month per batch)
+
+# Result cache (per worker): TTLs in seconds by period, short for daily, longer for all time
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_TTLS = {
+    "daily": 60,
+    "weekly": 300,
+    "monthly": 600,
+    "quarterly": 900,
+    "yearly": 1800,
+    "overall": 3600,
+}
+HEALTH_CHECK_CACHE_TTL = 60
+SYSTEM_STATS_CACHE_TTL = 60
+
+# Monthly partitions of url_status_company created ahead of time (python manage_partitions.py ensure, from cron)
+PARTITION_MONTHS_AHEAD = 3
+
+# System health totals from the trigger-maintained counters (build them first: python manage_counters.py rebuild)
+USE_SYSTEM_COUNTERS = False
+
+# System health totals from database statistics instead of a full scan (shown as approximate)
+SYSTEM_STATS_APPROXIMATE = False
+SYSTEM_STATS_SAMPLE_SIZE = 10000  # SQLite: rows sampled by id for the status distribution
+
+# Send the dashboard shell immediately and load each section (metrics, charts, tables) as an HTMX partial
+DASHBOARD_LAZY_SECTIONS = True
+
+# Dashboard charts: "client" ships only the aggregated series as JSON and draws them in the browser,
+# "server" embeds the full Plotly figure HTML in the page
+CHART_RENDER_MODE = "client"
+
+# Rendered chart fragments for server mode (per worker), keyed by a hash of the chart data
+CHART_CACHE_MAX_BYTES = 16 * 1024 * 1024
+CHART_CACHE_TTL = 3600
+
+# Shared cache across gunicorn workers: "sqlite" (local file), "redis" (needs the redis package) or None
+SHARED_CACHE_BACKEND = "sqlite"
+SHARED_CACHE_PATH = "~/.cache/linkedin_kpi/shared_cache.db"  # Created 0600 in a 0700 directory owned by the app user
+REDIS_URL = "redis://localhost:6379/0"
+SHARED_CACHE_LOCK_TIMEOUT = 60  # Seconds other workers wait for the one computing a key
+SHARED_CACHE_POLL_INTERVAL = 0.05
+SHARED_CACHE_GENERATION_INTERVAL = 1.0  # Seconds between checks for another worker's invalidation
+SHARED_CACHE_INVALIDATION_LOG = 1000  # Per-user invalidations kept; a worker further behind drops everything
+
+# PostgreSQL connection pool (per gunicorn worker, so the total is workers * DB_POOL_MAX_SIZE)
+DB_POOL_MIN_SIZE = 1
+DB_POOL_MAX_SIZE = 4
+DB_POOL_TIMEOUT = 10  # Seconds to wait for a free connection
+DB_POOL_MAX_AGE = 1800  # Recycle connections older than this (seconds)
+DB_POOL_HEALTH_CHECK_INTERVAL = 30  # Ping connections idle longer than this (seconds)
+DB_POOL_PING_TIMEOUT = 5  # Statement timeout of that ping (seconds)
+DB_CONNECT_TIMEOUT = 10  # Seconds to wait for the server when opening a connection
+
+# Per-request tracing (utils/tracing.py): stage and SQL timings per request, summed per route on System Health
+TRACING_ENABLED = True
+SERVER_TIMING_HEADER = True  # Send each request's timings in a Server-Timing response header
+
+# Prometheus histograms at /metrics (needs prometheus_client); gunicorn workers share METRICS_MULTIPROC_DIR
+METRICS_ENABLED = True
+METRICS_MULTIPROC_DIR = "/tmp/linkedin_kpi_metrics"
+
+# Statement statistics per SQL fingerprint and the slow-query log (db/query_stats.py; rank it with query_report.py)
+SLOW_QUERY_MS = 250  # Statements at least this slow are logged (0 logs every statement)
+SLOW_QUERY_LOG = "logs/slow_queries.jsonl"  # One JSON object per line, appended by every worker
+SLOW_QUERY_EXPLAIN = False  # Add the query plan to each entry (one extra EXPLAIN per slow statement)
+QUERY_STATS_WINDOW = 1000  # Recent durations kept per fingerprint for the p95
 
 # Pagination
 LATEST_ENTRIES_LIMIT = 20
 HEALTH_CHECK_ENTRIES_LIMIT = 30
 
+# All-entries view (/linkedin/entries): rows stream in keyset batches, so a request holds one batch at a time
+ROW_STREAM_BATCH_ROWS = 500
+ROW_STREAM_MAX_BATCHES = 20  # Batches per request; the browser asks for more as it scrolls
+
+# Row exports (/linkedin/export): rows are read and encoded EXPORT_CHUNK_ROWS at a time (a Parquet row group each)
+EXPORT_CHUNK_ROWS = 50_000
+
 # Platform Configuration
 PLATFORMS = [
     ("linkedin", "LinkedIn", "💼", True),  # (id, name, icon, is_active)
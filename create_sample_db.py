@@ -5,6 +5,8 @@ This creates data for users 11-19 (8 sample users + the original user 11)
 import sqlite3
 import random
 from datetime import datetime, timedelta
+from db.migrations import apply_migrations
+from db.counters import rebuild_counters
 
 # Database file
 DB_FILE = "sample_users.db"
@@ -124,6 +126,12 @@ def main():
     for user_id in user_ids:
         generate_user_data(conn, user_id, num_records=150)
 
+    # Composite, covering and partial indexes used by the dashboard queries
+    apply_migrations(conn, "sqlite")
+
+    # System health counters, kept current by triggers from here on
+    rebuild_counters(conn, "sqlite")
+
     # Show statistics
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM url_status_company")
@@ -0,0 +1,184 @@
+"""
+KPI aggregation engines
+
+Every engine returns the aggregate rows behind build_kpi_result,
+(kind, key, count, done, emergency, valid_count, valid_sum):
+
+    sql     the KPI query runs in PostgreSQL / SQLite (db.queries, db.sqlite_queries)
+    pandas  the user's raw rows are read into a DataFrame and aggregated
+            in-process; the reference the other engines are checked against
+    stream  the pandas aggregation over fixed-size chunks from a server-side
+            cursor, for users too large to load at once
+    duckdb  an embedded DuckDB scans sample_users.db or the Parquet snapshot
+            directly, vectorized and on DUCKDB_THREADS threads
+
+ANALYTICS_ENGINE in config.py picks one. The Parquet snapshot has no
+database to run SQL in, so the sql engine aggregates it with pandas, and
+PostgreSQL tables are never read through DuckDB (the sql engine is used).
+DuckDB is an optional dependency: pip install duckdb (it loads its sqlite
+extension on first use).
+"""
+import pandas as pd
+from config import MAX_PROCESSING_TIME, PROCESSING_TIME_BINS, DUCKDB_THREADS, STREAM_CHUNK_ROWS
+from utils.kpis import PROCESSING_BIN_WIDTH
+from utils.kpi_frame import KPI_COLUMNS, KpiAccumulator, kpi_rows_from_frame
+from utils.frames import compact_frame, read_frame, record_frame
+
+ENGINES = ("sql", "pandas", "stream", "duckdb")
+
+_PARAM = {"postgres": "%({})s", "sqlite": ":{}", "duckdb": "${}"}
+
+RAW_KPI_QUERY = "SELECT " + ", ".join(KPI_COLUMNS) + " FROM {source} WHERE {where}"
+
+# USER_KPIS_QUERY in DuckDB's dialect; timestamps are cast because SQLite stores them as text
+DUCKDB_KPIS_QUERY = """
+    WITH filtered AS (
+        SELECT
+            status,
+            scraper_status,
+            CAST(emergency AS BOOLEAN) AS emergency,
+            CAST(CAST(compute_datetime AS TIMESTAMP) AS DATE) AS day,
+            (epoch(CAST(last_update AS TIMESTAMP)) - epoch(CAST(compute_datetime AS TIMESTAMP))) / 3600.0
+                AS processing_time
+        FROM {source}
+        WHERE {where}
+    ),
+    bucketed AS (
+        SELECT
+            *,
+            CASE WHEN processing_time > 0 AND processing_time <= $max_hours
+                 THEN LEAST(CAST(FLOOR(processing_time / $bin_width) AS INTEGER), $last_bin)
+            END AS bucket
+        FROM filtered
+    )
+    SELECT
+        CASE GROUPING(status, scraper_status, day, bucket)
+            WHEN 15 THEN 'total'
+            WHEN 7 THEN 'status'
+            WHEN 11 THEN 'scraper_status'
+            WHEN 13 THEN 'day'
+            WHEN 14 THEN 'bucket'
+        END AS kind,
+        COALESCE(status, scraper_status, CAST(day AS VARCHAR), CAST(bucket AS VARCHAR)) AS key,
+        COUNT(*) AS count,
+        COUNT(*) FILTER (WHERE status = 'done') AS done,
+        COUNT(*) FILTER (WHERE emergency) AS emergency,
+        COUNT(*) FILTER (WHERE bucket IS NOT NULL) AS valid_count,
+        SUM(processing_time) FILTER (WHERE bucket IS NOT NULL) AS valid_sum
+    FROM bucketed
+    GROUP BY GROUPING SETS ((), (status), (scraper_status), (day), (bucket))
+"""
+
+
+def _where(dialect: str, user_id: int = None, cutoff=None, id_hwm: int = None):
+    """WHERE clause and params for a user's rows in a period (and above an id high-water mark)"""
+    p = _PARAM[dialect].format
+    conditions, params = ["TRUE"], {}
+    if user_id is not None:
+        conditions.append(f"user_id = {p('user_id')}")
+        params['user_id'] = user_id
+    if cutoff is not None:
+        conditions.append(f"compute_datetime >= {p('cutoff')}")
+        # SQLite compares the text timestamps
+        params['cutoff'] = cutoff.strftime('%Y-%m-%d %H:%M:%S') if dialect == "sqlite" else cutoff
+    if id_hwm is not None:
+        conditions.append(f"id > {p('id_hwm')}")
+        params['id_hwm'] = id_hwm
+    return " AND ".join(conditions), params
+
+
+# --- pandas ------------------------------------------------------------------
+
+def fetch_kpi_rows_pandas(conn, backend: str, user_id: int, cutoff=None, id_hwm: int = None,
+                          source: str = "url_status_company") -> list:
+    """The pandas engine over the database: read the user's raw rows for the period, then aggregate"""
+    where, params = _where(backend, user_id, cutoff, id_hwm)
+    df = read_frame('kpi_rows', RAW_KPI_QUERY.format(source=source, where=where), conn, params)
+    return kpi_rows_from_frame(df)
+
+
+# --- Streaming ---------------------------------------------------------------
+
+def fetch_chunks(conn, backend: str, query: str, params: dict, size: int, name: str = "chunked_fetch"):
+    """
+    Lists of at most `size` rows for a query, read through a server-side
+    cursor on PostgreSQL (named `name`) or SQLite's lazy cursor
+    """
+    cursor = conn.cursor(name=name) if backend == "postgres" else conn.cursor()
+    try:
+        if backend == "postgres":
+            cursor.itersize = size
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def stream_user_kpis(conn, backend: str, user_id: int, cutoff=None, id_hwm: int = None,
+                     source: str = "url_status_company", latest: int = 0, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    The stream engine: the user's rows for the period in chunks of
+    `chunk_rows` through a KpiAccumulator, so memory stays at one chunk
+    however many rows the user has
+    Returns (aggregate rows, the `latest` newest rows)
+    """
+    columns = KPI_COLUMNS + (['id', 'linkedin_url'] if latest else [])
+    where, params = _where(backend, user_id, cutoff, id_hwm)
+    query = f"SELECT {', '.join(columns)} FROM {source} WHERE {where}"
+    accumulator = KpiAccumulator(latest)
+    for rows in fetch_chunks(conn, backend, query, params, chunk_rows, name="kpi_stream"):
+        chunk = compact_frame(pd.DataFrame.from_records(rows, columns=columns))
+        record_frame('kpi_rows_stream', chunk)
+        accumulator.update(chunk)
+    return accumulator.rows(), accumulator.latest()
+
+
+# --- DuckDB ------------------------------------------------------------------
+
+def _duckdb_connect():
+    import duckdb  # Optional dependency, only needed for this engine
+    return duckdb.connect(config={'threads': DUCKDB_THREADS})
+
+
+def _duckdb_kpi_rows(conn, source: str, where: str, params: dict) -> list:
+    params = dict(params, max_hours=MAX_PROCESSING_TIME, bin_width=PROCESSING_BIN_WIDTH,
+                  last_bin=PROCESSING_TIME_BINS - 1)
+    return conn.execute(DUCKDB_KPIS_QUERY.format(source=source, where=where), params).fetchall()
+
+
+def fetch_kpi_rows_duckdb(db_path, user_id: int, cutoff=None, id_hwm: int = None,
+                          source: str = "url_status_company") -> list:
+    """
+    The DuckDB engine over a SQLite file (attached read-only)
+    `source` is a FROM clause in SQLite's names, e.g. from db.partitions.sqlite_source
+    """
+    conn = _duckdb_connect()
+    try:
+        conn.execute(f"ATTACH '{db_path}' AS sample (TYPE sqlite, READ_ONLY)")
+        conn.execute("USE sample")
+        where, params = _where("duckdb", user_id, cutoff, id_hwm)
+        # The text timestamps compare like they do in SQLite
+        if cutoff is not None:
+            params['cutoff'] = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+        return _duckdb_kpi_rows(conn, source, where, params)
+    finally:
+        conn.close()
+
+
+def fetch_snapshot_kpi_rows_duckdb(user_dir, cutoff=None) -> list:
+    """The DuckDB engine over one user's directory of the Parquet snapshot (month=YYYY-MM/*.parquet)"""
+    conn = _duckdb_connect()
+    try:
+        source = f"read_parquet('{user_dir}/*/*.parquet', hive_partitioning = true)"
+        where, params = _where("duckdb", cutoff=cutoff)
+        if cutoff is not None:
+            # Month directories before the cutoff are skipped without opening them
+            where += " AND month >= $month"
+            params['month'] = cutoff.strftime('%Y-%m')
+        return _duckdb_kpi_rows(conn, source, where, params)
+    finally:
+        conn.close()
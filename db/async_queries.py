@@ -0,0 +1,102 @@
+"""
+Async database access for the ASGI routes
+The drivers are blocking, so each query runs on a small thread executor
+sized to the connection pool and the event loop keeps serving requests
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import pandas as pd
+from config import DB_BACKEND, DB_POOL_MAX_SIZE, SYSTEM_STATS_CACHE_TTL
+from db import queries, sqlite_queries
+from db.export import export_max_id, export_chunks
+from utils.cache import stats_cache
+from utils.tracing import span
+
+# One thread per pooled connection: extra queries queue here instead of blocking threads on the pool
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_MAX_SIZE, thread_name_prefix="db")
+
+_BACKENDS = {
+    "postgres": {
+        'fetch_user_data': queries.fetch_user_data,
+        'fetch_user_kpis': queries.fetch_user_kpis,
+        'fetch_latest_entries': queries.fetch_latest_entries,
+        'fetch_latest_entries_page': queries.fetch_latest_entries_page,
+        'user_has_data': queries.user_has_data,
+        'fetch_health_check_data': queries.fetch_health_check_data,
+        'get_system_stats': queries.get_system_stats,
+        'export_max_id': partial(export_max_id, "postgres"),
+    },
+    "sqlite": {
+        'fetch_user_data': sqlite_queries.fetch_user_data_sqlite,
+        'fetch_user_kpis': sqlite_queries.fetch_user_kpis_sqlite,
+        'fetch_latest_entries': sqlite_queries.fetch_latest_entries_sqlite,
+        'fetch_latest_entries_page': sqlite_queries.fetch_latest_entries_page_sqlite,
+        'user_has_data': sqlite_queries.user_has_data_sqlite,
+        'fetch_health_check_data': sqlite_queries.fetch_health_check_data_sqlite,
+        'get_system_stats': sqlite_queries.get_system_stats_sqlite,
+        'export_max_id': partial(export_max_id, "sqlite"),
+    },
+}
+
+
+async def _run(name: str, *args):
+    """Run the configured backend's query function off the event loop (a span of the request trace)"""
+    func = _BACKENDS[DB_BACKEND][name]
+    loop = asyncio.get_running_loop()
+    # The executor thread sees the request's context, so its statements land in the same trace
+    context = contextvars.copy_context()
+    with span(name):
+        return await loop.run_in_executor(_executor, context.run, partial(func, *args))
+
+
+async def fetch_user_data_async(user_id: int) -> pd.DataFrame:
+    """Fetch all data for a specific user"""
+    return await _run('fetch_user_data', user_id)
+
+
+async def fetch_user_kpis_async(user_id: int, period: str = "overall") -> dict:
+    """Compute dashboard KPIs and chart series for a user"""
+    return await _run('fetch_user_kpis', user_id, period)
+
+
+async def fetch_latest_entries_async(user_id: int, period: str = "overall", limit: int = 20) -> pd.DataFrame:
+    """Fetch the most recent entries for a user within a period"""
+    return await _run('fetch_latest_entries', user_id, period, limit)
+
+
+async def fetch_latest_entries_page_async(user_id: int, period: str = "overall", limit: int = 20, cursor: str = None,
+                                          direction: str = "next", filters: dict = None) -> dict:
+    """One keyset-paginated page of a user's entries (rows, next_cursor, prev_cursor)"""
+    return await _run('fetch_latest_entries_page', user_id, period, limit, cursor, direction, filters)
+
+
+async def user_has_data_async(user_id: int) -> bool:
+    """Check whether a user has any rows at all"""
+    return await _run('user_has_data', user_id)
+
+
+async def fetch_health_check_data_async() -> pd.DataFrame:
+    """Fetch health check data from monitoring user"""
+    return await _run('fetch_health_check_data')
+
+
+async def get_system_stats_async() -> dict:
+    """Get overall system statistics (cached for SYSTEM_STATS_CACHE_TTL seconds)"""
+    return await stats_cache.get_or_compute_async(
+        ('system_stats',), lambda: _run('get_system_stats'), ttl=SYSTEM_STATS_CACHE_TTL
+    )
+
+
+async def export_max_id_async(user_id: int) -> int:
+    """The user's highest id, where an export ends by default"""
+    return await _run('export_max_id', user_id)
+
+
+def export_rows(user_id: int, cutoff, fmt: str, max_id: int, after_id: int = 0, gzip: bool = False):
+    """
+    A user's rows encoded as CSV or Parquet, as a blocking iterator of bytes
+    (StreamingResponse reads it on its threadpool, one chunk at a time)
+    """
+    return export_chunks(DB_BACKEND, user_id, cutoff, fmt, max_id, after_id, gzip)
@@ -1,8 +1,18 @@
 """
 Database connection management
 """
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
 import psycopg2
 from db_access import postgre_access_aws_external
+from db.traced import TracedPostgresCursor
+from config import (
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    DB_POOL_MAX_AGE, DB_POOL_HEALTH_CHECK_INTERVAL, DB_POOL_PING_TIMEOUT, DB_CONNECT_TIMEOUT
+)
 
 
 def get_db_connection():
@@ -13,6 +23,267 @@ def get_db_connection():
         port=port,
         database=database,
         user=user,
-        password=password
+        password=password,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        cursor_factory=TracedPostgresCursor
     )
     return conn
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool
+    Connections are health-checked when they have been idle for a while and
+    recycled once they are older than max_age seconds. The lock only guards
+    the bookkeeping: connecting, pinging and closing happen outside it, so
+    one slow server round trip does not stall every other borrower
+    """
+
+    def __init__(self, connect=get_db_connection, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 timeout=DB_POOL_TIMEOUT, max_age=DB_POOL_MAX_AGE,
+                 health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL, ping_timeout=DB_POOL_PING_TIMEOUT):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = []  # [(conn, created_at, last_used)]
+        self._created_at = {}  # id(conn) -> created_at
+        self._in_use = 0
+        self._closed = False
+
+        self._stats = {
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'health_check_failures': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
+
+        for _ in range(min_size):
+            conn = self._new_connection()
+            self._idle.append((conn, self._created_at[id(conn)], time.monotonic()))
+
+    @property
+    def size(self) -> int:
+        return self._in_use + len(self._idle)
+
+    def _new_connection(self):
+        conn = self.connect()
+        created_at = time.monotonic()
+        with self._cond:
+            self._created_at[id(conn)] = created_at
+            self._stats['connections_created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection that leaves the pool (call without holding the lock)"""
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _ping(self, conn):
+        cursor = conn.cursor()
+        # A server that stopped answering fails the check instead of holding the borrower
+        cursor.execute("SET LOCAL statement_timeout = %s", (int(self.ping_timeout * 1000),))
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        conn.rollback()
+
+    def _is_healthy(self, conn, created_at, last_used) -> bool:
+        """Check a connection taken from the idle list (call without holding the lock)"""
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if self.max_age and now - created_at > self.max_age:
+            with self._cond:
+                self._stats['connections_recycled'] += 1
+            return False
+        if now - last_used > self.health_check_interval:
+            try:
+                self._ping(conn)
+            except Exception:
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                return False
+        return True
+
+    def getconn(self):
+        """Borrow a connection, waiting up to `timeout` seconds for one to free up"""
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                    # Either slot is reserved before checking or connecting outside the lock
+                    if self._idle:
+                        conn, created_at, last_used = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self.size < self.max_size:
+                        conn = None
+                        self._in_use += 1
+                        break
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                break
+            if self._is_healthy(conn, created_at, last_used):
+                with self._cond:
+                    self._record_checkout(start, waited)
+                return conn
+            self._discard(conn)
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+
+        try:
+            conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._record_checkout(start, waited)
+        return conn
+
+    def _record_checkout(self, start, waited):
+        wait_time = time.monotonic() - start
+        self._stats['checkouts'] += 1
+        if waited:
+            self._stats['waits'] += 1
+        self._stats['total_wait_time'] += wait_time
+        self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a borrowed connection to the pool"""
+        if not discard and not conn.closed:
+            try:
+                # End the implicit transaction so the next borrower starts clean
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            created_at = self._created_at.get(id(conn), 0)
+            expired = self.max_age and time.monotonic() - created_at > self.max_age
+            discard = discard or conn.closed or self._closed or expired
+            if discard:
+                if expired:
+                    self._stats['connections_recycled'] += 1
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._discard(conn)
+
+    def close(self):
+        """Close all idle connections and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage for monitoring and sizing"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                pid=self.pid,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                size=self.size,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                avg_wait_time=stats['total_wait_time'] / stats['checkouts'] if stats['checkouts'] else 0.0,
+            )
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(**kwargs) -> ConnectionPool:
+    """Create the connection pool for this process (call after fork)"""
+    global _pool
+    with _pool_lock:
+        # A pool inherited from the parent process shares its sockets, so it is dropped without closing
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close()
+        _pool = None
+        _pool = ConnectionPool(**kwargs)
+    return _pool
+
+
+def get_pool() -> ConnectionPool:
+    """Return this process's connection pool, creating it on first use"""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        # Another thread may have created it meanwhile; a live pool of this process is never replaced here
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool()  # An inherited pool is dropped without closing (see init_pool)
+        return _pool
+
+
+def close_pool():
+    """Close this process's connection pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+
+def get_pool_stats() -> Optional[dict]:
+    """Return pool stats for this process, or None if no pool exists yet"""
+    if _pool is None or _pool.pid != os.getpid():
+        return None
+    return _pool.stats()
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled PostgreSQL connection for the duration of a with block"""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    except psycopg2.Error:
+        # Broken connections must not go back into the pool
+        pool.putconn(conn, discard=bool(conn.closed))
+        raise
+    except BaseException:
+        pool.putconn(conn)
+        raise
+    else:
+        pool.putconn(conn)
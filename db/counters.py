@@ -0,0 +1,235 @@
+"""
+Incremental row counters for url_status_company
+
+One row per status and per user with its current row count, kept up to date
+by triggers on url_status_company, so the System Health totals are a lookup
+instead of a scan of the whole table.
+
+PostgreSQL uses statement-level triggers with transition tables: a bulk
+INSERT ... SELECT or COPY touches each counter once per statement, not once
+per row. SQLite has row-level triggers only; bulk loaders drop them for the
+load and rebuild the counters afterwards (see load_bulk_data.py).
+
+Drift (triggers dropped or disabled while rows changed) is found with
+    python manage_counters.py reconcile [--fix]
+"""
+COUNTERS_TABLE = "url_status_counters"
+
+COUNTER_TRIGGERS = ("url_status_counters_insert", "url_status_counters_update",
+                    "url_status_counters_delete", "url_status_counters_truncate")
+
+# Current counts straight from a table, as (kind, key, row_count)
+ACTUAL_COUNTS = """
+    SELECT 'status' AS kind, status AS key, COUNT(*) AS row_count
+    FROM {table}
+    GROUP BY status
+    UNION ALL
+    SELECT 'user', CAST(user_id AS TEXT), COUNT(*)
+    FROM {table}
+    GROUP BY user_id
+"""
+
+# One statement (one snapshot) so concurrent writes can't show up as drift
+RECONCILE_QUERY = f"""
+    SELECT kind, key, SUM(actual) AS actual, SUM(counted) AS counted
+    FROM (
+        SELECT kind, key, row_count AS actual, 0 AS counted FROM ({ACTUAL_COUNTS.format(table="url_status_company")}) a
+        UNION ALL
+        SELECT kind, key, 0, row_count FROM {COUNTERS_TABLE}
+    ) t
+    GROUP BY kind, key
+    HAVING SUM(actual) <> SUM(counted)
+    ORDER BY kind, key
+"""
+
+# Net change per counter for the rows a statement touched; {changes} yields (status, user_id, n)
+_PG_DELTA = f"""
+        INSERT INTO {COUNTERS_TABLE} (kind, key, row_count)
+        SELECT kind, key, SUM(n)
+        FROM (
+            SELECT 'status' AS kind, status AS key, n FROM ({{changes}}) c
+            UNION ALL
+            SELECT 'user', user_id::text, n FROM ({{changes}}) c
+        ) d
+        GROUP BY kind, key
+        HAVING SUM(n) <> 0
+        ORDER BY kind, key  -- Same lock order in every writer, so concurrent loads can't deadlock
+        ON CONFLICT (kind, key) DO UPDATE SET row_count = {COUNTERS_TABLE}.row_count + EXCLUDED.row_count;
+"""
+
+_SQLITE_BUMP = f"""
+        INSERT INTO {COUNTERS_TABLE} (kind, key, row_count)
+        VALUES ('status', {{row}}.status, {{n}}), ('user', CAST({{row}}.user_id AS TEXT), {{n}})
+        ON CONFLICT (kind, key) DO UPDATE SET row_count = row_count + excluded.row_count;
+"""
+
+DDL = {
+    "postgres": [
+        f"""
+        CREATE TABLE IF NOT EXISTS {COUNTERS_TABLE} (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            row_count BIGINT NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION url_status_counters_apply() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_PG_DELTA.format(changes="SELECT status, user_id, 1 AS n FROM new_rows")}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {_PG_DELTA.format(changes="SELECT status, user_id, 1 AS n FROM new_rows "
+                                          "UNION ALL SELECT status, user_id, -1 FROM old_rows")}
+            ELSIF TG_OP = 'DELETE' THEN
+                {_PG_DELTA.format(changes="SELECT status, user_id, -1 AS n FROM old_rows")}
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM {COUNTERS_TABLE};
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        *(f"DROP TRIGGER IF EXISTS {name} ON url_status_company" for name in COUNTER_TRIGGERS),
+        """
+        CREATE TRIGGER url_status_counters_insert AFTER INSERT ON url_status_company
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION url_status_counters_apply()
+        """,
+        """
+        CREATE TRIGGER url_status_counters_update AFTER UPDATE ON url_status_company
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION url_status_counters_apply()
+        """,
+        """
+        CREATE TRIGGER url_status_counters_delete AFTER DELETE ON url_status_company
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION url_status_counters_apply()
+        """,
+        """
+        CREATE TRIGGER url_status_counters_truncate AFTER TRUNCATE ON url_status_company
+        FOR EACH STATEMENT EXECUTE FUNCTION url_status_counters_apply()
+        """,
+    ],
+    "sqlite": [
+        f"""
+        CREATE TABLE IF NOT EXISTS {COUNTERS_TABLE} (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS url_status_counters_insert {{timing}} INSERT ON url_status_company
+        BEGIN
+            {_SQLITE_BUMP.format(row="NEW", n=1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS url_status_counters_update
+        {{timing}} UPDATE OF status, user_id ON url_status_company
+        WHEN OLD.status IS NOT NEW.status OR OLD.user_id IS NOT NEW.user_id
+        BEGIN
+            {_SQLITE_BUMP.format(row="OLD", n=-1)}
+            {_SQLITE_BUMP.format(row="NEW", n=1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS url_status_counters_delete {{timing}} DELETE ON url_status_company
+        BEGIN
+            {_SQLITE_BUMP.format(row="OLD", n=-1)}
+        END
+        """,
+    ],
+}
+
+
+def counters_exist(conn, backend: str) -> bool:
+    """Whether the counters table has been built"""
+    cursor = conn.cursor()
+    if backend == "postgres":
+        cursor.execute(f"SELECT to_regclass('{COUNTERS_TABLE}') IS NOT NULL")
+    else:
+        cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = '{COUNTERS_TABLE}'")
+    return bool(cursor.fetchone()[0])
+
+
+def drop_counter_triggers(conn, backend: str):
+    """Stop maintaining the counters (bulk loads); rebuild_counters puts the triggers back"""
+    cursor = conn.cursor()
+    for name in COUNTER_TRIGGERS:
+        if backend == "postgres":
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name} ON url_status_company")
+        elif name != "url_status_counters_truncate":
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.commit()
+
+
+def install_counter_triggers(conn, backend: str):
+    """Create the counters table and (re)create its triggers, in the caller's transaction"""
+    cursor = conn.cursor()
+    timing = "AFTER"
+    if backend == "sqlite":
+        # Behind the month-shard view (db/partitions.py) the triggers have to be INSTEAD OF
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = 'url_status_company'")
+        if (cursor.fetchone() or ("table",))[0] == "view":
+            timing = "INSTEAD OF"
+    for statement in DDL[backend]:
+        cursor.execute(statement.replace("{timing}", timing))
+
+
+def rebuild_counters(conn, backend: str) -> int:
+    """Install the counters table and triggers and recount from scratch; returns the number of counters"""
+    install_counter_triggers(conn, backend)
+    cursor = conn.cursor()
+    if backend == "postgres":
+        # Readers carry on; writers wait, so no row lands between the recount and the commit
+        cursor.execute("LOCK TABLE url_status_company IN SHARE MODE")
+    cursor.execute(f"DELETE FROM {COUNTERS_TABLE}")
+    cursor.execute(f"INSERT INTO {COUNTERS_TABLE} (kind, key, row_count) "
+                   f"{ACTUAL_COUNTS.format(table='url_status_company')}")
+    conn.commit()
+
+    cursor.execute(f"SELECT COUNT(*) FROM {COUNTERS_TABLE}")
+    return cursor.fetchone()[0]
+
+
+def discount_table(conn, backend: str, table: str):
+    """
+    Take a table's rows off the counters, in the caller's transaction
+    For partitions that are detached or dropped, which no DELETE trigger sees
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        f"INSERT INTO {COUNTERS_TABLE} (kind, key, row_count) "
+        f"SELECT kind, key, -row_count FROM ({ACTUAL_COUNTS.format(table=table)}) t WHERE true "
+        f"ON CONFLICT (kind, key) DO UPDATE SET row_count = {COUNTERS_TABLE}.row_count + excluded.row_count"
+    )
+
+
+def reconcile_counters(conn) -> list:
+    """
+    Compare the counters against the base table
+    Returns a list of (kind, key, actual, counted) mismatches
+    """
+    cursor = conn.cursor()
+    cursor.execute(RECONCILE_QUERY)
+    return [(kind, key, int(actual), int(counted)) for kind, key, actual, counted in cursor.fetchall()]
+
+
+def fetch_counter_totals(conn, backend: str) -> dict:
+    """Status distribution, total and unique users from the counters, or None if they were never built"""
+    if not counters_exist(conn, backend):
+        return None
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT kind, key, row_count FROM {COUNTERS_TABLE} WHERE row_count > 0 ORDER BY kind, key")
+    rows = cursor.fetchall()
+
+    status_distribution = [{'status': key, 'count': int(count)} for kind, key, count in rows if kind == 'status']
+    return {
+        'total_records': sum(item['count'] for item in status_distribution),
+        'status_distribution': status_distribution,
+        'unique_users': sum(1 for kind, _, _ in rows if kind == 'user'),
+    }
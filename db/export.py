@@ -0,0 +1,149 @@
+"""
+Streaming exports of a user's url_status_company rows (CSV or Parquet)
+
+Rows are read in id order through fetch_chunks (a server-side cursor on
+PostgreSQL, SQLite's lazy cursor) EXPORT_CHUNK_ROWS at a time, and each
+chunk is encoded and handed on before the next is read, so an export
+holds one chunk however many rows it covers. CSV can be gzipped as it
+streams; Parquet gets one row group per chunk and the footer at the end.
+
+An export covers the ids in (after_id, max_id] with compute_datetime at or
+after the period's cutoff. Both ends are pinned when the export starts
+(max_id at the user's highest id, the cutoff at now minus the period's
+lookback), so an interrupted download resumes with after_id set to the
+last id received and the same max_id and cutoff: a cutoff recomputed
+later would skip the rows that fell out of the rolling window meanwhile.
+Each export opens its own connection: a long download must not hold one
+of the pool's connections the dashboard needs.
+"""
+import io
+import zlib
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import EXPORT_CHUNK_ROWS
+from db.analytics import fetch_chunks
+from db.snapshot import COLUMNS, SCHEMA, rows_frame
+from utils.kpis import get_period_cutoff
+
+EXPORT_SCHEMA = SCHEMA.remove(SCHEMA.get_field_index('month'))
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+_PARAM = {"postgres": "%({})s", "sqlite": ":{}"}
+
+
+def _connect(backend: str):
+    if backend == "sqlite":
+        from db.sqlite_queries import _connect as connect_sqlite
+        # The response is read chunk by chunk from the threadpool, not always on the same thread
+        return connect_sqlite(check_same_thread=False)
+    from db.connection import get_db_connection
+    return get_db_connection()
+
+
+def export_max_id(backend: str, user_id: int) -> int:
+    """The user's highest id (0 if the user has no rows): the default end of an export"""
+    conn = _connect(backend)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM url_status_company WHERE user_id = "
+                       f"{_PARAM[backend].format('user_id')}", {'user_id': user_id})
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def export_cutoff(period: str, pinned: str = None):
+    """The export's compute_datetime cutoff: one pinned by an earlier request (ISO format), else the period's now"""
+    if pinned:
+        return datetime.fromisoformat(pinned)
+    return get_period_cutoff(period)
+
+
+def export_frames(backend: str, user_id: int, cutoff, max_id: int, after_id: int = 0,
+                  chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """The user's rows from cutoff (None: all time) with after_id < id <= max_id, in id order, as DataFrames"""
+    p = _PARAM[backend].format
+    conditions = [f"user_id = {p('user_id')}", f"id > {p('after_id')}", f"id <= {p('max_id')}"]
+    params = {'user_id': user_id, 'after_id': after_id, 'max_id': max_id}
+    if cutoff is not None:
+        # The dashboard's period filter; SQLite compares the text timestamps
+        conditions.append(f"compute_datetime >= {p('cutoff')}")
+        params['cutoff'] = cutoff.strftime('%Y-%m-%d %H:%M:%S') if backend == "sqlite" else cutoff
+    query = f"SELECT {', '.join(COLUMNS)} FROM url_status_company WHERE {' AND '.join(conditions)} ORDER BY id"
+
+    conn = _connect(backend)
+    try:
+        for rows in fetch_chunks(conn, backend, query, params, chunk_rows, name="row_export"):
+            yield rows_frame(rows)
+    finally:
+        conn.close()
+
+
+def csv_chunks(frames, gzip: bool = False):
+    """CSV bytes (header first), one piece per frame; gzip compresses the whole stream as one gzip file"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+    header = True
+    for df in frames:
+        data = df.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+        data = compressor.compress(data) if compressor else data
+        if data:
+            yield data
+    if header:
+        # No rows: still a valid file with the column names
+        data = ",".join(COLUMNS).encode("utf-8") + b"\n"
+        yield compressor.compress(data) + compressor.flush() if compressor else data
+    elif compressor:
+        yield compressor.flush()
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file that hands over what was written since the last drain()"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def parquet_chunks(frames, compression: str = "snappy"):
+    """Parquet bytes, a row group per frame, then the footer"""
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, EXPORT_SCHEMA, compression=compression)
+    try:
+        for df in frames:
+            writer.write_table(pa.Table.from_pandas(df, schema=EXPORT_SCHEMA, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(backend: str, user_id: int, cutoff, fmt: str, max_id: int, after_id: int = 0,
+                  gzip: bool = False):
+    """The encoded export as a stream of bytes; with gzip, CSV is gzipped and Parquet compressed with gzip"""
+    frames = export_frames(backend, user_id, cutoff, max_id, after_id)
+    if fmt == "parquet":
+        return parquet_chunks(frames, "gzip" if gzip else "snappy")
+    return csv_chunks(frames, gzip)
@@ -0,0 +1,178 @@
+"""
+Index advisor: EXPLAIN every dashboard query and flag sequential scans
+
+Runs the query functions from db/queries.py (PostgreSQL) or
+db/sqlite_queries.py (SQLite) against the real database with their
+connections wrapped, so each statement they issue is also EXPLAINed.
+Queries are captured exactly as the app sends them, parameters included.
+"""
+import re
+import sqlite3
+import warnings
+from contextlib import contextmanager
+from unittest import mock
+from config import DEFAULT_USER_ID
+
+# (label, function name in db/queries.py, args); SQLite functions carry a _sqlite suffix
+CHECKS = [
+    ("KPIs (monthly)", "fetch_user_kpis", lambda user_id: (user_id, "monthly")),
+    ("KPIs (overall)", "fetch_user_kpis", lambda user_id: (user_id, "overall")),
+    ("Latest entries", "fetch_latest_entries_page", lambda user_id: (user_id, "monthly", 20)),
+    ("Latest entries (status filter)", "fetch_latest_entries_page",
+     lambda user_id: (user_id, "overall", 20, None, "next", {'status': 'error'})),
+    ("Health check", "fetch_health_check_data", lambda user_id: ()),
+    ("User has data", "user_has_data", lambda user_id: (user_id,)),
+    ("User data", "fetch_user_data", lambda user_id: (user_id,)),
+    ("System stats", "get_system_stats", lambda user_id: ()),
+]
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: USING (COVERING )?INDEX (\w+))?")
+
+
+class _Recorder:
+    """Collects (sql, plan lines, seq scans) for every statement a check runs"""
+
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.statements = []
+
+    def explain(self, raw_conn, sql: str, params):
+        if not is_explainable(sql):
+            return
+        plan, scans = explain(raw_conn, self.backend, sql, params)
+        self.statements.append({'sql': " ".join(sql.split()), 'plan': plan, 'seq_scans': scans})
+
+
+def is_explainable(sql: str) -> bool:
+    return sql.lstrip().upper().startswith(("SELECT", "WITH"))
+
+
+def explain(raw_conn, backend: str, sql: str, params) -> tuple:
+    """(plan lines, full table scans) of a SELECT, run on the statement's own connection"""
+    # A plain cursor, so the EXPLAIN is not itself recorded as a statement (db/traced.py)
+    if backend == "sqlite":
+        cursor = sqlite3.Cursor(raw_conn)
+    else:
+        import psycopg2.extensions
+        cursor = raw_conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    args = (params,) if params is not None else ()
+    try:
+        if backend == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, *args)
+            rows = cursor.fetchall()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            return sqlite_plan(rows, {name for (name,) in cursor.fetchall()})
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, *args)
+        return postgres_plan(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+class _ExplainingCursor:
+    def __init__(self, cursor, raw_conn, recorder):
+        self._cursor = cursor
+        self._raw_conn = raw_conn
+        self._recorder = recorder
+
+    def execute(self, sql, params=None):
+        self._recorder.explain(self._raw_conn, sql, params)
+        if params is None:
+            self._cursor.execute(sql)
+        else:
+            self._cursor.execute(sql, params)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _ExplainingConnection:
+    def __init__(self, conn, recorder):
+        self._conn = conn
+        self._recorder = recorder
+
+    def cursor(self, *args, **kwargs):
+        return _ExplainingCursor(self._conn.cursor(*args, **kwargs), self._conn, self._recorder)
+
+    def execute(self, sql, params=None):
+        return self.cursor().execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def sqlite_plan(rows, tables: set) -> tuple:
+    """Plan lines and full table scans from EXPLAIN QUERY PLAN rows (id, parent, notused, detail)"""
+    plan, scans = [], []
+    for row in rows:
+        detail = row[-1]
+        plan.append(detail)
+        match = _SQLITE_SCAN.match(detail)
+        # SEARCH is a keyed lookup; SCAN reads the whole table or index. CTEs show up as SCAN too
+        if match and match.group(1) in tables:
+            scans.append(match.group(1) + (f" (whole index {match.group(3)})" if match.group(3) else ""))
+    return plan, scans
+
+
+def postgres_plan(plan_json) -> tuple:
+    """Plan lines and Seq Scan relations from EXPLAIN (FORMAT JSON) output"""
+    plan, scans = [], []
+
+    def walk(node, depth):
+        line = node['Node Type']
+        if 'Relation Name' in node:
+            line += f" on {node['Relation Name']}"
+        if 'Index Name' in node:
+            line += f" using {node['Index Name']}"
+        plan.append("  " * depth + f"{line} (rows={node.get('Plan Rows', '?')})")
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(node.get('Relation Name', '?'))
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan_json[0]['Plan'], 0)
+    return plan, scans
+
+
+@contextmanager
+def _explaining(backend: str, recorder: _Recorder):
+    """Wrap the connections the query module opens for the duration of the block"""
+    if backend == "sqlite":
+        from db import sqlite_queries
+        original = sqlite_queries._connect
+        # Only the connection factory is swapped: the module keeps using sqlite3 (e.g. sqlite3.OperationalError)
+        with mock.patch.object(sqlite_queries, "_connect",
+                               lambda **kwargs: _ExplainingConnection(original(**kwargs), recorder)):
+            yield sqlite_queries
+    else:
+        from db import queries
+        original = queries.db_connection
+
+        @contextmanager
+        def explaining_connection():
+            with original() as conn:
+                yield _ExplainingConnection(conn, recorder)
+
+        with mock.patch.object(queries, "db_connection", explaining_connection):
+            yield queries
+
+
+def run_advisor(backend: str, user_id: int = DEFAULT_USER_ID) -> list:
+    """EXPLAIN every check; returns [{label, statements, error}]"""
+    results = []
+    for label, func_name, make_args in CHECKS:
+        recorder = _Recorder(backend)
+        error = None
+        with _explaining(backend, recorder) as module, warnings.catch_warnings():
+            # pandas warns about the wrapped (non-sqlite3, non-SQLAlchemy) connection
+            warnings.simplefilter("ignore", UserWarning)
+            func = getattr(module, func_name + ("_sqlite" if backend == "sqlite" else ""))
+            try:
+                func(*make_args(user_id))
+            except Exception as e:
+                error = str(e)
+        results.append({'label': label, 'statements': recorder.statements, 'error': error})
+    return results
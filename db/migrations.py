@@ -0,0 +1,168 @@
+"""
+Schema migrations for url_status_company indexes
+
+Every dashboard query filters on user_id and a compute_datetime range, then
+groups by status, scraper_status and emergency (plus last_update for the
+processing time). The composite indexes below cover those columns, so the
+queries read only the user's slice of the index and never the table.
+
+Applied migrations are recorded in schema_migrations; run them with
+    python manage_indexes.py migrate [--backend sqlite]
+"""
+from datetime import datetime
+from config import HEALTH_CHECK_USER_ID
+from db.partitions import is_partitioned, shard_statements
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# (name, {backend: [statements]}) in the order they are applied.
+# PostgreSQL statements run in autocommit so CREATE INDEX CONCURRENTLY doesn't block writes
+# (a failed concurrent build leaves an INVALID index behind: drop it and migrate again);
+# SQLite has no INCLUDE, so covered columns go at the end of the key instead.
+MIGRATIONS = [
+    ("001_user_compute_datetime_covering", {
+        "postgres": [
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_compute_datetime_covering
+            ON url_status_company (user_id, compute_datetime)
+            INCLUDE (status, scraper_status, emergency, last_update)
+            """,
+        ],
+        "sqlite": [
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_compute_datetime_covering
+            ON url_status_company (user_id, compute_datetime, status, scraper_status, emergency, last_update)
+            """,
+        ],
+    }),
+    ("002_user_compute_datetime_id", {
+        # Keyset pagination of the Latest Entries table
+        "postgres": [
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_compute_datetime_id
+            ON url_status_company (user_id, compute_datetime DESC, id DESC)
+            """,
+        ],
+        "sqlite": [
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_compute_datetime_id
+            ON url_status_company (user_id, compute_datetime DESC, id DESC)
+            """,
+        ],
+    }),
+    ("003_health_check_partial", {
+        # Only the monitoring user's rows; the health check table reads the newest few
+        "postgres": [
+            f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_health_check_recent
+            ON url_status_company (compute_datetime DESC)
+            INCLUDE (linkedin_url, status, last_update, scraper_status)
+            WHERE user_id = {int(HEALTH_CHECK_USER_ID)}
+            """,
+        ],
+        "sqlite": [
+            f"""
+            CREATE INDEX IF NOT EXISTS idx_health_check_recent
+            ON url_status_company (compute_datetime DESC, linkedin_url, status, last_update, scraper_status)
+            WHERE user_id = {int(HEALTH_CHECK_USER_ID)}
+            """,
+        ],
+    }),
+    ("004_analyze", {
+        # Fresh statistics so the planner picks the new indexes
+        "postgres": ["ANALYZE url_status_company"],
+        "sqlite": ["ANALYZE url_status_company"],
+    }),
+    ("005_compute_datetime", {
+        # System health "last 24 hours" count across all users
+        "postgres": [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_compute_datetime ON url_status_company (compute_datetime)",
+        ],
+        "sqlite": [
+            "CREATE INDEX IF NOT EXISTS idx_compute_datetime ON url_status_company (compute_datetime)",
+        ],
+    }),
+    ("006_analyze", {
+        "postgres": ["ANALYZE url_status_company"],
+        "sqlite": ["ANALYZE url_status_company"],
+    }),
+]
+
+_DDL = {
+    "postgres": f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """,
+    "sqlite": f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            name TEXT PRIMARY KEY,
+            applied_at TEXT NOT NULL
+        )
+    """,
+}
+_PARAM = {"postgres": "%s", "sqlite": "?"}
+
+
+def ensure_migrations_table(conn, backend: str):
+    """Create the schema_migrations table if it doesn't exist"""
+    cursor = conn.cursor()
+    cursor.execute(_DDL[backend])
+    conn.commit()
+
+
+def get_applied_migrations(conn) -> dict:
+    """Return {name: applied_at} for every recorded migration"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT name, applied_at FROM {MIGRATIONS_TABLE}")
+    return dict(cursor.fetchall())
+
+
+def get_pending_migrations(conn, backend: str) -> list:
+    """Names of the migrations that have not been applied yet"""
+    ensure_migrations_table(conn, backend)
+    applied = get_applied_migrations(conn)
+    return [name for name, _ in MIGRATIONS if name not in applied]
+
+
+def _for_layout(conn, backend: str, statement: str, partitioned: bool) -> list:
+    """
+    A migration statement as it runs on a partitioned table: PostgreSQL can't
+    build an index CONCURRENTLY on a partitioned parent, and SQLite runs it once per shard
+    """
+    if not partitioned:
+        return [statement]
+    if backend == "postgres":
+        return [statement.replace("CONCURRENTLY ", "")]
+    return shard_statements(conn, statement)
+
+
+def apply_migrations(conn, backend: str) -> list:
+    """Apply pending migrations in order; returns the names applied"""
+    pending = get_pending_migrations(conn, backend)
+    steps = dict(MIGRATIONS)
+    applied = []
+
+    partitioned = bool(pending) and is_partitioned(conn, backend)
+    if backend == "postgres":
+        conn.commit()
+        conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        for name in pending:
+            for statement in steps[name][backend]:
+                for sql in _for_layout(conn, backend, statement, partitioned):
+                    cursor.execute(sql)
+            now = datetime.now()
+            cursor.execute(
+                f"INSERT INTO {MIGRATIONS_TABLE} (name, applied_at) VALUES ({_PARAM[backend]}, {_PARAM[backend]})",
+                (name, now if backend == "postgres" else now.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            if backend == "sqlite":
+                conn.commit()
+            applied.append(name)
+    finally:
+        if backend == "postgres":
+            conn.autocommit = False
+    return applied
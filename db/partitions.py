@@ -0,0 +1,388 @@
+"""
+Monthly partitions of url_status_company on compute_datetime
+
+PostgreSQL: url_status_company becomes a declaratively range-partitioned
+table with one partition per month (url_status_company_2025_06) plus a
+DEFAULT partition. A period filter (compute_datetime >= cutoff) prunes the
+plan to the months it touches; psycopg2 sends the cutoff as a literal, so
+pruning happens at plan time.
+
+SQLite: one shard table per month with the same layout, behind a
+url_status_company view whose INSTEAD OF triggers route writes to the right
+shard. SQLite can't prune a view, so sqlite_source() builds the FROM clause
+from the shards a period touches.
+
+Rows for months without a partition land in the default partition; creating
+that month's partition moves them over. Partitions older than the retention
+window are detached and moved to the archive schema (PostgreSQL) or archive
+database (SQLite), or dropped.
+"""
+import re
+from datetime import date, datetime
+from config import PARTITION_MONTHS_AHEAD
+from db.counters import counters_exist, install_counter_triggers, discount_table, COUNTER_TRIGGERS
+
+PARENT = "url_status_company"
+DEFAULT_PARTITION = f"{PARENT}_default"
+UNPARTITIONED = f"{PARENT}_unpartitioned"
+ID_SEQUENCE_TABLE = f"{PARENT}_seq"  # SQLite: ids stay unique across shards
+ARCHIVE_SCHEMA = "archive"
+ARCHIVE_ALIAS = "archive"
+
+_MONTH_SUFFIX = re.compile(rf"^{PARENT}_(\d{{4}})_(\d{{2}})$")
+_INDEX_NAME = re.compile(r"^(CREATE (?:UNIQUE )?INDEX (?:IF NOT EXISTS )?)(\w+)", re.IGNORECASE)
+_PARENT_NAME = re.compile(rf"\b{PARENT}\b")
+
+
+def month_start(value) -> date:
+    """First day of the month a date or datetime falls in"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month:%Y_%m}"
+
+
+def partition_month(name: str):
+    """Month a partition holds, or None for the default partition"""
+    match = _MONTH_SUFFIX.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partitioned(conn, backend: str) -> bool:
+    """Whether url_status_company is partitioned (PostgreSQL) or sharded behind a view (SQLite)"""
+    cursor = conn.cursor()
+    if backend == "postgres":
+        cursor.execute(f"SELECT relkind FROM pg_class WHERE oid = to_regclass('{PARENT}')")
+        row = cursor.fetchone()
+        return row is not None and row[0] == 'p'
+    cursor.execute(f"SELECT type FROM sqlite_master WHERE name = '{PARENT}'")
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'view'
+
+
+def list_partitions(conn, backend: str) -> list:
+    """[{name, month, rows}] oldest first, default partition last; rows is an estimate on PostgreSQL"""
+    cursor = conn.cursor()
+    if backend == "postgres":
+        cursor.execute(f"""
+            SELECT c.relname, GREATEST(c.reltuples, 0)::bigint
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = '{PARENT}'::regclass
+        """)
+        rows = cursor.fetchall()
+    else:
+        rows = []
+        for name in _shard_names_sqlite(cursor):
+            cursor.execute(f"SELECT COUNT(*) FROM {name}")
+            rows.append((name, cursor.fetchone()[0]))
+
+    partitions = [{'name': name, 'month': partition_month(name), 'rows': count} for name, count in rows]
+    return sorted(partitions, key=lambda p: (p['month'] is None, p['month'] or date.min))
+
+
+def _shard_names_sqlite(cursor) -> list:
+    cursor.execute(f"SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '{PARENT}\\_%' ESCAPE '\\'")
+    names = [name for (name,) in cursor.fetchall() if partition_month(name) or name == DEFAULT_PARTITION]
+    return sorted(names, key=lambda name: (name == DEFAULT_PARTITION, name))  # Oldest first, default last
+
+
+def partitions_for_range(partitions: list, start=None) -> list:
+    """Names of the partitions that can hold rows with compute_datetime >= start (all if start is None)"""
+    first = month_start(start) if start is not None else None
+    return [p['name'] for p in partitions if first is None or p['month'] is None or p['month'] >= first]
+
+
+# --- PostgreSQL -------------------------------------------------------------
+
+def _create_partition_postgres(cursor, month: date):
+    """Attach a partition for one month, moving any rows the default partition holds for it"""
+    name, start, end = partition_name(month), month, add_months(month, 1)
+    cursor.execute(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(f"SELECT to_regclass('{DEFAULT_PARTITION}') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        # Statement triggers on the parent don't fire for a partition named directly: counters stay put
+        range_filter = "WHERE compute_datetime >= %(start)s AND compute_datetime < %(end)s"
+        cursor.execute(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} {range_filter}",
+                       {'start': start, 'end': end})
+        cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} {range_filter}", {'start': start, 'end': end})
+    # Matching indexes are created on the new partition as part of ATTACH
+    cursor.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM (%(start)s) TO (%(end)s)",
+                   {'start': start, 'end': end})
+
+
+def _partition_postgres(conn, ahead: int) -> int:
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MIN(compute_datetime), MAX(compute_datetime) FROM {PARENT}")
+    first, last = cursor.fetchone()
+    now = datetime.now()
+
+    # Index definitions to recreate on the new parent (unique ones can't omit the partition key)
+    cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", (PARENT,))
+    indexes = [(name, definition) for name, definition in cursor.fetchall()
+               if not definition.upper().startswith("CREATE UNIQUE")]
+
+    cursor.execute(f"ALTER TABLE {PARENT} RENAME TO {UNPARTITIONED}")
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", (UNPARTITIONED,))
+    for (name,) in cursor.fetchall():
+        cursor.execute(f"ALTER INDEX {name} RENAME TO {name[:50]}_unpartitioned")
+    for name in COUNTER_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name} ON {UNPARTITIONED}")
+
+    cursor.execute(
+        f"CREATE TABLE {PARENT} (LIKE {UNPARTITIONED} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE (compute_datetime)"
+    )
+    cursor.execute(
+        f"SELECT pg_get_serial_sequence('{UNPARTITIONED}', 'id'), a.attidentity FROM pg_attribute a "
+        f"WHERE a.attrelid = '{UNPARTITIONED}'::regclass AND a.attname = 'id'"
+    )
+    sequence, identity = cursor.fetchone() or (None, '')
+    if sequence and not identity:
+        # The serial default still points at the old table's sequence; keep it when that table is dropped
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT}.id")
+
+    cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT")
+    month = month_start(first or now)
+    last_month = add_months(month_start(max(last or now, now)), ahead)
+    created = 0
+    while month <= last_month:
+        _create_partition_postgres(cursor, month)
+        month = add_months(month, 1)
+        created += 1
+
+    # Load before indexing: one index build per partition instead of per-row index maintenance
+    cursor.execute(f"INSERT INTO {PARENT} SELECT * FROM {UNPARTITIONED}")
+    cursor.execute(f"ALTER TABLE {PARENT} ADD PRIMARY KEY (id, compute_datetime)")
+    for _, definition in indexes:
+        cursor.execute(definition)
+    cursor.execute(f"SELECT pg_get_serial_sequence('{PARENT}', 'id')")
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f"SELECT setval('{sequence}', COALESCE((SELECT MAX(id) FROM {PARENT}), 1))")
+
+    if counters_exist(conn, "postgres"):
+        install_counter_triggers(conn, "postgres")
+    cursor.execute(f"ANALYZE {PARENT}")
+    return created
+
+
+# --- SQLite -----------------------------------------------------------------
+
+def _columns_sqlite(cursor, table: str) -> list:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _copy_layout_sqlite(cursor, template: str, name: str):
+    """Create table `name` with the columns and indexes of `template`"""
+    template_suffix = template[len(PARENT):]  # "" for the original table, "_default" for the default shard
+    name_suffix = name[len(PARENT):]
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (template,))
+    cursor.execute(re.sub(rf"\b{template}\b", name, cursor.fetchone()[0], count=1))
+
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                   (template,))
+    for index, sql in cursor.fetchall():
+        base = index[:-len(template_suffix)] if template_suffix and index.endswith(template_suffix) else index
+        sql = _INDEX_NAME.sub(lambda m: m.group(1) + base + name_suffix, sql, count=1)
+        cursor.execute(re.sub(rf"\bON\s+\"?{template}\"?", f"ON {name}", sql, count=1))
+
+
+def _install_view_sqlite(conn):
+    """(Re)create the url_status_company view over every shard and the triggers that route writes"""
+    cursor = conn.cursor()
+    shards = _shard_names_sqlite(cursor)
+    monthly = [(name, f"{partition_month(name):%Y-%m}") for name in shards if name != DEFAULT_PARTITION]
+    columns = _columns_sqlite(cursor, DEFAULT_PARTITION)
+    values = ", ".join(f"COALESCE(NEW.id, (SELECT last_id FROM {ID_SEQUENCE_TABLE}))" if c == "id" else f"NEW.{c}"
+                       for c in columns)
+    month_of = "substr(NEW.compute_datetime, 1, 7)"
+
+    cursor.execute(f"DROP VIEW IF EXISTS {PARENT}")  # Drops its triggers too
+    cursor.execute(f"CREATE VIEW {PARENT} AS " + " UNION ALL ".join(f"SELECT * FROM {name}" for name in shards))
+
+    inserts = [f"INSERT INTO {name} ({', '.join(columns)}) SELECT {values} WHERE {month_of} = '{month}';"
+               for name, month in monthly]
+    known = ", ".join(f"'{month}'" for _, month in monthly) or "''"
+    inserts.append(f"INSERT INTO {DEFAULT_PARTITION} ({', '.join(columns)}) "
+                   f"SELECT {values} WHERE {month_of} NOT IN ({known});")
+    cursor.execute(f"""
+        CREATE TRIGGER {PARENT}_route_insert INSTEAD OF INSERT ON {PARENT}
+        BEGIN
+            UPDATE {ID_SEQUENCE_TABLE} SET last_id = MAX(last_id, COALESCE(NEW.id, last_id + 1));
+            {" ".join(inserts)}
+        END
+    """)
+
+    assignments = ", ".join(f"{c} = NEW.{c}" for c in columns if c != "id")
+    cursor.execute(f"""
+        CREATE TRIGGER {PARENT}_route_update INSTEAD OF UPDATE ON {PARENT}
+        BEGIN
+            SELECT RAISE(ABORT, 'compute_datetime cannot move a row to another month shard')
+            WHERE substr(OLD.compute_datetime, 1, 7) IS NOT {month_of};
+            {" ".join(f"UPDATE {name} SET {assignments} WHERE id = OLD.id;" for name in shards)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER {PARENT}_route_delete INSTEAD OF DELETE ON {PARENT}
+        BEGIN
+            {" ".join(f"DELETE FROM {name} WHERE id = OLD.id;" for name in shards)}
+        END
+    """)
+
+    if counters_exist(conn, "sqlite"):
+        install_counter_triggers(conn, "sqlite")
+
+
+def _create_shard_sqlite(cursor, month: date):
+    """Create one month's shard, moving any rows the default shard holds for it"""
+    name = partition_name(month)
+    _copy_layout_sqlite(cursor, DEFAULT_PARTITION, name)
+    month_filter = f"WHERE substr(compute_datetime, 1, 7) = '{month:%Y-%m}'"
+    cursor.execute(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} {month_filter}")
+    cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} {month_filter}")
+
+
+def _index_shards_for_rollup_sqlite(conn):
+    """Put the rollup refresh's last_update index on every shard, if the rollup is in use"""
+    from db.rollup import LAST_UPDATE_INDEX, rollup_exists  # db.rollup imports this module
+    if rollup_exists(conn, "sqlite"):
+        cursor = conn.cursor()
+        for statement in shard_statements(conn, LAST_UPDATE_INDEX):
+            cursor.execute(statement)
+
+
+def _partition_sqlite(conn, ahead: int) -> int:
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT DISTINCT substr(compute_datetime, 1, 7) FROM {PARENT}")
+    months = {date(int(m[:4]), int(m[5:7]), 1) for (m,) in cursor.fetchall() if m}
+    this_month = month_start(datetime.now())
+    months |= {add_months(this_month, n) for n in range(ahead + 1)}
+
+    cursor.execute(f"ALTER TABLE {PARENT} RENAME TO {UNPARTITIONED}")
+    _copy_layout_sqlite(cursor, UNPARTITIONED, DEFAULT_PARTITION)
+    for month in sorted(months):
+        name = partition_name(month)
+        _copy_layout_sqlite(cursor, UNPARTITIONED, name)
+        cursor.execute(f"INSERT INTO {name} SELECT * FROM {UNPARTITIONED} "
+                       f"WHERE substr(compute_datetime, 1, 7) = '{month:%Y-%m}'")
+
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {ID_SEQUENCE_TABLE} (last_id INTEGER NOT NULL)")
+    cursor.execute(f"DELETE FROM {ID_SEQUENCE_TABLE}")
+    cursor.execute(f"INSERT INTO {ID_SEQUENCE_TABLE} SELECT COALESCE(MAX(id), 0) FROM {UNPARTITIONED}")
+    cursor.execute(f"DROP TABLE {UNPARTITIONED}")  # Its counter triggers go with it
+    _install_view_sqlite(conn)
+    _index_shards_for_rollup_sqlite(conn)
+    cursor.execute("ANALYZE")
+    return len(months)
+
+
+def sqlite_source(conn, start=None) -> str:
+    """
+    FROM clause for rows with compute_datetime >= start: the plain table or
+    view, or a UNION ALL over only the shards that can hold such rows
+    """
+    if start is None or not is_partitioned(conn, "sqlite"):
+        return PARENT
+    partitions = [{'name': name, 'month': partition_month(name)} for name in _shard_names_sqlite(conn.cursor())]
+    names = partitions_for_range(partitions, start)
+    if len(names) == len(partitions):
+        return PARENT
+    return "(" + " UNION ALL ".join(f"SELECT * FROM {name}" for name in names) + f") AS {PARENT}"
+
+
+def shard_statements(conn, statement: str) -> list:
+    """A statement against url_status_company rewritten for each shard (index names get the shard suffix)"""
+    shards = _shard_names_sqlite(conn.cursor())
+    return [
+        _PARENT_NAME.sub(name, _INDEX_NAME.sub(lambda m: m.group(1) + m.group(2) + name[len(PARENT):],
+                                               statement.strip(), count=1))
+        for name in shards
+    ]
+
+
+# --- Both backends ----------------------------------------------------------
+
+def partition_table(conn, backend: str, ahead: int = PARTITION_MONTHS_AHEAD) -> int:
+    """
+    Convert url_status_company to monthly partitions (PostgreSQL) or shards (SQLite)
+    Copies every row and holds an exclusive lock on the table while it runs.
+    Returns the number of monthly partitions created, 0 if already partitioned
+    """
+    if is_partitioned(conn, backend):
+        return 0
+    created = _partition_postgres(conn, ahead) if backend == "postgres" else _partition_sqlite(conn, ahead)
+    conn.commit()
+    return created
+
+
+def ensure_partitions(conn, backend: str, ahead: int = PARTITION_MONTHS_AHEAD) -> list:
+    """Create the partitions for this month and the next `ahead` months; returns the names created"""
+    existing = {p['name'] for p in list_partitions(conn, backend)}
+    this_month = month_start(datetime.now())
+    missing = [m for m in (add_months(this_month, n) for n in range(ahead + 1)) if partition_name(m) not in existing]
+
+    cursor = conn.cursor()
+    for month in missing:
+        if backend == "postgres":
+            _create_partition_postgres(cursor, month)
+        else:
+            _create_shard_sqlite(cursor, month)
+    if missing and backend == "sqlite":
+        _install_view_sqlite(conn)
+        _index_shards_for_rollup_sqlite(conn)
+    conn.commit()
+    return [partition_name(m) for m in missing]
+
+
+def detach_partitions(conn, backend: str, keep_months: int, drop: bool = False, archive_path: str = None) -> list:
+    """
+    Detach the monthly partitions that end before the last `keep_months` months
+    They move to the archive schema (PostgreSQL) or archive_path database (SQLite),
+    or are dropped with drop=True. Returns the names detached
+    """
+    if backend == "sqlite" and not drop and not archive_path:
+        # ATTACH of NULL or '' opens a temporary database: the archived shards would vanish with the connection
+        raise ValueError("archive_path is required to archive SQLite shards (or pass drop=True)")
+    cutoff = add_months(month_start(datetime.now()), -keep_months)
+    old = [p['name'] for p in list_partitions(conn, backend) if p['month'] is not None and p['month'] < cutoff]
+    if not old:
+        return []
+
+    cursor = conn.cursor()
+    if backend == "sqlite" and not drop:
+        conn.commit()  # ATTACH can't run inside a transaction
+        cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_ALIAS}", (archive_path,))
+    try:
+        has_counters = counters_exist(conn, backend)
+        for name in old:
+            if has_counters:
+                discount_table(conn, backend, name)
+            if backend == "postgres":
+                cursor.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+                if drop:
+                    cursor.execute(f"DROP TABLE {name}")
+                else:
+                    cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+                    cursor.execute(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}")
+            else:
+                if not drop:
+                    cursor.execute(f"CREATE TABLE {ARCHIVE_ALIAS}.{name} AS SELECT * FROM main.{name}")
+                cursor.execute(f"DROP TABLE main.{name}")
+        if backend == "sqlite":
+            _install_view_sqlite(conn)
+        conn.commit()
+    except BaseException:
+        # Don't leave the counter updates of the partitions done so far pending on the caller's connection
+        conn.rollback()
+        raise
+    finally:
+        if backend == "sqlite" and not drop:
+            cursor.execute(f"DETACH DATABASE {ARCHIVE_ALIAS}")
+    return old
@@ -2,36 +2,73 @@
 Database query functions
 """
 import pandas as pd
-from db.connection import get_db_connection
-from config import HEALTH_CHECK_USER_ID, HEALTH_CHECK_ENTRIES_LIMIT
+from db.connection import db_connection
+from db.rollup import fetch_user_kpis_rollup
+from db.counters import fetch_counter_totals
+from db.snapshot import snapshot_kpi_rows
+from db.analytics import fetch_kpi_rows_pandas, stream_user_kpis
+from config import (
+    HEALTH_CHECK_USER_ID, HEALTH_CHECK_ENTRIES_LIMIT, MAX_PROCESSING_TIME, PROCESSING_TIME_BINS,
+    USE_DAILY_ROLLUP, USE_SYSTEM_COUNTERS, SYSTEM_STATS_APPROXIMATE, USE_PARQUET_SNAPSHOT, SNAPSHOT_PERIODS,
+    ANALYTICS_ENGINE
+)
+from utils.kpis import PROCESSING_BIN_WIDTH, get_period_cutoff, build_kpi_result, merge_kpi_rows
+from utils.pagination import clean_filters, decode_cursor, build_page
+from utils.frames import USER_DATA_COLUMNS, read_frame
 
-
-def fetch_user_data(user_id: int) -> pd.DataFrame:
-    """Fetch all data for a specific user"""
-    conn = get_db_connection()
-    query = """
+# Single scan over the user's rows, one grouping set per dashboard aggregate
+USER_KPIS_QUERY = """
+    WITH filtered AS (
         SELECT
-            compute_datetime,
-            linkedin_url,
             status,
-            last_update,
-            user_id,
-            emergency,
             scraper_status,
-            ticker_eod,
-            recycled_datetime_task,
-            id
+            emergency,
+            compute_datetime::date AS day,
+            EXTRACT(EPOCH FROM (last_update - compute_datetime))::float8 / 3600.0 AS processing_time
+        FROM url_status_company
+        WHERE user_id = %(user_id)s {period_filter}
+    ),
+    bucketed AS (
+        SELECT
+            *,
+            CASE WHEN processing_time > 0 AND processing_time <= %(max_hours)s
+                 THEN LEAST(FLOOR(processing_time / %(bin_width)s)::int, %(last_bin)s)
+            END AS bucket
+        FROM filtered
+    )
+    SELECT
+        CASE GROUPING(status, scraper_status, day, bucket)
+            WHEN 15 THEN 'total'
+            WHEN 7 THEN 'status'
+            WHEN 11 THEN 'scraper_status'
+            WHEN 13 THEN 'day'
+            WHEN 14 THEN 'bucket'
+        END AS kind,
+        COALESCE(status, scraper_status, day::text, bucket::text) AS key,
+        COUNT(*) AS count,
+        COUNT(*) FILTER (WHERE status = 'done') AS done,
+        COUNT(*) FILTER (WHERE emergency) AS emergency,
+        COUNT(*) FILTER (WHERE bucket IS NOT NULL) AS valid_count,
+        SUM(processing_time) FILTER (WHERE bucket IS NOT NULL) AS valid_sum
+    FROM bucketed
+    GROUP BY GROUPING SETS ((), (status), (scraper_status), (day), (bucket))
+"""
+
+
+def fetch_user_data(user_id: int, columns=USER_DATA_COLUMNS) -> pd.DataFrame:
+    """Fetch all data for a specific user (compact dtypes, see utils.frames)"""
+    query = f"""
+        SELECT {', '.join(columns)}
         FROM url_status_company
         WHERE user_id = %s
     """
-    df = pd.read_sql_query(query, conn, params=(user_id,))
-    conn.close()
+    with db_connection() as conn:
+        df = read_frame('user_data', query, conn, params=(user_id,))
     return df
 
 
 def fetch_health_check_data() -> pd.DataFrame:
     """Fetch health check data from monitoring user"""
-    conn = get_db_connection()
     query = """
         SELECT
             compute_datetime,
@@ -44,47 +81,208 @@ def fetch_health_check_data() -> pd.DataFrame:
         ORDER BY compute_datetime DESC
         LIMIT %s
     """
-    df = pd.read_sql_query(query, conn, params=(HEALTH_CHECK_USER_ID, HEALTH_CHECK_ENTRIES_LIMIT))
-    conn.close()
+    with db_connection() as conn:
+        df = read_frame('health_check', query, conn, params=(HEALTH_CHECK_USER_ID, HEALTH_CHECK_ENTRIES_LIMIT))
     return df
 
 
-def get_system_stats() -> dict:
-    """Get overall system statistics"""
-    conn = get_db_connection()
+# All four system statistics in one scan: a row per status plus a grand total row (is_total = 1)
+SYSTEM_STATS_QUERY = """
+    SELECT
+        status,
+        GROUPING(status) AS is_total,
+        COUNT(*) AS count,
+        COUNT(*) FILTER (WHERE compute_datetime >= NOW() - INTERVAL '24 hours') AS recent,
+        COUNT(DISTINCT user_id) AS users
+    FROM url_status_company
+    GROUP BY GROUPING SETS ((status), ())
+"""
+
+# Planner statistics (from the last ANALYZE / autovacuum) instead of counting rows
+SYSTEM_STATS_ESTIMATE_QUERY = """
+    SELECT
+        c.reltuples::bigint AS total,
+        (SELECT most_common_vals::text::text[] FROM pg_stats
+         WHERE tablename = 'url_status_company' AND attname = 'status') AS status_values,
+        (SELECT most_common_freqs FROM pg_stats
+         WHERE tablename = 'url_status_company' AND attname = 'status') AS status_freqs,
+        (SELECT n_distinct FROM pg_stats
+         WHERE tablename = 'url_status_company' AND attname = 'user_id') AS users_n_distinct
+    FROM pg_class c
+    WHERE c.oid = 'url_status_company'::regclass
+"""
+
+# Index range scan on idx_compute_datetime; cheap even when the table is huge
+RECENT_ACTIVITY_QUERY = """
+    SELECT COUNT(*) FROM url_status_company WHERE compute_datetime >= NOW() - INTERVAL '24 hours'
+"""
 
-    # Total records
-    total_query = "SELECT COUNT(*) as total FROM url_status_company"
-    total_df = pd.read_sql_query(total_query, conn)
-    total_records = total_df['total'].iloc[0]
 
-    # Status distribution
-    status_query = """
-        SELECT status, COUNT(*) as count
-        FROM url_status_company
-        GROUP BY status
+def get_system_stats(approximate: bool = SYSTEM_STATS_APPROXIMATE) -> dict:
+    """Get overall system statistics (approximate: totals from planner statistics, no full scan)"""
+    if USE_SYSTEM_COUNTERS:
+        stats = _get_system_stats_counters()
+        if stats is not None:
+            return stats
+
+    if approximate:
+        stats = _get_system_stats_estimate()
+        if stats is not None:
+            return stats
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SYSTEM_STATS_QUERY)
+        rows = cursor.fetchall()
+
+    status_distribution = [{'status': status, 'count': count}
+                           for status, is_total, count, _, _ in rows if not is_total]
+    total = next((row for row in rows if row[1]), (None, 1, 0, 0, 0))
+    return {
+        'total_records': total[2],
+        'status_distribution': status_distribution,
+        'recent_activity': total[3],
+        'unique_users': total[4],
+        'approximate': False,
+    }
+
+
+def _get_system_stats_counters():
+    """Exact system statistics from the counters table, or None if it was never built"""
+    with db_connection() as conn:
+        stats = fetch_counter_totals(conn, "postgres")
+        if stats is None:
+            return None
+        cursor = conn.cursor()
+        cursor.execute(RECENT_ACTIVITY_QUERY)
+        stats['recent_activity'] = cursor.fetchone()[0]
+    stats['approximate'] = False
+    return stats
+
+
+def _get_system_stats_estimate():
+    """System statistics from pg_class/pg_stats, or None if the table was never analyzed"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SYSTEM_STATS_ESTIMATE_QUERY)
+        total, status_values, status_freqs, users_n_distinct = cursor.fetchone()
+        if total is None or total < 0 or not status_values:
+            return None
+        cursor.execute(RECENT_ACTIVITY_QUERY)
+        recent = cursor.fetchone()[0]
+
+    # Negative n_distinct is a fraction of the row count
+    unique_users = users_n_distinct if users_n_distinct >= 0 else -users_n_distinct * total
+    return {
+        'total_records': int(total),
+        'status_distribution': [{'status': status, 'count': int(round(freq * total))}
+                                for status, freq in zip(status_values, status_freqs)],
+        'recent_activity': recent,
+        'unique_users': int(round(unique_users)),
+        'approximate': True,
+    }
+
+
+def _period_params(user_id: int, period: str):
+    """Return the SQL period filter and query params for a user and period"""
+    params = {'user_id': user_id}
+    cutoff = get_period_cutoff(period)
+    if cutoff is None:
+        return "", params
+    params['cutoff'] = cutoff
+    # psycopg2 inlines the cutoff as a literal, so a monthly-partitioned table (db/partitions.py)
+    # is pruned at plan time to the partitions the period touches
+    return "AND compute_datetime >= %(cutoff)s", params
+
+
+def fetch_user_kpis(user_id: int, period: str = "overall", use_snapshot: bool = USE_PARQUET_SNAPSHOT,
+                    engine: str = ANALYTICS_ENGINE) -> dict:
+    """
+    Compute dashboard KPIs and chart series for a user in PostgreSQL
+    The pandas and stream engines aggregate the raw rows in-process; DuckDB only reads the snapshot here
     """
-    status_df = pd.read_sql_query(status_query, conn)
+    snapshot = snapshot_kpi_rows(user_id, period, engine) if use_snapshot and period in SNAPSHOT_PERIODS else None
 
-    # Recent activity (last 24 hours)
-    recent_query = """
-        SELECT COUNT(*) as recent
+    if USE_DAILY_ROLLUP and snapshot is None:
+        with db_connection() as conn:
+            return fetch_user_kpis_rollup(conn, "postgres", user_id, period)
+
+    period_filter, params = _period_params(user_id, period)
+    params.update(max_hours=MAX_PROCESSING_TIME, bin_width=PROCESSING_BIN_WIDTH,
+                  last_bin=PROCESSING_TIME_BINS - 1)
+    if snapshot is not None:
+        # Only the rows inserted since the snapshot was exported (a primary key range scan)
+        period_filter += " AND id > %(id_hwm)s"
+        params['id_hwm'] = snapshot[1]
+
+    with db_connection() as conn:
+        if engine == "pandas":
+            rows = fetch_kpi_rows_pandas(conn, "postgres", user_id, params.get('cutoff'), params.get('id_hwm'))
+        elif engine == "stream":
+            rows, _ = stream_user_kpis(conn, "postgres", user_id, params.get('cutoff'), params.get('id_hwm'))
+        else:
+            cursor = conn.cursor()
+            cursor.execute(USER_KPIS_QUERY.format(period_filter=period_filter), params)
+            rows = cursor.fetchall()
+    if snapshot is not None:
+        rows = merge_kpi_rows(snapshot[0], rows)
+    return build_kpi_result(rows)
+
+
+def _latest_entries_filters(filters: dict) -> str:
+    """SQL conditions for the Latest Entries column filters (values are bound as params)"""
+    return "".join(f" AND {name} = %({name})s" for name in filters)
+
+
+def fetch_latest_entries_page(user_id: int, period: str = "overall", limit: int = 20, cursor: str = None,
+                              direction: str = "next", filters: dict = None) -> dict:
+    """
+    One page of a user's entries, newest first, by keyset pagination on (compute_datetime, id)
+    Served by idx_user_compute_datetime_id; see utils.pagination for the cursor format
+    """
+    period_filter, params = _period_params(user_id, period)
+    filters = clean_filters(filters)
+    params.update(filters, limit=limit + 1)
+
+    seek, order = "", "DESC"
+    key = decode_cursor(cursor)
+    if key is not None:
+        params['cursor_ts'], params['cursor_id'] = key
+        if direction == "prev":
+            seek, order = "AND (compute_datetime, id) > (%(cursor_ts)s::timestamp, %(cursor_id)s)", "ASC"
+        else:
+            seek = "AND (compute_datetime, id) < (%(cursor_ts)s::timestamp, %(cursor_id)s)"
+
+    query = f"""
+        SELECT
+            id,
+            compute_datetime,
+            linkedin_url,
+            status,
+            last_update,
+            emergency,
+            scraper_status
         FROM url_status_company
-        WHERE compute_datetime >= NOW() - INTERVAL '24 hours'
+        WHERE user_id = %(user_id)s {period_filter}{_latest_entries_filters(filters)} {seek}
+        ORDER BY compute_datetime {order}, id {order}
+        LIMIT %(limit)s
     """
-    recent_df = pd.read_sql_query(recent_query, conn)
-    recent_count = recent_df['recent'].iloc[0]
+    with db_connection() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    df['compute_datetime'] = pd.to_datetime(df['compute_datetime'])
+    df['last_update'] = pd.to_datetime(df['last_update'])
+    return build_page(df, limit, direction if key is not None else "next", key is not None)
 
-    # Unique users
-    users_query = "SELECT COUNT(DISTINCT user_id) as users FROM url_status_company"
-    users_df = pd.read_sql_query(users_query, conn)
-    unique_users = users_df['users'].iloc[0]
 
-    conn.close()
+def fetch_latest_entries(user_id: int, period: str = "overall", limit: int = 20) -> pd.DataFrame:
+    """Fetch the most recent entries for a user within a period"""
+    return fetch_latest_entries_page(user_id, period, limit)['rows']
 
-    return {
-        'total_records': total_records,
-        'status_distribution': status_df.to_dict('records'),
-        'recent_activity': recent_count,
-        'unique_users': unique_users
-    }
+
+def user_has_data(user_id: int) -> bool:
+    """Check whether a user has any rows at all"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM url_status_company WHERE user_id = %s LIMIT 1", (user_id,))
+        found = cursor.fetchone() is not None
+    return found
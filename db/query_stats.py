@@ -0,0 +1,112 @@
+"""
+Statement statistics by SQL fingerprint, and the slow-query log
+
+db/traced.py reports every statement the app runs, on PostgreSQL and
+SQLite alike. Per fingerprint (utils.tracing.fingerprint) this keeps the
+call count, total and maximum time, rows returned and the most recent
+QUERY_STATS_WINDOW durations for the p95, per worker, for the System
+Health page. Statements that take SLOW_QUERY_MS or longer are appended
+to SLOW_QUERY_LOG, one JSON object per line, with their parameters, the
+request path and, with SLOW_QUERY_EXPLAIN, the query plan;
+query_report.py ranks the fingerprints in that log.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+import numpy as np
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG, SLOW_QUERY_EXPLAIN, QUERY_STATS_WINDOW
+from utils.tracing import fingerprint, current_path
+
+_query_stats = {}  # fingerprint id -> counters
+_query_stats_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def summarize(fingerprint_id: str, sql: str, durations_ms, rows: int, calls: int = None,
+              total_ms: float = None, max_ms: float = None) -> dict:
+    """One report row; with calls/total_ms/max_ms given, durations_ms may be just a recent window (the p95)"""
+    durations_ms = np.asarray(durations_ms, dtype=float)
+    if calls is None:
+        calls, total_ms = len(durations_ms), float(durations_ms.sum())
+    if max_ms is None:
+        max_ms = float(durations_ms.max()) if len(durations_ms) else 0.0
+    return {
+        'fingerprint': fingerprint_id,
+        'sql': sql,
+        'calls': calls,
+        'total_ms': total_ms,
+        'mean_ms': total_ms / calls if calls else 0.0,
+        'p95_ms': float(np.percentile(durations_ms, 95)) if len(durations_ms) else 0.0,
+        'max_ms': max_ms,
+        'rows_per_call': rows / calls if calls else 0.0,
+    }
+
+
+def record_statement(conn, sql: str, params, seconds: float, rows: int):
+    """Count one executed statement; log it if it was slow"""
+    fingerprint_id, normalized = fingerprint(sql)
+    ms = seconds * 1000
+    with _query_stats_lock:
+        stats = _query_stats.get(fingerprint_id)
+        if stats is None:
+            stats = _query_stats[fingerprint_id] = {
+                'sql': normalized, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                'recent_ms': deque(maxlen=QUERY_STATS_WINDOW)
+            }
+        stats['calls'] += 1
+        stats['total_ms'] += ms
+        stats['max_ms'] = max(stats['max_ms'], ms)
+        stats['rows'] += rows
+        stats['recent_ms'].append(ms)
+
+    if ms >= SLOW_QUERY_MS:
+        log_slow_query(conn, sql, params, fingerprint_id, ms, rows)
+
+
+def _plan(conn, sql: str, params):
+    from db.index_advisor import explain, is_explainable
+    if not is_explainable(sql):
+        return None
+    try:
+        return explain(conn, "sqlite" if isinstance(conn, sqlite3.Connection) else "postgres", sql, params)[0]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+def log_slow_query(conn, sql: str, params, fingerprint_id: str, ms: float, rows: int):
+    """Append one entry to SLOW_QUERY_LOG (never raises: logging must not fail the query)"""
+    entry = {
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'pid': os.getpid(),
+        'path': current_path(),
+        'fingerprint': fingerprint_id,
+        'ms': round(ms, 3),
+        'rows': rows,
+        'sql': " ".join(sql.split()),
+        'params': params,
+    }
+    if SLOW_QUERY_EXPLAIN:
+        entry['plan'] = _plan(conn, sql, params)
+    try:
+        line = json.dumps(entry, default=str) + "\n"
+        directory = os.path.dirname(SLOW_QUERY_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One write per entry in append mode, so lines from several workers do not interleave
+        with _log_lock, open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+            f.write(line)
+    except Exception:
+        pass
+
+
+def get_query_stats() -> list:
+    """Per-fingerprint statement statistics in this worker, by total time"""
+    with _query_stats_lock:
+        snapshot = [(fid, dict(s, recent_ms=list(s['recent_ms']))) for fid, s in _query_stats.items()]
+    rows = [summarize(fid, s['sql'], s['recent_ms'], s['rows'], s['calls'], s['total_ms'], s['max_ms'])
+            for fid, s in snapshot]
+    return sorted(rows, key=lambda r: r['total_ms'], reverse=True)
+
@@ -0,0 +1,394 @@
+"""
+Per-user daily rollup of url_status_company
+
+The rollup holds one row per (user_id, day, status, scraper_status, emergency,
+processing bucket) with the row count and the sum of valid processing times,
+so every dashboard period reads a few hundred rows instead of the raw table.
+Bucket -1 holds rows whose processing time is outside (0, MAX_PROCESSING_TIME].
+
+The refresh is incremental: rows inserted (id) or updated (last_update) since
+the stored high-water marks cause their (user_id, day) to be recomputed.
+Rows newer than the id high-water mark are read from the raw table at query
+time, so new rows show up before the next refresh; status changes to rows
+already rolled up show up after it.
+"""
+from datetime import datetime, timedelta
+from config import MAX_PROCESSING_TIME, PROCESSING_TIME_BINS
+from utils.kpis import PROCESSING_BIN_WIDTH, get_period_cutoff, build_kpi_result
+from db.partitions import is_partitioned, shard_statements
+
+ROLLUP_TABLE = "url_status_daily_rollup"
+STATE_TABLE = "url_status_rollup_state"
+
+DDL = {
+    "postgres": [
+        f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            user_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            status TEXT NOT NULL,
+            scraper_status TEXT NOT NULL,
+            emergency BOOLEAN NOT NULL,
+            bucket SMALLINT NOT NULL,
+            row_count BIGINT NOT NULL,
+            processing_sum DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (user_id, day, status, scraper_status, emergency, bucket)
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            id SMALLINT PRIMARY KEY CHECK (id = 1),
+            last_update_hwm TIMESTAMP,
+            id_hwm BIGINT NOT NULL,
+            refreshed_at TIMESTAMP NOT NULL
+        )
+        """,
+    ],
+    "sqlite": [
+        f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            scraper_status TEXT NOT NULL,
+            emergency INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            processing_sum REAL NOT NULL,
+            PRIMARY KEY (user_id, day, status, scraper_status, emergency, bucket)
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_update_hwm TEXT,
+            id_hwm INTEGER NOT NULL,
+            refreshed_at TEXT NOT NULL
+        )
+        """,
+    ],
+}
+
+# The refresh finds rows updated since its high-water mark through this index;
+# a sharded SQLite table (a view) gets it on every shard instead
+LAST_UPDATE_INDEX = "CREATE INDEX IF NOT EXISTS idx_last_update ON url_status_company(last_update)"
+
+# Raw rows grouped to rollup granularity; {where} restricts the rows
+RAW_GROUPED = {
+    "postgres": """
+        SELECT
+            user_id,
+            day,
+            status,
+            scraper_status,
+            emergency,
+            bucket,
+            COUNT(*) AS row_count,
+            COALESCE(SUM(processing_time) FILTER (WHERE bucket >= 0), 0) AS processing_sum
+        FROM (
+            SELECT
+                user_id,
+                compute_datetime::date AS day,
+                status,
+                scraper_status,
+                COALESCE(emergency, FALSE) AS emergency,
+                processing_time,
+                CASE WHEN processing_time > 0 AND processing_time <= %(max_hours)s
+                     THEN LEAST(FLOOR(processing_time / %(bin_width)s)::int, %(last_bin)s)
+                     ELSE -1
+                END AS bucket
+            FROM (
+                SELECT
+                    *,
+                    EXTRACT(EPOCH FROM (last_update - compute_datetime))::float8 / 3600.0 AS processing_time
+                FROM url_status_company
+                {where}
+            ) r
+        ) t
+        GROUP BY user_id, day, status, scraper_status, emergency, bucket
+    """,
+    "sqlite": """
+        SELECT
+            user_id,
+            day,
+            status,
+            scraper_status,
+            emergency,
+            bucket,
+            COUNT(*) AS row_count,
+            COALESCE(SUM(CASE WHEN bucket >= 0 THEN processing_time END), 0) AS processing_sum
+        FROM (
+            SELECT
+                user_id,
+                day,
+                status,
+                scraper_status,
+                emergency,
+                processing_time,
+                CASE WHEN processing_time > 0 AND processing_time <= :max_hours
+                     THEN MIN(CAST(processing_time / :bin_width AS INTEGER), :last_bin)
+                     ELSE -1
+                END AS bucket
+            FROM (
+                SELECT
+                    user_id,
+                    date(compute_datetime) AS day,
+                    status,
+                    scraper_status,
+                    CASE WHEN emergency THEN 1 ELSE 0 END AS emergency,
+                    (strftime('%s', last_update) - strftime('%s', compute_datetime)) / 3600.0 AS processing_time
+                FROM url_status_company
+                {where}
+            ) r
+        ) t
+        GROUP BY user_id, day, status, scraper_status, emergency, bucket
+    """,
+}
+
+# Dashboard aggregates over rollup rows plus the raw rows the rollup does not cover
+ROLLUP_KPIS_QUERY = {
+    "postgres": f"""
+        WITH grouped AS (
+            SELECT day, status, scraper_status, emergency, bucket, row_count, processing_sum
+            FROM {ROLLUP_TABLE}
+            WHERE user_id = %(user_id)s {{rollup_filter}}
+            UNION ALL
+            SELECT day, status, scraper_status, emergency, bucket, row_count, processing_sum
+            FROM ({{raw_grouped}}) raw
+        ),
+        g AS (
+            SELECT day, status, scraper_status, emergency, NULLIF(bucket, -1) AS bucket, row_count, processing_sum
+            FROM grouped
+        )
+        SELECT
+            CASE GROUPING(status, scraper_status, day, bucket)
+                WHEN 15 THEN 'total'
+                WHEN 7 THEN 'status'
+                WHEN 11 THEN 'scraper_status'
+                WHEN 13 THEN 'day'
+                WHEN 14 THEN 'bucket'
+            END AS kind,
+            COALESCE(status, scraper_status, day::text, bucket::text) AS key,
+            COALESCE(SUM(row_count), 0)::bigint AS count,
+            COALESCE(SUM(row_count) FILTER (WHERE status = 'done'), 0)::bigint AS done,
+            COALESCE(SUM(row_count) FILTER (WHERE emergency), 0)::bigint AS emergency,
+            COALESCE(SUM(row_count) FILTER (WHERE bucket IS NOT NULL), 0)::bigint AS valid_count,
+            SUM(processing_sum) FILTER (WHERE bucket IS NOT NULL) AS valid_sum
+        FROM g
+        GROUP BY GROUPING SETS ((), (status), (scraper_status), (day), (bucket))
+    """,
+    "sqlite": f"""
+        WITH grouped AS (
+            SELECT day, status, scraper_status, emergency, bucket, row_count, processing_sum
+            FROM {ROLLUP_TABLE}
+            WHERE user_id = :user_id {{rollup_filter}}
+            UNION ALL
+            SELECT day, status, scraper_status, emergency, bucket, row_count, processing_sum
+            FROM ({{raw_grouped}}) raw
+        )
+        SELECT
+            'total', NULL,
+            COALESCE(SUM(row_count), 0),
+            COALESCE(SUM(CASE WHEN status = 'done' THEN row_count END), 0),
+            COALESCE(SUM(CASE WHEN emergency THEN row_count END), 0),
+            COALESCE(SUM(CASE WHEN bucket >= 0 THEN row_count END), 0),
+            SUM(CASE WHEN bucket >= 0 THEN processing_sum END)
+        FROM grouped
+        UNION ALL
+        SELECT 'status', status, SUM(row_count), NULL, NULL, NULL, NULL FROM grouped GROUP BY status
+        UNION ALL
+        SELECT 'scraper_status', scraper_status, SUM(row_count), NULL, NULL, NULL, NULL FROM grouped GROUP BY scraper_status
+        UNION ALL
+        SELECT 'day', day, SUM(row_count), NULL, NULL, NULL, NULL FROM grouped GROUP BY day
+        UNION ALL
+        SELECT 'bucket', bucket, SUM(row_count), NULL, NULL, NULL, NULL FROM grouped WHERE bucket >= 0 GROUP BY bucket
+    """,
+}
+
+# Dialect-specific snippets
+_PARAM = {"postgres": "%({})s", "sqlite": ":{}"}
+_DAY_OF = {"postgres": "compute_datetime::date", "sqlite": "date(compute_datetime)"}
+_ID_HWM = f"COALESCE((SELECT id_hwm FROM {STATE_TABLE}), 0)"
+
+
+def _p(backend: str, name: str) -> str:
+    return _PARAM[backend].format(name)
+
+
+def _bucket_params() -> dict:
+    return {'max_hours': MAX_PROCESSING_TIME, 'bin_width': PROCESSING_BIN_WIDTH,
+            'last_bin': PROCESSING_TIME_BINS - 1}
+
+
+def _fmt_datetime(backend: str, value: datetime):
+    """SQLite stores datetimes as 'YYYY-MM-DD HH:MM:SS' text"""
+    if backend == "sqlite" and value is not None and not isinstance(value, str):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def ensure_rollup_tables(conn, backend: str):
+    """Create the rollup and state tables and the last_update index if they don't exist"""
+    cursor = conn.cursor()
+    for statement in DDL[backend]:
+        cursor.execute(statement)
+    sharded = backend == "sqlite" and is_partitioned(conn, backend)
+    for statement in shard_statements(conn, LAST_UPDATE_INDEX) if sharded else [LAST_UPDATE_INDEX]:
+        cursor.execute(statement)
+    conn.commit()
+
+
+def rollup_exists(conn, backend: str) -> bool:
+    """Whether the rollup tables have been created"""
+    cursor = conn.cursor()
+    if backend == "postgres":
+        cursor.execute(f"SELECT to_regclass('{STATE_TABLE}') IS NOT NULL")
+    else:
+        cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = '{STATE_TABLE}'")
+    return bool(cursor.fetchone()[0])
+
+
+def _write_state(cursor, backend: str, last_update_hwm, id_hwm):
+    cursor.execute(f"DELETE FROM {STATE_TABLE}")
+    cursor.execute(
+        f"INSERT INTO {STATE_TABLE} (id, last_update_hwm, id_hwm, refreshed_at) "
+        f"VALUES (1, {_p(backend, 'lu')}, {_p(backend, 'id')}, {_p(backend, 'now')})",
+        {'lu': last_update_hwm, 'id': id_hwm, 'now': _fmt_datetime(backend, datetime.now())}
+    )
+
+
+def get_rollup_state(conn) -> dict:
+    """Return the stored high-water marks, or None if the rollup was never built"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT last_update_hwm, id_hwm, refreshed_at FROM {STATE_TABLE}")
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {'last_update_hwm': row[0], 'id_hwm': row[1], 'refreshed_at': row[2]}
+
+
+def _current_marks(cursor):
+    cursor.execute("SELECT MAX(last_update), COALESCE(MAX(id), 0) FROM url_status_company")
+    return cursor.fetchone()
+
+
+def backfill_rollup(conn, backend: str) -> int:
+    """Rebuild the rollup from scratch; returns the number of rollup rows"""
+    ensure_rollup_tables(conn, backend)
+    cursor = conn.cursor()
+
+    last_update_hwm, id_hwm = _current_marks(cursor)
+    where = f"WHERE id <= {_p(backend, 'id_hwm')}"
+    params = dict(_bucket_params(), id_hwm=id_hwm)
+
+    cursor.execute(f"DELETE FROM {ROLLUP_TABLE}")
+    cursor.execute(f"INSERT INTO {ROLLUP_TABLE} " + RAW_GROUPED[backend].format(where=where), params)
+    _write_state(cursor, backend, last_update_hwm, id_hwm)
+    conn.commit()
+
+    cursor.execute(f"SELECT COUNT(*) FROM {ROLLUP_TABLE}")
+    return cursor.fetchone()[0]
+
+
+def refresh_rollup(conn, backend: str) -> int:
+    """
+    Recompute the (user_id, day) groups touched since the last refresh
+    Returns the number of (user_id, day) groups recomputed
+    """
+    state = get_rollup_state(conn)
+    if state is None:
+        backfill_rollup(conn, backend)
+        return -1
+
+    cursor = conn.cursor()
+    last_update_hwm, id_hwm = _current_marks(cursor)
+    if last_update_hwm is None:
+        return 0
+
+    params = dict(_bucket_params(), old_lu=state['last_update_hwm'], old_id=state['id_hwm'],
+                  new_lu=last_update_hwm, new_id=id_hwm)
+    p = lambda name: _p(backend, name)
+
+    # Work out which (user_id, day) groups changed between the old and new marks
+    changed = (
+        f"(id > {p('old_id')} AND id <= {p('new_id')})"
+        f" OR (last_update > {p('old_lu')} AND last_update <= {p('new_lu')} AND id <= {p('new_id')})"
+        if state['last_update_hwm'] is not None else
+        f"id > {p('old_id')} AND id <= {p('new_id')}"
+    )
+    cursor.execute("DROP TABLE IF EXISTS rollup_affected")
+    cursor.execute(
+        f"CREATE TEMP TABLE rollup_affected AS "
+        f"SELECT DISTINCT user_id, {_DAY_OF[backend]} AS day FROM url_status_company WHERE {changed}",
+        params
+    )
+    cursor.execute("SELECT COUNT(*) FROM rollup_affected")
+    affected = cursor.fetchone()[0]
+
+    if affected:
+        cursor.execute(
+            f"DELETE FROM {ROLLUP_TABLE} "
+            f"WHERE (user_id, day) IN (SELECT user_id, day FROM rollup_affected)"
+        )
+        where = (
+            f"WHERE id <= {p('new_id')} "
+            f"AND (user_id, {_DAY_OF[backend]}) IN (SELECT user_id, day FROM rollup_affected)"
+        )
+        cursor.execute(f"INSERT INTO {ROLLUP_TABLE} " + RAW_GROUPED[backend].format(where=where), params)
+
+    cursor.execute("DROP TABLE IF EXISTS rollup_affected")
+    _write_state(cursor, backend, last_update_hwm, id_hwm)
+    conn.commit()
+    return affected
+
+
+def verify_rollup(conn, backend: str) -> list:
+    """
+    Compare per-user, per-status counts in the rollup against the raw table
+    Only rows at or below the id high-water mark are compared.
+    Returns a list of (user_id, status, raw_count, rollup_count) mismatches
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT user_id, status, COUNT(*) FROM url_status_company "
+        f"WHERE id <= {_ID_HWM} GROUP BY user_id, status"
+    )
+    raw = {(r[0], r[1]): r[2] for r in cursor.fetchall()}
+    cursor.execute(f"SELECT user_id, status, SUM(row_count) FROM {ROLLUP_TABLE} GROUP BY user_id, status")
+    rolled = {(r[0], r[1]): int(r[2]) for r in cursor.fetchall()}
+
+    mismatches = []
+    for key in sorted(set(raw) | set(rolled), key=str):
+        if raw.get(key, 0) != rolled.get(key, 0):
+            mismatches.append((key[0], key[1], raw.get(key, 0), rolled.get(key, 0)))
+    return mismatches
+
+
+def fetch_user_kpis_rollup(conn, backend: str, user_id: int, period: str = "overall") -> dict:
+    """Compute dashboard KPIs for a user from the rollup plus uncovered raw rows"""
+    p = lambda name: _p(backend, name)
+    params = dict(_bucket_params(), user_id=user_id)
+    cutoff = get_period_cutoff(period)
+
+    if cutoff is None:
+        rollup_filter = ""
+        raw_where = f"WHERE user_id = {p('user_id')} AND id > {_ID_HWM}"
+    else:
+        # Whole days after the cutoff come from the rollup, the partial first day from raw rows
+        day_end = datetime.combine(cutoff.date() + timedelta(days=1), datetime.min.time())
+        params['cutoff'] = _fmt_datetime(backend, cutoff)
+        params['day_end'] = _fmt_datetime(backend, day_end)
+        params['first_full_day'] = day_end.date().isoformat() if backend == "sqlite" else day_end.date()
+        rollup_filter = f"AND day >= {p('first_full_day')}"
+        raw_where = (
+            f"WHERE user_id = {p('user_id')} AND compute_datetime >= {p('cutoff')} "
+            f"AND (compute_datetime < {p('day_end')} OR id > {_ID_HWM})"
+        )
+
+    query = ROLLUP_KPIS_QUERY[backend].format(
+        rollup_filter=rollup_filter,
+        raw_grouped=RAW_GROUPED[backend].format(where=raw_where)
+    )
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    return build_kpi_result(cursor.fetchall())
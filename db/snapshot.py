@@ -0,0 +1,223 @@
+"""
+Columnar Parquet snapshot of url_status_company
+
+Rows are written to SNAPSHOT_DIR/user_id=<id>/month=<YYYY-MM>/*.parquet with
+status and scraper_status dictionary-encoded. The dashboard reads one
+user's directory with column projection (only the five KPI columns) and
+predicate pushdown (month directories and compute_datetime row-group
+statistics), instead of pulling every row through the database driver.
+
+Exports are incremental like the daily rollup: rows above the id
+high-water mark are appended as new files, and the (user, month)
+partitions holding rows updated since the last export (last_update) are
+rewritten. Rows inserted after the export are read from the database at
+query time; status changes show up after the next export.
+"""
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from config import SNAPSHOT_DIR, SNAPSHOT_BATCH_ROWS, ANALYTICS_ENGINE, STREAM_CHUNK_ROWS
+from db.analytics import fetch_chunks, fetch_snapshot_kpi_rows_duckdb
+from utils.kpi_frame import KPI_COLUMNS, KpiAccumulator, kpi_rows_from_frame
+from utils.kpis import get_period_cutoff
+from utils.frames import record_frame
+
+STATE_FILE = "_snapshot_state.json"
+
+COLUMNS = ['id', 'compute_datetime', 'linkedin_url', 'status', 'last_update', 'user_id', 'emergency',
+           'scraper_status', 'ticker_eod', 'recycled_datetime_task']
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('compute_datetime', pa.timestamp('us')),
+    ('linkedin_url', pa.string()),
+    ('status', _CATEGORY),
+    ('last_update', pa.timestamp('us')),
+    ('user_id', pa.int32()),
+    ('emergency', pa.bool_()),
+    ('scraper_status', _CATEGORY),
+    ('ticker_eod', pa.bool_()),
+    ('recycled_datetime_task', pa.timestamp('us')),
+    ('month', pa.string()),
+])
+PARTITIONING = ds.partitioning(pa.schema([('user_id', pa.int32()), ('month', pa.string())]), flavor="hive")
+_MONTH_PARTITIONING = ds.partitioning(pa.schema([('month', pa.string())]), flavor="hive")
+
+_PARAM = {"postgres": "%({})s", "sqlite": ":{}"}
+_MONTH_OF = {"postgres": "to_char(compute_datetime, 'YYYY-MM')", "sqlite": "substr(compute_datetime, 1, 7)"}
+
+
+def _p(backend: str, name: str) -> str:
+    return _PARAM[backend].format(name)
+
+
+def snapshot_dir() -> Path:
+    """SNAPSHOT_DIR, relative to the project root unless absolute"""
+    return Path(__file__).parent.parent / SNAPSHOT_DIR
+
+
+def get_snapshot_state(root: Path = None) -> dict:
+    """The high-water marks of the last export, or None if there is no snapshot"""
+    path = (root or snapshot_dir()) / STATE_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_state(root: Path, id_hwm: int, last_update_hwm, rows: int):
+    state = {'id_hwm': id_hwm, 'last_update_hwm': str(last_update_hwm) if last_update_hwm is not None else None,
+             'rows': rows, 'exported_at': datetime.now().isoformat(sep=' ', timespec='seconds')}
+    (root / STATE_FILE).write_text(json.dumps(state, indent=2))
+
+
+def _batches(conn, backend: str, where: str, params: dict):
+    """Rows matching `where` in SNAPSHOT_BATCH_ROWS batches (a server-side cursor on PostgreSQL)"""
+    query = f"SELECT {', '.join(COLUMNS)} FROM url_status_company WHERE {where}"
+    return fetch_chunks(conn, backend, query, params, SNAPSHOT_BATCH_ROWS, name="snapshot_export")
+
+
+def rows_frame(rows) -> pd.DataFrame:
+    """Database rows in COLUMNS order as a DataFrame with the snapshot's types (same on both backends)"""
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    for column in ('compute_datetime', 'last_update', 'recycled_datetime_task'):
+        df[column] = pd.to_datetime(df[column])
+    for column in ('emergency', 'ticker_eod'):
+        df[column] = df[column].astype('boolean')
+    return df
+
+
+def _to_arrow(rows) -> pa.Table:
+    df = rows_frame(rows)
+    df['month'] = df['compute_datetime'].dt.strftime('%Y-%m')
+    return pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+
+def _write(root: Path, conn, backend: str, where: str, params: dict, tag: str) -> int:
+    """Append the matching rows to the snapshot; returns the number of rows written"""
+    written = 0
+    for n, rows in enumerate(_batches(conn, backend, where, params)):
+        ds.write_dataset(
+            _to_arrow(rows), root, format="parquet", partitioning=PARTITIONING,
+            basename_template=f"part-{tag}-{n}-{{i}}.parquet", existing_data_behavior="overwrite_or_ignore"
+        )
+        written += len(rows)
+    return written
+
+
+def _current_marks(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0), MAX(last_update) FROM url_status_company")
+    return cursor.fetchone()
+
+
+def export_full(conn, backend: str) -> int:
+    """
+    Rewrite the whole snapshot; returns the number of rows exported
+    Written next to the current snapshot and swapped in at the end
+    """
+    root = snapshot_dir()
+    staging = root.with_name(root.name + ".staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    id_hwm, last_update_hwm = _current_marks(conn)
+    rows = _write(staging, conn, backend, f"id <= {_p(backend, 'id_hwm')}", {'id_hwm': id_hwm}, "full")
+    _write_state(staging, id_hwm, last_update_hwm, rows)
+
+    shutil.rmtree(root, ignore_errors=True)
+    staging.rename(root)
+    return rows
+
+
+def export_incremental(conn, backend: str) -> dict:
+    """
+    Append rows inserted since the last export and rewrite the partitions holding updated rows
+    Falls back to a full export when there is no snapshot yet
+    """
+    root = snapshot_dir()
+    state = get_snapshot_state(root)
+    if state is None:
+        return {'full': True, 'appended': export_full(conn, backend), 'rewritten': []}
+
+    p = lambda name: _p(backend, name)
+    id_hwm, last_update_hwm = _current_marks(conn)
+    params = {'old_id': state['id_hwm'], 'new_id': id_hwm, 'old_lu': state['last_update_hwm'],
+              'tag': f"{state['id_hwm'] + 1}-{id_hwm}"}
+
+    appended = _write(root, conn, backend, f"id > {p('old_id')} AND id <= {p('new_id')}", params, params['tag'])
+
+    rewritten = []
+    if state['last_update_hwm'] is not None:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT DISTINCT user_id, {_MONTH_OF[backend]} FROM url_status_company "
+            f"WHERE last_update > {p('old_lu')} AND id <= {p('old_id')}",
+            params
+        )
+        rewritten = sorted(cursor.fetchall())
+    for user_id, month in rewritten:
+        shutil.rmtree(root / f"user_id={user_id}" / f"month={month}", ignore_errors=True)
+        _write(root, conn, backend,
+               f"user_id = {p('user_id')} AND {_MONTH_OF[backend]} = {p('month')} AND id <= {p('new_id')}",
+               dict(params, user_id=user_id, month=month), f"r{params['tag']}")
+
+    _write_state(root, id_hwm, last_update_hwm, state['rows'] + appended)
+    return {'full': False, 'appended': appended, 'rewritten': rewritten}
+
+
+def _user_dataset(user_id: int, period: str):
+    """(dataset, filter) over a user's snapshot directory for a period; dataset is None if the user has none"""
+    user_dir = snapshot_dir() / f"user_id={int(user_id)}"
+    if not user_dir.exists():
+        return None, None
+    dataset = ds.dataset(user_dir, format="parquet", partitioning=_MONTH_PARTITIONING)
+    cutoff = get_period_cutoff(period)
+    row_filter = None
+    if cutoff is not None:
+        # Month directories before the cutoff are skipped without opening them; row groups by their min/max
+        row_filter = (ds.field('month') >= cutoff.strftime('%Y-%m')) & \
+                     (ds.field('compute_datetime') >= pa.scalar(cutoff, pa.timestamp('us')))
+    return dataset, row_filter
+
+
+def read_user_rows(user_id: int, period: str = "overall", columns=None) -> pa.Table:
+    """A user's snapshot rows for a period (projected to `columns`), or None if there is no snapshot"""
+    if get_snapshot_state() is None:
+        return None
+    dataset, row_filter = _user_dataset(user_id, period)
+    if dataset is None:
+        return SCHEMA.empty_table().select(columns or KPI_COLUMNS)
+    return dataset.to_table(columns=columns or KPI_COLUMNS, filter=row_filter)
+
+
+def snapshot_kpi_rows(user_id: int, period: str = "overall", engine: str = ANALYTICS_ENGINE):
+    """
+    Dashboard aggregate rows (see build_kpi_result) from the snapshot, and the
+    id high-water mark the snapshot covers; None if there is no snapshot
+    Aggregated by DuckDB with the duckdb engine, in record batches with the
+    stream engine, and by pandas in one go otherwise
+    """
+    state = get_snapshot_state()
+    if state is None:
+        return None
+    if engine == "duckdb":
+        user_dir = snapshot_dir() / f"user_id={int(user_id)}"
+        rows = fetch_snapshot_kpi_rows_duckdb(user_dir, get_period_cutoff(period)) if user_dir.exists() else []
+        return rows, state['id_hwm']
+    if engine == "stream":
+        dataset, row_filter = _user_dataset(user_id, period)
+        accumulator = KpiAccumulator()
+        if dataset is not None:
+            for batch in dataset.to_batches(columns=KPI_COLUMNS, filter=row_filter, batch_size=STREAM_CHUNK_ROWS):
+                chunk = batch.to_pandas()
+                record_frame('snapshot_rows_stream', chunk)
+                accumulator.update(chunk)
+        return accumulator.rows(), state['id_hwm']
+    df = read_user_rows(user_id, period).to_pandas()
+    record_frame('snapshot_rows', df)
+    return kpi_rows_from_frame(df), state['id_hwm']
@@ -4,33 +4,83 @@ SQLite query functions for demo/testing with sample data
 import sqlite3
 import pandas as pd
 from pathlib import Path
+from config import (
+    MAX_PROCESSING_TIME, PROCESSING_TIME_BINS, USE_DAILY_ROLLUP, USE_SYSTEM_COUNTERS,
+    SYSTEM_STATS_APPROXIMATE, SYSTEM_STATS_SAMPLE_SIZE, USE_PARQUET_SNAPSHOT, SNAPSHOT_PERIODS, ANALYTICS_ENGINE
+)
+from db.analytics import fetch_kpi_rows_pandas, stream_user_kpis, fetch_kpi_rows_duckdb
+from db.rollup import fetch_user_kpis_rollup
+from db.counters import fetch_counter_totals
+from db.partitions import sqlite_source
+from db.snapshot import snapshot_kpi_rows
+from utils.kpis import PROCESSING_BIN_WIDTH, get_period_cutoff, build_kpi_result, merge_kpi_rows
+from utils.pagination import clean_filters, decode_cursor, build_page
+from utils.frames import USER_DATA_COLUMNS, read_frame
+from db.traced import TracedSQLiteConnection
 
 # Path to the sample SQLite database
 SAMPLE_DB_PATH = Path(__file__).parent.parent / "sample_users.db"
 
+# Indexes whose sqlite_stat1 entry gives the average rows per user
+USER_ID_INDEXES = ("idx_user_compute_datetime_covering", "idx_user_compute_datetime_id", "idx_user_id")
 
-def fetch_user_data_sqlite(user_id: int) -> pd.DataFrame:
-    """Fetch user data from SQLite sample database"""
-    if not SAMPLE_DB_PATH.exists():
-        return pd.DataFrame()
-
-    conn = sqlite3.connect(str(SAMPLE_DB_PATH))
-    query = """
+# SQLite has no GROUPING SETS, so each aggregate is a branch over the same CTE. Processing times come from
+# whole seconds: julianday() differences carry float error that moves rows across bin edges
+USER_KPIS_QUERY_SQLITE = """
+    WITH filtered AS (
         SELECT
-            compute_datetime,
-            linkedin_url,
             status,
-            last_update,
-            user_id,
-            emergency,
             scraper_status,
-            ticker_eod,
-            recycled_datetime_task,
-            id
+            emergency,
+            date(compute_datetime) AS day,
+            (strftime('%s', last_update) - strftime('%s', compute_datetime)) / 3600.0 AS processing_time
+        FROM {source}
+        WHERE user_id = :user_id {period_filter}
+    ),
+    bucketed AS (
+        SELECT
+            *,
+            CASE WHEN processing_time > 0 AND processing_time <= :max_hours
+                 THEN MIN(CAST(processing_time / :bin_width AS INTEGER), :last_bin)
+            END AS bucket
+        FROM filtered
+    )
+    SELECT
+        'total', NULL,
+        COUNT(*),
+        SUM(CASE WHEN status = 'done' THEN 1 ELSE 0 END),
+        SUM(CASE WHEN emergency THEN 1 ELSE 0 END),
+        COUNT(bucket),
+        SUM(CASE WHEN bucket IS NOT NULL THEN processing_time END)
+    FROM bucketed
+    UNION ALL
+    SELECT 'status', status, COUNT(*), NULL, NULL, NULL, NULL FROM bucketed GROUP BY status
+    UNION ALL
+    SELECT 'scraper_status', scraper_status, COUNT(*), NULL, NULL, NULL, NULL FROM bucketed GROUP BY scraper_status
+    UNION ALL
+    SELECT 'day', day, COUNT(*), NULL, NULL, NULL, NULL FROM bucketed GROUP BY day
+    UNION ALL
+    SELECT 'bucket', bucket, COUNT(*), NULL, NULL, NULL, NULL FROM bucketed WHERE bucket IS NOT NULL GROUP BY bucket
+"""
+
+
+def _connect(**kwargs):
+    """Connection to the sample database whose statements are timed into the request trace"""
+    return sqlite3.connect(str(SAMPLE_DB_PATH), factory=TracedSQLiteConnection, **kwargs)
+
+
+def fetch_user_data_sqlite(user_id: int, columns=USER_DATA_COLUMNS) -> pd.DataFrame:
+    """Fetch user data from SQLite sample database (compact dtypes, see utils.frames)"""
+    if not SAMPLE_DB_PATH.exists():
+        return pd.DataFrame()
+
+    conn = _connect()
+    query = f"""
+        SELECT {', '.join(columns)}
         FROM url_status_company
         WHERE user_id = ?
     """
-    df = pd.read_sql_query(query, conn, params=(user_id,))
+    df = read_frame('user_data', query, conn, params=(user_id,))
     conn.close()
     return df
 
@@ -40,7 +90,7 @@ def fetch_health_check_data_sqlite() -> pd.DataFrame:
     if not SAMPLE_DB_PATH.exists():
         return pd.DataFrame()
 
-    conn = sqlite3.connect(str(SAMPLE_DB_PATH))
+    conn = _connect()
     query = """
         SELECT
             compute_datetime,
@@ -53,6 +103,212 @@ def fetch_health_check_data_sqlite() -> pd.DataFrame:
         ORDER BY compute_datetime DESC
         LIMIT 30
     """
-    df = pd.read_sql_query(query, conn)
+    df = read_frame('health_check', query, conn)
     conn.close()
     return df
+
+
+def _period_params_sqlite(user_id: int, period: str):
+    """Return the SQLite period filter and query params for a user and period"""
+    params = {'user_id': user_id}
+    cutoff = get_period_cutoff(period)
+    if cutoff is None:
+        return "", params
+    params['cutoff'] = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+    return "AND compute_datetime >= :cutoff", params
+
+
+def fetch_user_kpis_sqlite(user_id: int, period: str = "overall", use_snapshot: bool = USE_PARQUET_SNAPSHOT,
+                           engine: str = ANALYTICS_ENGINE) -> dict:
+    """Compute dashboard KPIs and chart series for a user in SQLite (or with the engine given, see db.analytics)"""
+    if not SAMPLE_DB_PATH.exists():
+        return build_kpi_result([])
+
+    snapshot = snapshot_kpi_rows(user_id, period, engine) if use_snapshot and period in SNAPSHOT_PERIODS else None
+
+    if USE_DAILY_ROLLUP and snapshot is None:
+        conn = _connect()
+        kpis = fetch_user_kpis_rollup(conn, "sqlite", user_id, period)
+        conn.close()
+        return kpis
+
+    period_filter, params = _period_params_sqlite(user_id, period)
+    params.update(max_hours=MAX_PROCESSING_TIME, bin_width=PROCESSING_BIN_WIDTH,
+                  last_bin=PROCESSING_TIME_BINS - 1)
+    if snapshot is not None:
+        # Only the rows inserted since the snapshot was exported
+        period_filter += " AND id > :id_hwm"
+        params['id_hwm'] = snapshot[1]
+
+    conn = _connect()
+    # Only the month shards the period touches, when the table is sharded
+    cutoff = get_period_cutoff(period)
+    source = sqlite_source(conn, cutoff)
+    if engine == "duckdb":
+        rows = fetch_kpi_rows_duckdb(SAMPLE_DB_PATH, user_id, cutoff, params.get('id_hwm'), source)
+    elif engine == "pandas":
+        rows = fetch_kpi_rows_pandas(conn, "sqlite", user_id, cutoff, params.get('id_hwm'), source)
+    elif engine == "stream":
+        rows, _ = stream_user_kpis(conn, "sqlite", user_id, cutoff, params.get('id_hwm'), source)
+    else:
+        rows = conn.execute(USER_KPIS_QUERY_SQLITE.format(source=source, period_filter=period_filter),
+                            params).fetchall()
+    conn.close()
+    if snapshot is not None:
+        rows = merge_kpi_rows(snapshot[0], rows)
+    return build_kpi_result(rows)
+
+
+def fetch_latest_entries_page_sqlite(user_id: int, period: str = "overall", limit: int = 20, cursor: str = None,
+                                     direction: str = "next", filters: dict = None) -> dict:
+    """One page of a user's entries from SQLite, newest first, by keyset pagination on (compute_datetime, id)"""
+    if not SAMPLE_DB_PATH.exists():
+        return build_page(pd.DataFrame(columns=['id', 'compute_datetime']), limit, direction, False)
+
+    period_filter, params = _period_params_sqlite(user_id, period)
+    filters = clean_filters(filters)
+    if 'emergency' in filters:
+        filters['emergency'] = int(filters['emergency'])
+    params.update(filters, limit=limit + 1)
+    column_filters = "".join(f" AND {name} = :{name}" for name in filters)
+
+    seek, order = "", "DESC"
+    key = decode_cursor(cursor)
+    if key is not None:
+        params['cursor_ts'], params['cursor_id'] = key
+        if direction == "prev":
+            seek, order = "AND (compute_datetime, id) > (:cursor_ts, :cursor_id)", "ASC"
+        else:
+            seek = "AND (compute_datetime, id) < (:cursor_ts, :cursor_id)"
+
+    conn = _connect()
+    query = f"""
+        SELECT
+            id,
+            compute_datetime,
+            linkedin_url,
+            status,
+            last_update,
+            emergency,
+            scraper_status
+        FROM {sqlite_source(conn, get_period_cutoff(period))}
+        WHERE user_id = :user_id {period_filter}{column_filters} {seek}
+        ORDER BY compute_datetime {order}, id {order}
+        LIMIT :limit
+    """
+    df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    df['compute_datetime'] = pd.to_datetime(df['compute_datetime'])
+    df['last_update'] = pd.to_datetime(df['last_update'])
+    return build_page(df, limit, direction if key is not None else "next", key is not None)
+
+
+def fetch_latest_entries_sqlite(user_id: int, period: str = "overall", limit: int = 20) -> pd.DataFrame:
+    """Fetch the most recent entries for a user within a period from SQLite"""
+    return fetch_latest_entries_page_sqlite(user_id, period, limit)['rows']
+
+
+def user_has_data_sqlite(user_id: int) -> bool:
+    """Check whether a user has any rows in SQLite"""
+    if not SAMPLE_DB_PATH.exists():
+        return False
+
+    conn = _connect()
+    found = conn.execute(
+        "SELECT 1 FROM url_status_company WHERE user_id = ? LIMIT 1", (user_id,)
+    ).fetchone() is not None
+    conn.close()
+    return found
+
+
+# Index range scan on idx_compute_datetime
+RECENT_ACTIVITY_QUERY_SQLITE = """
+    SELECT COUNT(*)
+    FROM url_status_company
+    WHERE compute_datetime >= datetime('now', 'localtime', '-24 hours')
+"""
+
+# Evenly spaced rowid lookups, so the status mix is estimated without a scan
+STATUS_SAMPLE_QUERY_SQLITE = """
+    WITH RECURSIVE
+        bounds AS (SELECT MIN(id) AS lo, MAX(id) AS hi FROM url_status_company),
+        steps(k) AS (SELECT 0 UNION ALL SELECT k + 1 FROM steps WHERE k + 1 < :sample_size)
+    SELECT u.status, COUNT(*) AS count
+    FROM steps, bounds
+    JOIN url_status_company u ON u.id = bounds.lo + steps.k * (bounds.hi - bounds.lo) / :sample_size
+    GROUP BY u.status
+"""
+
+
+def get_system_stats_sqlite(approximate: bool = SYSTEM_STATS_APPROXIMATE) -> dict:
+    """Get overall system statistics from SQLite (approximate: sqlite_stat1 and a rowid sample)"""
+    if not SAMPLE_DB_PATH.exists():
+        return {'total_records': 0, 'status_distribution': [], 'recent_activity': 0, 'unique_users': 0,
+                'approximate': False}
+
+    conn = _connect()
+    try:
+        if USE_SYSTEM_COUNTERS:
+            stats = fetch_counter_totals(conn, "sqlite")
+            if stats is not None:
+                stats['recent_activity'] = conn.execute(RECENT_ACTIVITY_QUERY_SQLITE).fetchone()[0]
+                stats['approximate'] = False
+                return stats
+
+        if approximate:
+            stats = _get_system_stats_estimate_sqlite(conn)
+            if stats is not None:
+                return stats
+
+        # Separate queries on purpose: each is an index-only scan here, which SQLite runs
+        # faster than one pass that has to sort every row for a combined GROUP BY
+        total_records = conn.execute("SELECT COUNT(*) FROM url_status_company").fetchone()[0]
+
+        status_df = pd.read_sql_query("""
+            SELECT status, COUNT(*) as count
+            FROM url_status_company
+            GROUP BY status
+        """, conn)
+
+        recent_count = conn.execute(RECENT_ACTIVITY_QUERY_SQLITE).fetchone()[0]
+
+        unique_users = conn.execute("SELECT COUNT(DISTINCT user_id) FROM url_status_company").fetchone()[0]
+    finally:
+        conn.close()
+
+    return {
+        'total_records': total_records,
+        'status_distribution': status_df.to_dict('records'),
+        'recent_activity': recent_count,
+        'unique_users': unique_users,
+        'approximate': False,
+    }
+
+
+def _get_system_stats_estimate_sqlite(conn):
+    """Estimates from ANALYZE statistics, or None if the table has not been analyzed"""
+    try:
+        stats = dict(conn.execute(
+            "SELECT idx, stat FROM sqlite_stat1 WHERE tbl = 'url_status_company'"
+        ).fetchall())
+    except sqlite3.OperationalError:
+        return None  # No sqlite_stat1 until ANALYZE has run
+
+    # "rows avg_rows_per_user ..." for any index whose first column is user_id
+    user_stat = next((stats[name] for name in USER_ID_INDEXES if name in stats), None)
+    if user_stat is None:
+        return None
+    total, rows_per_user = (int(n) for n in user_stat.split()[:2])
+
+    sample = conn.execute(STATUS_SAMPLE_QUERY_SQLITE, {'sample_size': SYSTEM_STATS_SAMPLE_SIZE}).fetchall()
+    sampled = sum(count for _, count in sample) or 1
+    recent = conn.execute(RECENT_ACTIVITY_QUERY_SQLITE).fetchone()[0]
+
+    return {
+        'total_records': total,
+        'status_distribution': [{'status': status, 'count': round(count * total / sampled)}
+                                for status, count in sample],
+        'recent_activity': recent,
+        'unique_users': round(total / max(rows_per_user, 1)),
+        'approximate': True,
+    }
@@ -0,0 +1,124 @@
+"""
+Database cursors that time every statement into the request trace
+
+A statement is timed from execute() until its rows have been fetched:
+SQLite computes rows as they are stepped through and server-side
+(named) PostgreSQL cursors fetch them in batches, so execute() alone
+would miss most of the work. Ordinary PostgreSQL cursors have the whole
+result once execute() returns and are recorded right away. Each
+statement goes to utils.tracing.record_query (the request trace and
+/metrics) and db.query_stats.record_statement (per-fingerprint
+statistics and the slow-query log), with its parameters and row count.
+Statements that raise are not recorded.
+"""
+import sqlite3
+import time
+import psycopg2.extensions
+from utils.tracing import record_query
+from db.query_stats import record_statement
+
+
+class _TimedCursor:
+    """DB-API cursor mixin: records each statement once its rows are fetched (or the next one starts)"""
+    _sql = None
+    _params = None
+    _seconds = 0.0
+    _rows = 0
+
+    def _rows_pending(self) -> bool:
+        return True
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._seconds += time.perf_counter() - start
+
+    def _finish(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            record_query(sql, self._seconds)
+            record_statement(self.connection, sql, self._params, self._seconds, self._rows)
+        self._seconds = 0.0
+        self._rows = 0
+
+    def execute(self, sql, *args):
+        self._finish()
+        try:
+            result = self._timed(super().execute, sql, *args)
+        except BaseException:
+            self._seconds = 0.0
+            raise
+        self._sql = sql
+        self._params = args[0] if args else None
+        if not self._rows_pending():
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TracedSQLiteCursor(_TimedCursor, sqlite3.Cursor):
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class TracedSQLiteConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=TracedSQLiteConnection)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = []
+
+    def cursor(self, factory=TracedSQLiteCursor):
+        cursor = super().cursor(factory)
+        self._cursors.append(cursor)
+        return cursor
+
+    def execute(self, sql, *args):
+        # The built-in shortcut creates a plain cursor without calling cursor()
+        return self.cursor().execute(sql, *args)
+
+    def close(self):
+        # Statements whose rows were only partly fetched (execute(...).fetchone()) end here
+        for cursor in self._cursors:
+            if isinstance(cursor, _TimedCursor):
+                cursor._finish()
+        self._cursors = []
+        super().close()
+
+
+class TracedPostgresCursor(_TimedCursor, psycopg2.extensions.cursor):
+    """psycopg2.connect(..., cursor_factory=TracedPostgresCursor)"""
+
+    def _rows_pending(self) -> bool:
+        return self.name is not None
@@ -0,0 +1,106 @@
+"""
+Export url_status_company to the Parquet snapshot behind the long dashboard periods
+
+Usage:
+    python export_snapshot.py full                    # Rewrite the snapshot from scratch
+    python export_snapshot.py append                  # Export rows inserted or updated since the last run (cron)
+    python export_snapshot.py append --every 900      # Keep appending every 15 minutes
+    python export_snapshot.py verify --user-id 12     # Compare snapshot KPIs with the database
+
+Add --backend sqlite to export sample_users.db instead of PostgreSQL.
+Set USE_PARQUET_SNAPSHOT = True in config.py to serve SNAPSHOT_PERIODS from it.
+"""
+import argparse
+import sys
+import time
+from config import DB_BACKEND, DEFAULT_USER_ID, SNAPSHOT_PERIODS
+from db.snapshot import snapshot_dir, get_snapshot_state, export_full, export_incremental, snapshot_kpi_rows
+from refresh_rollup import open_connection
+from utils.cache import invalidate_all
+from utils.kpis import build_kpi_result
+
+
+def _snapshot_size_mb() -> float:
+    return sum(f.stat().st_size for f in snapshot_dir().rglob("*.parquet")) / (1024 * 1024)
+
+
+def run_full(conn, backend: str):
+    start = time.time()
+    rows = export_full(conn, backend)
+    invalidate_all()
+    print(f"[OK] Exported {rows:,} rows in {time.time() - start:.1f}s ({_snapshot_size_mb():.1f} MB of Parquet)")
+
+
+def run_append(conn, backend: str):
+    start = time.time()
+    result = export_incremental(conn, backend)
+    if result['appended'] or result['rewritten']:
+        invalidate_all()
+    if result['full']:
+        print(f"[OK] No snapshot found, exported {result['appended']:,} rows in {time.time() - start:.1f}s")
+        return
+    print(f"[OK] Appended {result['appended']:,} rows, rewrote {len(result['rewritten'])} user-months "
+          f"in {time.time() - start:.1f}s")
+
+
+def run_verify(backend: str, user_id: int) -> bool:
+    if backend == "sqlite":
+        from db.sqlite_queries import fetch_user_kpis_sqlite as fetch_user_kpis
+    else:
+        from db.queries import fetch_user_kpis
+
+    state = get_snapshot_state()
+    print(f"Snapshot high-water mark: id {state['id_hwm']:,}, exported {state['exported_at']}")
+    ok = True
+    for period in SNAPSHOT_PERIODS:
+        start = time.time()
+        snapshot = build_kpi_result(snapshot_kpi_rows(user_id, period)[0])
+        snapshot_time = time.time() - start
+        start = time.time()
+        database = fetch_user_kpis(user_id, period, use_snapshot=False)
+        database_time = time.time() - start
+
+        # Rows newer than the snapshot, or updated since, account for any difference
+        same = snapshot['total_companies'] == database['total_companies'] and \
+            snapshot['successful_scrapes'] == database['successful_scrapes']
+        ok = ok and same
+        print(f"{'[OK]' if same else '[DIFF]':<7} {period:<10} snapshot {snapshot['total_companies']:>10,} rows "
+              f"({snapshot_time * 1000:.0f} ms)   database {database['total_companies']:>10,} rows "
+              f"({database_time * 1000:.0f} ms)")
+    if not ok:
+        print("Differences are rows inserted or updated since the last export; run append first.")
+    return ok
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Export url_status_company to the Parquet snapshot")
+    parser.add_argument("command", choices=["full", "append", "verify"])
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--every", type=int, default=0, help="Repeat append every N seconds (append only)")
+    parser.add_argument("--user-id", type=int, default=DEFAULT_USER_ID, help="User to compare (verify only)")
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        if get_snapshot_state() is None:
+            print("No snapshot yet. Run: python export_snapshot.py full")
+            sys.exit(1)
+        if not run_verify(args.backend, args.user_id):
+            sys.exit(1)
+        return
+
+    conn = open_connection(args.backend)
+    try:
+        if args.command == "full":
+            run_full(conn, args.backend)
+        else:
+            run_append(conn, args.backend)
+            while args.every > 0:
+                time.sleep(args.every)
+                run_append(conn, args.backend)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -57,6 +57,15 @@ loglevel = os.getenv("LOG_LEVEL", "info").lower()
 # Capture stdout/stderr in error log
 capture_output = True
 
+# =============================================================================
+# Metrics
+# =============================================================================
+
+# Prometheus multiprocess mode: each worker writes its samples to this directory and /metrics merges them.
+# Set here so the workers have it before they import prometheus_client
+from config import METRICS_MULTIPROC_DIR
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", METRICS_MULTIPROC_DIR)
+
 # =============================================================================
 # Process Naming
 # =============================================================================
@@ -98,6 +107,13 @@ def on_starting(server):
     """Called just before the master process is initialized."""
     server.log.info("Starting Gunicorn server")
 
+    # Samples left by a previous run would be merged into the new one's
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(metrics_dir, name))
+
 
 def when_ready(server):
     """Called just after the server is started."""
@@ -107,3 +123,29 @@ def when_ready(server):
 def post_fork(server, worker):
     """Called just after a worker has been forked."""
     server.log.info("Worker spawned (pid: %s)", worker.pid)
+
+    # Each worker owns its connection pool so forked processes never share sockets
+    from db.connection import init_pool
+    try:
+        pool = init_pool()
+        server.log.info("Worker %s database pool ready (min=%s, max=%s)",
+                        worker.pid, pool.min_size, pool.max_size)
+    except Exception as e:
+        # The pool is created lazily on first query instead
+        server.log.warning("Worker %s could not pre-open database pool: %s", worker.pid, e)
+
+
+def worker_exit(server, worker):
+    """Called just after a worker has exited."""
+    from db.connection import close_pool
+    close_pool()
+
+
+def child_exit(server, worker):
+    """Called in the master process after a worker has exited."""
+    # Drop the dead worker's live gauges from /metrics (its histogram samples are kept)
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -5,6 +5,9 @@ import sqlite3
 import pandas as pd
 from pathlib import Path
 import time
+from db.migrations import apply_migrations
+from db.counters import drop_counter_triggers, rebuild_counters
+from db.partitions import is_partitioned
 
 DB_FILE = "sample_users.db"
 CSV_DIR = Path("bulk_data")
@@ -30,6 +33,11 @@ def create_database_if_needed():
         )
     """)
 
+    if is_partitioned(conn, "sqlite"):
+        # Already split into month shards (manage_partitions.py), which carry their own indexes
+        conn.close()
+        return
+
     # Create index on user_id for faster queries
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_user_id
@@ -143,9 +151,25 @@ def main():
     print("[OK] Database ready")
     print()
 
+    # Row-level counter triggers would fire per inserted row; recount once after the load instead
+    conn = sqlite3.connect(DB_FILE)
+    drop_counter_triggers(conn, "sqlite")
+    conn.close()
+
     # Load CSV files
     load_csv_files()
 
+    # Composite, covering and partial indexes (built after the load so inserts stay fast)
+    print("Applying index migrations...")
+    conn = sqlite3.connect(DB_FILE)
+    for name in apply_migrations(conn, "sqlite"):
+        print(f"[OK] {name}")
+
+    # System health counters (and the triggers that keep them current from here on)
+    print("Rebuilding counters...")
+    print(f"[OK] {rebuild_counters(conn, 'sqlite'):,} counters")
+    conn.close()
+
     # Show stats
     show_database_stats()
 
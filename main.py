@@ -8,6 +8,7 @@ from routes.auth_routes import setup_auth_routes
 from routes.platform_routes import setup_platform_routes
 from routes.linkedin_routes import setup_linkedin_routes
 from routes.system_routes import setup_system_routes
+from utils.tracing import TracingMiddleware
 
 
 # Initialize FastHTML app with session support
@@ -18,6 +19,9 @@ app, rt = fast_app(
     )
 )
 
+# Per-request stage and SQL timings (Server-Timing header, System Health, /metrics)
+app.add_middleware(TracingMiddleware)
+
 # Setup all routes
 setup_auth_routes(rt)
 setup_platform_routes(rt)
@@ -0,0 +1,79 @@
+"""
+Build and check the url_status_company counters behind the System Health page
+
+Usage:
+    python manage_counters.py rebuild            # Install the triggers and recount from scratch
+    python manage_counters.py show               # Print the current counters
+    python manage_counters.py reconcile          # Compare the counters with the base table
+    python manage_counters.py reconcile --fix    # ...and rebuild them if they drifted
+
+Add --backend sqlite to work on sample_users.db instead of PostgreSQL.
+Set USE_SYSTEM_COUNTERS = True in config.py once the counters are built.
+"""
+import argparse
+import sys
+import time
+from config import DB_BACKEND
+from db.counters import counters_exist, rebuild_counters, reconcile_counters, fetch_counter_totals
+from refresh_rollup import open_connection
+from utils.cache import invalidate_all
+
+
+def run_rebuild(conn, backend: str):
+    start = time.time()
+    counters = rebuild_counters(conn, backend)
+    invalidate_all()
+    print(f"[OK] Counters rebuilt: {counters:,} counters in {time.time() - start:.1f}s")
+
+
+def run_show(conn, backend: str):
+    totals = fetch_counter_totals(conn, backend)
+    print(f"Total records: {totals['total_records']:,}")
+    print(f"Unique users:  {totals['unique_users']:,}")
+    for item in totals['status_distribution']:
+        print(f"  {item['status']:<12} {item['count']:>12,}")
+
+
+def run_reconcile(conn, backend: str, fix: bool) -> bool:
+    start = time.time()
+    mismatches = reconcile_counters(conn)
+    if not mismatches:
+        print(f"[OK] Counters match the base table ({time.time() - start:.1f}s)")
+        return True
+
+    print(f"Found {len(mismatches)} drifted counters:")
+    for kind, key, actual, counted in mismatches[:50]:
+        print(f"  {kind} {key}: actual {actual:,} vs counter {counted:,} ({counted - actual:+,})")
+    if not fix:
+        print("Counters drift when rows change while the triggers are dropped. Fix with: "
+              "python manage_counters.py reconcile --fix")
+        return False
+    run_rebuild(conn, backend)
+    return True
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Manage the url_status_company counters")
+    parser.add_argument("command", choices=["rebuild", "show", "reconcile"])
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--fix", action="store_true", help="Rebuild the counters if they drifted (reconcile only)")
+    args = parser.parse_args()
+
+    conn = open_connection(args.backend)
+    try:
+        if args.command == "rebuild":
+            run_rebuild(conn, args.backend)
+        elif not counters_exist(conn, args.backend):
+            print("Counters have not been built yet. Run: python manage_counters.py rebuild")
+            sys.exit(1)
+        elif args.command == "show":
+            run_show(conn, args.backend)
+        elif not run_reconcile(conn, args.backend, args.fix):
+            sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
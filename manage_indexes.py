@@ -0,0 +1,107 @@
+"""
+Create the url_status_company indexes and check that queries use them
+
+Usage:
+    python manage_indexes.py migrate             # Apply pending index migrations
+    python manage_indexes.py status              # Show applied and pending migrations
+    python manage_indexes.py advise              # EXPLAIN every dashboard query, flag sequential scans
+    python manage_indexes.py advise --user-id 12 --verbose
+
+Add --backend sqlite to work on sample_users.db instead of PostgreSQL.
+"""
+import argparse
+import sys
+import time
+from config import DB_BACKEND, DEFAULT_USER_ID
+from db.migrations import MIGRATIONS, ensure_migrations_table, get_applied_migrations, apply_migrations
+from db.index_advisor import run_advisor
+from refresh_rollup import open_connection
+
+
+def run_migrate(backend: str):
+    conn = open_connection(backend)
+    try:
+        start = time.time()
+        applied = apply_migrations(conn, backend)
+    finally:
+        conn.close()
+    if not applied:
+        print("[OK] No pending migrations")
+        return
+    for name in applied:
+        print(f"[OK] Applied {name}")
+    print(f"{len(applied)} migration(s) in {time.time() - start:.1f}s")
+
+
+def run_status(backend: str):
+    conn = open_connection(backend)
+    try:
+        ensure_migrations_table(conn, backend)
+        applied = get_applied_migrations(conn)
+    finally:
+        conn.close()
+    for name, _ in MIGRATIONS:
+        print(f"  {'applied ' + str(applied[name]) if name in applied else 'PENDING':<28} {name}")
+
+
+def run_advise(backend: str, user_id: int, verbose: bool) -> int:
+    if backend == "sqlite":
+        open_connection(backend).close()  # Exits with a hint if the sample database is missing
+
+    print("=" * 60)
+    print(f"INDEX ADVISOR ({backend}, user {user_id})")
+    print("=" * 60)
+
+    flagged = 0
+    for result in run_advisor(backend, user_id):
+        scans = [scan for statement in result['statements'] for scan in statement['seq_scans']]
+        if result['error']:
+            tag = "[ERROR]"
+        elif scans:
+            tag = "[SEQ SCAN]"
+            flagged += 1
+        else:
+            tag = "[OK]"
+        print(f"{tag:<11} {result['label']}")
+        if result['error']:
+            print(f"            {result['error']}")
+        for scan in scans:
+            print(f"            sequential scan: {scan}")
+        if verbose or scans:
+            for statement in result['statements']:
+                if verbose:
+                    print(f"            SQL: {statement['sql'][:140]}")
+                for line in statement['plan']:
+                    print(f"              {line}")
+
+    print()
+    if flagged:
+        print(f"{flagged} queries scan a whole table. Run 'python manage_indexes.py migrate' if indexes are missing;")
+        print("whole-table aggregates (system stats) scan by design.")
+    else:
+        print("[OK] Every query is served by an index")
+    return flagged
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Manage url_status_company indexes")
+    parser.add_argument("command", choices=["migrate", "status", "advise"])
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--user-id", type=int, default=DEFAULT_USER_ID, help="User whose queries to EXPLAIN")
+    parser.add_argument("--verbose", action="store_true", help="Print the SQL and plan for every query")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 if any query does a sequential scan")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        run_migrate(args.backend)
+    elif args.command == "status":
+        run_status(args.backend)
+    else:
+        flagged = run_advise(args.backend, args.user_id, args.verbose)
+        if args.strict and flagged:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Partition url_status_company by month and manage the partitions
+
+Usage:
+    python manage_partitions.py partition            # One-off: convert the table to monthly partitions
+    python manage_partitions.py ensure               # Create this month's and the next months' partitions (cron)
+    python manage_partitions.py list                 # Partitions and their row counts
+    python manage_partitions.py detach --keep 24     # Archive partitions older than 24 months
+    python manage_partitions.py detach --keep 24 --drop
+
+Add --backend sqlite to work on sample_users.db instead of PostgreSQL, where
+the months become shard tables behind a url_status_company view.
+"""
+import argparse
+import sys
+import time
+from config import DB_BACKEND, PARTITION_MONTHS_AHEAD
+from db.partitions import (
+    ARCHIVE_SCHEMA, is_partitioned, list_partitions, partition_table, ensure_partitions, detach_partitions
+)
+from refresh_rollup import open_connection
+from utils.cache import invalidate_all
+
+
+def run_partition(conn, backend: str, ahead: int):
+    print("Copying url_status_company into monthly partitions (writes wait until this finishes)...")
+    start = time.time()
+    created = partition_table(conn, backend, ahead)
+    invalidate_all()
+    print(f"[OK] {created} monthly partitions plus default in {time.time() - start:.1f}s")
+    if backend == "postgres":
+        print("The original table is kept as url_status_company_unpartitioned; drop it once you've checked the copy.")
+    else:
+        print("Run VACUUM on the database to reclaim the space of the original table.")
+
+
+def run_ensure(conn, backend: str, ahead: int):
+    created = ensure_partitions(conn, backend, ahead)
+    if not created:
+        print(f"[OK] Partitions exist through {ahead} months ahead")
+    for name in created:
+        print(f"[OK] Created {name}")
+
+
+def run_list(conn, backend: str):
+    partitions = list_partitions(conn, backend)
+    for partition in partitions:
+        month = partition['month'].strftime('%Y-%m') if partition['month'] else "default"
+        print(f"  {month:<8} {partition['name']:<32} {partition['rows']:>12,}")
+    print(f"{len(partitions)} partitions" + (" (row counts are planner estimates)" if backend == "postgres" else ""))
+
+
+def run_detach(conn, backend: str, keep: int, drop: bool):
+    from db.sqlite_queries import SAMPLE_DB_PATH
+    archive_path = str(SAMPLE_DB_PATH.with_name(SAMPLE_DB_PATH.stem + "_archive.db"))
+    detached = detach_partitions(conn, backend, keep, drop, archive_path)
+    if not detached:
+        print(f"[OK] No partitions older than {keep} months")
+        return
+    invalidate_all()
+    where = "dropped" if drop else (f"moved to schema {ARCHIVE_SCHEMA}" if backend == "postgres" else archive_path)
+    for name in detached:
+        print(f"[OK] {name}: {where}")
+    print("The daily rollup still covers these months; run 'python refresh_rollup.py backfill' to drop them from it.")
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of url_status_company")
+    parser.add_argument("command", choices=["partition", "ensure", "list", "detach"])
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="Months to create in advance")
+    parser.add_argument("--keep", type=int, default=24, help="Months of partitions to keep (detach only)")
+    parser.add_argument("--drop", action="store_true", help="Drop old partitions instead of archiving them")
+    args = parser.parse_args()
+
+    conn = open_connection(args.backend)
+    try:
+        if args.command == "partition":
+            if is_partitioned(conn, args.backend):
+                print("[OK] url_status_company is already partitioned")
+            else:
+                run_partition(conn, args.backend, args.ahead)
+        elif not is_partitioned(conn, args.backend):
+            print("url_status_company is not partitioned yet. Run: python manage_partitions.py partition")
+            sys.exit(1)
+        elif args.command == "ensure":
+            run_ensure(conn, args.backend, args.ahead)
+        elif args.command == "list":
+            run_list(conn, args.backend)
+        else:
+            run_detach(conn, args.backend, args.keep, args.drop)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Rank SQL statements by fingerprint: the slow-query log, or a live run of the dashboard queries
+
+Usage:
+    python query_report.py                          # Top 10 fingerprints in SLOW_QUERY_LOG by total time
+    python query_report.py --sort p95 --top 5
+    python query_report.py --since 2026-10-01 --verbose   # With the SQL, slowest parameters and plan
+    python query_report.py --run --repeat 20        # Run every dashboard query 20 times and rank them
+
+--run uses the index advisor's checks (db/index_advisor.py CHECKS) for
+--user-id; add --backend sqlite to run against sample_users.db.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from collections import defaultdict
+from config import DB_BACKEND, DEFAULT_USER_ID, SLOW_QUERY_LOG, SLOW_QUERY_MS
+from db import query_stats
+from db.query_stats import summarize, get_query_stats
+
+SORT_KEYS = {
+    "total": "total_ms",
+    "mean": "mean_ms",
+    "p95": "p95_ms",
+    "max": "max_ms",
+    "calls": "calls",
+}
+
+
+def read_log(path: str, since: str = None) -> list:
+    """Report rows per fingerprint from the slow-query log, each with its slowest entry"""
+    entries = defaultdict(list)
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+                if since and entry['ts'] < since:
+                    continue
+                entries[entry['fingerprint']].append(entry)
+    except FileNotFoundError:
+        print(f"{path} not found. Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS} ms) are logged there.")
+        sys.exit(1)
+
+    rows = []
+    for fingerprint_id, items in entries.items():
+        slowest = max(items, key=lambda e: e['ms'])
+        row = summarize(fingerprint_id, slowest['sql'], [e['ms'] for e in items], sum(e['rows'] for e in items))
+        row['slowest'] = slowest
+        row['paths'] = sorted({e['path'] for e in items if e.get('path')})
+        rows.append(row)
+    return rows
+
+
+def run_checks(backend: str, user_id: int, repeat: int) -> list:
+    """Run the dashboard queries in-process and return this process's statement statistics"""
+    from db.index_advisor import CHECKS
+    if backend == "sqlite":
+        from refresh_rollup import open_connection
+        open_connection(backend).close()  # Exits with a hint if the sample database is missing
+        from db import sqlite_queries as module
+    else:
+        from db import queries as module
+
+    query_stats.SLOW_QUERY_MS = math.inf  # Rank only; do not append to the log
+    for _ in range(repeat):
+        for label, func_name, make_args in CHECKS:
+            func = getattr(module, func_name + ("_sqlite" if backend == "sqlite" else ""))
+            try:
+                func(*make_args(user_id))
+            except Exception as e:
+                print(f"[ERROR] {label}: {e}")
+    return get_query_stats()
+
+
+def print_report(rows: list, sort: str, top: int, verbose: bool):
+    rows = sorted(rows, key=lambda r: r[SORT_KEYS[sort]], reverse=True)
+    print(f"{'#':>3} {'Fingerprint':<13} {'Calls':>7} {'Total ms':>10} {'Mean':>9} {'p95':>9} {'Max':>9} "
+          f"{'Rows/call':>10}  SQL")
+    for rank, r in enumerate(rows[:top], 1):
+        sql = r['sql'] if verbose else (r['sql'][:70] + "..." if len(r['sql']) > 70 else r['sql'])
+        print(f"{rank:>3} {r['fingerprint']:<13} {r['calls']:>7,} {r['total_ms']:>10,.1f} {r['mean_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['max_ms']:>9.1f} {r['rows_per_call']:>10,.1f}  {sql}")
+        if verbose and 'slowest' in r:
+            slowest = r['slowest']
+            print(f"{'':>17} slowest: {slowest['ms']:,.1f} ms at {slowest['ts']} "
+                  f"({slowest.get('path') or 'no request'}), params {slowest['params']}")
+            if r['paths']:
+                print(f"{'':>17} routes: {', '.join(r['paths'])}")
+            for line in slowest.get('plan') or []:
+                print(f"{'':>19}{line}")
+    if len(rows) > top:
+        print(f"... {len(rows) - top} more fingerprint(s)")
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Rank SQL statements by fingerprint")
+    parser.add_argument("--log", default=SLOW_QUERY_LOG, help="Slow-query log to read")
+    parser.add_argument("--since", help="Only log entries at or after this time (e.g. 2026-10-01T08:00)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--sort", choices=list(SORT_KEYS), default="total")
+    parser.add_argument("--verbose", action="store_true", help="Full SQL, slowest parameters and plan")
+    parser.add_argument("--run", action="store_true", help="Run the dashboard queries instead of reading the log")
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--user-id", type=int, default=DEFAULT_USER_ID, help="User whose queries to run (--run)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each dashboard query (--run)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    if args.run:
+        print(f"QUERY REPORT ({args.backend}, user {args.user_id}, {args.repeat} run(s) per query)")
+        print("=" * 60)
+        start = time.time()
+        rows = run_checks(args.backend, args.user_id, args.repeat)
+        print(f"{sum(r['calls'] for r in rows):,} statements in {time.time() - start:.1f}s\n")
+    else:
+        print(f"QUERY REPORT ({args.log})")
+        print("=" * 60)
+        rows = read_log(args.log, args.since)
+        print(f"{sum(r['calls'] for r in rows):,} slow statements, {len(rows)} fingerprint(s)\n")
+
+    if rows:
+        print_report(rows, args.sort, args.top, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Build, refresh and verify the per-user daily rollup table
+
+Usage:
+    python refresh_rollup.py backfill            # Rebuild from scratch
+    python refresh_rollup.py refresh             # Incremental refresh (run from cron)
+    python refresh_rollup.py refresh --every 300 # Keep refreshing every 5 minutes
+    python refresh_rollup.py verify              # Compare rollup totals with the raw table
+
+Add --backend sqlite to work on sample_users.db instead of PostgreSQL.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from config import DB_BACKEND
+from db.rollup import ensure_rollup_tables, backfill_rollup, refresh_rollup, verify_rollup, get_rollup_state
+from utils.cache import invalidate_all
+
+
+def open_connection(backend: str):
+    """Open a direct connection for the selected backend"""
+    if backend == "sqlite":
+        from db.sqlite_queries import SAMPLE_DB_PATH
+        if not SAMPLE_DB_PATH.exists():
+            print(f"{SAMPLE_DB_PATH} not found. Run create_sample_db.py or load_bulk_data.py first.")
+            sys.exit(1)
+        return sqlite3.connect(str(SAMPLE_DB_PATH))
+    from db.connection import get_db_connection
+    return get_db_connection()
+
+
+def run_backfill(conn, backend: str):
+    start = time.time()
+    rows = backfill_rollup(conn, backend)
+    invalidate_all()
+    print(f"[OK] Rollup rebuilt: {rows:,} rows in {time.time() - start:.1f}s")
+
+
+def run_refresh(conn, backend: str):
+    start = time.time()
+    affected = refresh_rollup(conn, backend)
+    if affected:
+        # Dashboards cached before the refresh are stale (reaches all workers via the shared cache)
+        invalidate_all()
+    if affected < 0:
+        print(f"[OK] No rollup state found, rebuilt from scratch in {time.time() - start:.1f}s")
+    else:
+        print(f"[OK] Refreshed {affected:,} user-days in {time.time() - start:.1f}s")
+
+
+def run_verify(conn, backend: str) -> bool:
+    state = get_rollup_state(conn)
+    if state is None:
+        print("Rollup has not been built yet. Run: python refresh_rollup.py backfill")
+        return False
+
+    print(f"Rollup high-water mark: id {state['id_hwm']:,}, last_update {state['last_update_hwm']}")
+    mismatches = verify_rollup(conn, backend)
+    if not mismatches:
+        print("[OK] Rollup totals match the raw table")
+        return True
+
+    print(f"Found {len(mismatches)} mismatching (user, status) totals:")
+    for user_id, status, raw_count, rollup_count in mismatches[:50]:
+        print(f"  User {user_id} / {status}: raw {raw_count:,} vs rollup {rollup_count:,}")
+    print("Rows updated after the last refresh show up here; run refresh first, or backfill to rebuild.")
+    return False
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description="Manage the url_status_company daily rollup")
+    parser.add_argument("command", choices=["backfill", "refresh", "verify"])
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default=DB_BACKEND)
+    parser.add_argument("--every", type=int, default=0,
+                        help="Repeat refresh every N seconds (refresh only)")
+    args = parser.parse_args()
+
+    conn = open_connection(args.backend)
+    try:
+        ensure_rollup_tables(conn, args.backend)
+        if args.command == "backfill":
+            run_backfill(conn, args.backend)
+        elif args.command == "refresh":
+            run_refresh(conn, args.backend)
+            while args.every > 0:
+                time.sleep(args.every)
+                run_refresh(conn, args.backend)
+        else:
+            if not run_verify(conn, args.backend):
+                sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
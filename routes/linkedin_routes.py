@@ -2,22 +2,415 @@
 LinkedIn dashboard routes
 """
 from fasthtml.common import *
-from datetime import datetime, timedelta
+import asyncio
+import html
+import json
+from urllib.parse import urlencode
 import pandas as pd
-from auth import require_auth
-from db.queries import fetch_user_data, fetch_health_check_data
+from auth import require_auth, require_auth_partial
+from db.async_queries import (
+    fetch_user_kpis_async, fetch_latest_entries_page_async, user_has_data_async, fetch_health_check_data_async,
+    export_max_id_async, export_rows
+)
+from db.export import FORMATS as EXPORT_FORMATS, export_cutoff
 from utils.mock_data import (
     generate_mock_stats, generate_mock_dataframe, generate_mock_status_distribution,
     generate_mock_scraper_status, generate_mock_timeline, generate_mock_processing_time
 )
 from components.charts import (
-    generate_plot_html, create_status_pie_chart, create_scraper_status_bar_chart,
-    create_infrastructure_chart, create_timeline_chart, create_processing_time_histogram
+    render_chart, chart_series, create_status_distribution_chart, create_scraper_distribution_chart,
+    create_infrastructure_chart, create_daily_timeline_chart, create_processing_time_binned_chart
 )
+from components.chart_scripts import CHART_SCRIPT
+from components.tables import render_table, render_rows, frame_text, bool_formatter
+from components.row_browser import ROW_BROWSER_SCRIPT
 from config import (
     DEFAULT_USER_ID, ACTIVE_ACCOUNTS, ACCOUNTS_ON_HOLD, ACTIVE_WORKERS,
-    MAX_PROCESSING_TIME, LATEST_ENTRIES_LIMIT, APP_VERSION, USE_DEMO_DATA_FOR_PRIVATE_POOL
+    LATEST_ENTRIES_LIMIT, APP_VERSION, USE_DEMO_DATA_FOR_PRIVATE_POOL,
+    CACHE_TTLS, HEALTH_CHECK_CACHE_TTL, CHART_RENDER_MODE, DASHBOARD_LAZY_SECTIONS,
+    ROW_STREAM_BATCH_ROWS, ROW_STREAM_MAX_BATCHES
 )
+from utils.kpis import PERIODS, get_period_label, bin_processing_times
+from utils.cache import dashboard_cache
+from utils.pagination import clean_filters
+from utils.tracing import span
+
+# Emergency is 0/1 on SQLite and a bool on PostgreSQL
+ENTRY_FORMATTERS = {'emergency': bool_formatter()}
+
+
+async def load_dashboard_data(selected_user_id: int, period: str, use_mock_data: bool):
+    """Compute the KPI and chart data for one dashboard view (None if the user has no data)"""
+    if use_mock_data:
+        # Generate mock statistics (no database needed!)
+        mock_stats = generate_mock_stats(selected_user_id, period)
+        return {
+            'total_companies': mock_stats['total_companies'],
+            'successful_scrapes': mock_stats['successful_scrapes'],
+            'success_rate': mock_stats['success_rate'],
+            'emergency_count': mock_stats['emergency_count'],
+            'avg_processing_time': mock_stats['avg_processing_time'],
+            # Variable infrastructure metrics per user
+            'active_accounts': mock_stats['active_accounts'],
+            'accounts_on_hold': mock_stats['accounts_on_hold'],
+            'active_workers': mock_stats['active_workers'],
+            # Generate mock data for charts
+            'status_counts': generate_mock_status_distribution(selected_user_id),
+            'scraper_counts': generate_mock_scraper_status(selected_user_id),
+            'timeline': generate_mock_timeline(selected_user_id, period),
+            'processing_bins': bin_processing_times(generate_mock_processing_time(selected_user_id)['processing_time']),
+        }
+
+    # Use REAL data from PostgreSQL for user 11 (aggregated in SQL)
+    kpis = await fetch_user_kpis_async(selected_user_id, period)
+    if kpis['total_companies'] == 0 and not await user_has_data_async(selected_user_id):
+        return None
+
+    # Use default infrastructure values for real data
+    return dict(kpis, active_accounts=ACTIVE_ACCOUNTS, accounts_on_hold=ACCOUNTS_ON_HOLD,
+                active_workers=ACTIVE_WORKERS)
+
+
+async def load_latest_entries(selected_user_id: int, period: str, use_mock_data: bool, cursor: str = None,
+                              direction: str = "next", filters: dict = None,
+                              limit: int = LATEST_ENTRIES_LIMIT) -> dict:
+    """One page of the Latest Entries table (rows, next_cursor, prev_cursor)"""
+    if use_mock_data:
+        # Generate small dataframe for table display (a single page)
+        df = generate_mock_dataframe(selected_user_id, num_records=20)
+        for name, value in clean_filters(filters).items():
+            df = df[df[name] == value]
+        df = df.sort_values('compute_datetime', ascending=False).reset_index(drop=True)
+        return {'rows': df, 'next_cursor': None, 'prev_cursor': None}
+    return await fetch_latest_entries_page_async(selected_user_id, period, limit, cursor, direction, filters)
+
+
+async def stream_entry_pages(view: dict, cursor: str = None, filters: dict = None,
+                             batches: int = ROW_STREAM_MAX_BATCHES):
+    """Up to `batches` keyset pages of ROW_STREAM_BATCH_ROWS entries, newest first, fetched one at a time"""
+    # Not cached: the pages are large and each is read once, as the user scrolls
+    for _ in range(batches):
+        page = await load_latest_entries(view['user_id'], view['period'], view['use_mock_data'], cursor, "next",
+                                         filters, limit=ROW_STREAM_BATCH_ROWS)
+        yield page
+        cursor = page['next_cursor']
+        if cursor is None:
+            return
+
+
+async def entry_batches_ndjson(pages):
+    """One JSON line per page: {columns, rows (display text), next_cursor}; an {error} line if a query fails"""
+    try:
+        async for page in pages:
+            df = page['rows'].drop(columns=['id'], errors='ignore')
+            batch = {'columns': list(df.columns), 'rows': list(zip(*frame_text(df, ENTRY_FORMATTERS))),
+                     'next_cursor': page['next_cursor']}
+            yield json.dumps(batch, separators=(',', ':')) + "\n"
+    except Exception as e:
+        yield json.dumps({'error': str(e)}) + "\n"
+
+
+async def entry_batches_html(pages, more_url: str):
+    """<tr> rows per page, then a row that loads the next request's rows when revealed (HTMX)"""
+    cursor, columns = None, 1
+    try:
+        async for page in pages:
+            df = page['rows'].drop(columns=['id'], errors='ignore')
+            cursor, columns = page['next_cursor'], max(len(df.columns), 1)
+            yield render_rows(df, ENTRY_FORMATTERS)
+    except Exception as e:
+        yield f'<tr><td colspan="{columns}">An error occurred: {html.escape(str(e))}</td></tr>'
+        return
+    if cursor is not None:
+        url = html.escape(f"{more_url}&{urlencode({'cursor': cursor})}")
+        yield (f'<tr hx-get="{url}" hx-trigger="revealed" hx-swap="outerHTML">'
+               f'<td colspan="{columns}">Loading...</td></tr>')
+
+
+def resolve_dashboard_user(pool: str, user_id: int):
+    """Return (selected_user_id, use_mock_data) for a dashboard request"""
+    # Use selected user_id for private pool, DEFAULT_USER_ID for shared
+    selected_user_id = user_id if pool == "private" else DEFAULT_USER_ID
+
+    # Use MOCK data for demo users (12-56), REAL data for user 11
+    use_mock_data = (pool == "private" and USE_DEMO_DATA_FOR_PRIVATE_POOL and selected_user_id != 11)
+    return selected_user_id, use_mock_data
+
+
+def dashboard_view(pool: str, user_id: int, period: str) -> dict:
+    """Everything a dashboard page or section needs to know about the request"""
+    selected_user_id, use_mock_data = resolve_dashboard_user(pool, user_id)
+    return {
+        'user_id': selected_user_id,
+        'pool': pool,
+        'period': period,
+        'period_label': get_period_label(period),
+        'use_mock_data': use_mock_data,
+        'query': f"pool={pool}&user_id={selected_user_id}&period={period}",
+    }
+
+
+async def get_dashboard_data(selected_user_id: int, pool: str, period: str, use_mock_data: bool):
+    """Cached load_dashboard_data keyed by (user_id, pool, period)"""
+    return await dashboard_cache.get_or_compute_async(
+        ('dashboard', selected_user_id, pool, period),
+        lambda: load_dashboard_data(selected_user_id, period, use_mock_data),
+        ttl=CACHE_TTLS.get(period, CACHE_TTLS['overall'])
+    )
+
+
+async def get_latest_entries(selected_user_id: int, pool: str, period: str, use_mock_data: bool,
+                             cursor: str = None, direction: str = "next", filters: dict = None):
+    """Cached load_latest_entries keyed by (user_id, pool, period, 'latest', page and filters)"""
+    filters = clean_filters(filters)
+    return await dashboard_cache.get_or_compute_async(
+        ('dashboard', selected_user_id, pool, period, 'latest', cursor or "", direction,
+         tuple(sorted(filters.items()))),
+        lambda: load_latest_entries(selected_user_id, period, use_mock_data, cursor, direction, filters),
+        ttl=CACHE_TTLS.get(period, CACHE_TTLS['overall'])
+    )
+
+
+async def _load_health_check():
+    # Timestamps arrive parsed (utils.frames)
+    return await fetch_health_check_data_async()
+
+
+async def _fetch_health_check_safe():
+    """Fetch (cached) health check data, returning (df, error) so it never fails the page"""
+    try:
+        return await dashboard_cache.get_or_compute_async(
+            ('health_check',), _load_health_check, ttl=HEALTH_CHECK_CACHE_TTL
+        ), None
+    except Exception as e:
+        return None, e
+
+
+def metrics_section(data: dict, view: dict):
+    """KPI cards (two rows)"""
+    metrics_row_1 = Div(
+        Div(
+            Div("Total Companies", cls="metric-label"),
+            Div(f"{data['total_companies']:,}", cls="metric-value"),
+            cls="metric-card"
+        ),
+        Div(
+            Div("Successfully Scraped", cls="metric-label"),
+            Div(f"{data['successful_scrapes']:,}", cls="metric-value"),
+            cls="metric-card"
+        ),
+        Div(
+            Div("Success Rate", cls="metric-label"),
+            Div(f"{data['success_rate']:.1f}%", cls="metric-value"),
+            cls="metric-card"
+        ),
+        Div(
+            Div("Emergency Tasks", cls="metric-label"),
+            Div(f"{data['emergency_count']:,}", cls="metric-value"),
+            cls="metric-card"
+        ),
+        cls="grid-row"
+    )
+
+    metrics_row_2 = Div(
+        Div(
+            Div("Avg Processing Time", cls="metric-label"),
+            Div(f"{data['avg_processing_time']:.2f}h", cls="metric-value"),
+            cls="metric-card"
+        ),
+        Div(
+            Div("Active Accounts", cls="metric-label"),
+            Div(str(data['active_accounts']), cls="metric-value"),
+            cls="metric-card"
+        ),
+        Div(
+            Div("Accounts On Hold", cls="metric-label"),
+            Div(str(data['accounts_on_hold']), cls="metric-value"),
+            cls="metric-card"
+        ),
+        Div(
+            Div("Active Workers", cls="metric-label"),
+            Div(str(data['active_workers']), cls="metric-value"),
+            cls="metric-card"
+        ),
+        cls="grid-row"
+    )
+    return Div(metrics_row_1, metrics_row_2)
+
+
+def dashboard_chart(name: str, data: dict, view: dict):
+    """One chart: a placeholder for the client-side renderer, or the cached server-rendered HTML"""
+    if CHART_RENDER_MODE == "client":
+        # The chart script fetches the series as JSON and draws it
+        return Div(cls="plotly-graph-div", data_chart=name,
+                   data_src=f"/linkedin/charts/{name}?{view['query']}")
+
+    # Rendered HTML is cached by data hash, so unchanged data skips plotly entirely
+    if name == "status":
+        return render_chart(name, create_status_distribution_chart, data['status_counts'])
+    if name == "scraper":
+        return render_chart(name, create_scraper_distribution_chart, data['scraper_counts'])
+    if name == "infrastructure":
+        return render_chart(name, create_infrastructure_chart,
+                            data['active_accounts'], data['accounts_on_hold'], data['active_workers'])
+    if name == "timeline":
+        return render_chart(name, create_daily_timeline_chart, data['timeline'], view['period_label'])
+    return render_chart(name, create_processing_time_binned_chart, data['processing_bins'])
+
+
+def charts_section(data: dict, view: dict):
+    """Status and scraper status charts"""
+    return Div(
+        Div(Div(dashboard_chart("status", data, view)), cls="col-half chart-container"),
+        Div(Div(dashboard_chart("scraper", data, view)), cls="col-half chart-container"),
+        cls="grid-row"
+    )
+
+
+def processing_section(data: dict, view: dict):
+    """Processing time distribution (pre-binned) next to the infrastructure overview"""
+    infra_chart = Div(Div(dashboard_chart("infrastructure", data, view)), cls="col-half chart-container")
+    if len(data['processing_bins']) > 0:
+        return Div(
+            Div(Div(dashboard_chart("processing_time", data, view)), cls="col-half chart-container"),
+            infra_chart,
+            cls="grid-row"
+        )
+    return Div(infra_chart, cls="grid-row")
+
+
+def timeline_section(data: dict, view: dict):
+    """Scraped companies over time"""
+    return Div(
+        Div(dashboard_chart("timeline", data, view)),
+        cls="chart-container"
+    )
+
+
+def latest_entries_section(page: dict, view: dict, filters: dict = None, data: dict = None):
+    """Latest Entries table with column filters and newer/older page links (swapped in place by HTMX)"""
+    filters = filters or {}
+    latest_table = render_table(page['rows'].drop(columns=['id'], errors='ignore'), formatters=ENTRY_FORMATTERS)
+
+    base = {'pool': view['pool'], 'user_id': view['user_id'], 'period': view['period'],
+            **{name: filters.get(name) or "" for name in ('status', 'scraper_status', 'emergency')}}
+
+    def page_link(label: str, cursor: str, direction: str):
+        if cursor is None:
+            return Span(label, cls="filter-btn", style="opacity: 0.4; cursor: default;")
+        query = urlencode(dict(base, cursor=cursor, direction=direction))
+        return A(label, href="#", hx_get=f"/linkedin/latest-entries?{query}",
+                 hx_target="#latest-entries", hx_swap="outerHTML", cls="filter-btn")
+
+    def filter_select(name: str, label: str, options):
+        selected = str(filters.get(name) or "")
+        return Select(
+            Option(f"All {label}", value=""),
+            *[Option(text, value=value, selected=(value == selected)) for value, text in options],
+            name=name, cls="table-filter"
+        )
+
+    # Filter choices come from the (cached) chart data, so they cost no extra query
+    status_options = [(str(v), str(v)) for v in data['status_counts']['Status']] if data else []
+    scraper_options = [(str(v), str(v)) for v in data['scraper_counts']['Scraper Status']] if data else []
+
+    filter_form = Form(
+        Hidden(name="pool", value=view['pool']),
+        Hidden(name="user_id", value=str(view['user_id'])),
+        Hidden(name="period", value=view['period']),
+        filter_select("status", "statuses", status_options),
+        filter_select("scraper_status", "scraper statuses", scraper_options),
+        filter_select("emergency", "tasks", [("1", "Emergency only"), ("0", "Non-emergency only")]),
+        hx_get="/linkedin/latest-entries",
+        hx_trigger="change",
+        hx_target="#latest-entries",
+        hx_swap="outerHTML",
+        cls="table-filters"
+    )
+
+    return Div(
+        H3("Latest Entries"),
+        filter_form,
+        Div(latest_table, style="overflow-x: auto;"),
+        Div(
+            page_link("← Newer", page['prev_cursor'], "prev"),
+            page_link("Older →", page['next_cursor'], "next"),
+            A("All entries", href=f"/linkedin/entries?{urlencode(base)}", cls="filter-btn"),
+            cls="filter-buttons"
+        ),
+        id="latest-entries",
+        cls="chart-container"
+    )
+
+
+def health_check_section(health_check_df: pd.DataFrame, health_check_error: Exception = None):
+    """Infrastructure health check table (never fails the page)"""
+    try:
+        if health_check_error is not None:
+            raise health_check_error
+        if health_check_df.empty:
+            return Div()
+
+        return Div(
+            Div(
+                H3("Infrastructure Health Check - Latest Entries", cls="health-check-title"),
+                P("Verification scrapes to monitor infrastructure status", style="color: #666; font-size: 0.9em;"),
+                Div(render_table(health_check_df), style="overflow-x: auto;"),
+                cls="health-check-section"
+            ),
+            cls="chart-container"
+        )
+    except Exception as e:
+        return Div(
+            P(f"Unable to load health check data: {e}", style="color: #ff6b6b; padding: 10px;"),
+            cls="chart-container"
+        )
+
+
+# Dashboard sections in page order; those built from the KPI data share one cached load
+DASHBOARD_SECTIONS = ("metrics", "charts", "processing", "timeline", "latest", "health")
+_KPI_SECTIONS = {
+    "metrics": metrics_section,
+    "charts": charts_section,
+    "processing": processing_section,
+    "timeline": timeline_section,
+}
+
+
+async def render_dashboard_section(name: str, view: dict):
+    """Load the data for one dashboard section and build it"""
+    try:
+        if name == "health":
+            health_check = await _fetch_health_check_safe()
+            with span("build.health"):
+                return health_check_section(*health_check)
+
+        args = (view['user_id'], view['pool'], view['period'], view['use_mock_data'])
+        if name == "latest":
+            page, data = await asyncio.gather(get_latest_entries(*args), get_dashboard_data(*args))
+            with span("build.latest"):
+                return latest_entries_section(page, view, data=data)
+
+        data = await get_dashboard_data(*args)
+        if data is None:
+            if name == "metrics":
+                return Div(P(f"No data found for User ID {view['user_id']}."), cls="container")
+            return Div()
+        with span(f"build.{name}"):
+            return _KPI_SECTIONS[name](data, view)
+    except Exception as e:
+        return Div(f"An error occurred: {e}", style="color: red; padding: 20px;")
+
+
+def section_placeholder(name: str, view: dict):
+    """Empty section that HTMX replaces with /linkedin/dashboard/section/<name> once the page loads"""
+    return Div(
+        P("Loading…", cls="section-loading-text"),
+        hx_get=f"/linkedin/dashboard/section/{name}?{view['query']}",
+        hx_trigger="load",
+        hx_swap="outerHTML",
+        cls="section-loading"
+    )
 
 
 def setup_linkedin_routes(rt):
@@ -62,148 +455,26 @@ def setup_linkedin_routes(rt):
         )
 
     @rt("/linkedin/dashboard")
-    def linkedin_dashboard(period: str = "overall", pool: str = "private", user_id: int = 11, sess: dict = None):
-        """LinkedIn KPI Dashboard"""
+    async def linkedin_dashboard(period: str = "overall", pool: str = "private", user_id: int = 11, sess: dict = None):
+        """LinkedIn KPI Dashboard (page shell; sections load from their own partials)"""
         redirect = require_auth(sess)
         if redirect:
             return redirect
 
         try:
-            # Use selected user_id for private pool, DEFAULT_USER_ID for shared
-            selected_user_id = user_id if pool == "private" else DEFAULT_USER_ID
-
-            # Use MOCK data for demo users (12-56), REAL data for user 11
-            use_mock_data = (pool == "private" and USE_DEMO_DATA_FOR_PRIVATE_POOL and selected_user_id != 11)
+            view = dashboard_view(pool, user_id, period)
+            selected_user_id = view['user_id']
+            period_label = view['period_label']
 
             # Version: v2 for user 11 (real data), v3 for mock users
             app_version = "v2" if selected_user_id == 11 else "v3"
 
-            if use_mock_data:
-                # Generate mock statistics (no database needed!)
-                mock_stats = generate_mock_stats(selected_user_id, period)
-                total_companies = mock_stats['total_companies']
-                successful_scrapes = mock_stats['successful_scrapes']
-                success_rate = mock_stats['success_rate']
-                emergency_count = mock_stats['emergency_count']
-                avg_processing_time = mock_stats['avg_processing_time']
-
-                # Variable infrastructure metrics per user
-                active_accounts = mock_stats['active_accounts']
-                accounts_on_hold = mock_stats['accounts_on_hold']
-                active_workers = mock_stats['active_workers']
-
-                # Generate mock data for charts
-                df_status = generate_mock_status_distribution(selected_user_id)
-                df_scraper = generate_mock_scraper_status(selected_user_id)
-                df_timeline = generate_mock_timeline(selected_user_id, period)
-                df_processing = generate_mock_processing_time(selected_user_id)
-
-                # Generate small dataframe for table display
-                latest_df = generate_mock_dataframe(selected_user_id, num_records=20)
-
-            else:
-                # Use REAL data from PostgreSQL for user 11
-                df = fetch_user_data(selected_user_id)
-
-                if df.empty:
-                    return Titled("KPI - Altsignals | Dashboard",
-                        Div(P(f"No data found for User ID {selected_user_id}."), cls="container")
-                    )
-
-                # Use default infrastructure values for real data
-                active_accounts = ACTIVE_ACCOUNTS
-                accounts_on_hold = ACCOUNTS_ON_HOLD
-                active_workers = ACTIVE_WORKERS
-
-                # Process Data
-                df['compute_datetime'] = pd.to_datetime(df['compute_datetime'])
-                df['last_update'] = pd.to_datetime(df['last_update'])
-
-                # Apply period filter
-                now = datetime.now()
-                df_filtered = df.copy()
-
-                if period == "daily":
-                    cutoff = now - timedelta(days=1)
-                    df_filtered = df_filtered[df_filtered['compute_datetime'] >= cutoff]
-                    period_label = "Last 24 Hours"
-                elif period == "weekly":
-                    cutoff = now - timedelta(weeks=1)
-                    df_filtered = df_filtered[df_filtered['compute_datetime'] >= cutoff]
-                    period_label = "Last Week"
-                elif period == "monthly":
-                    cutoff = now - timedelta(days=30)
-                    df_filtered = df_filtered[df_filtered['compute_datetime'] >= cutoff]
-                    period_label = "Last 30 Days"
-                elif period == "quarterly":
-                    cutoff = now - timedelta(days=90)
-                    df_filtered = df_filtered[df_filtered['compute_datetime'] >= cutoff]
-                    period_label = "Last Quarter"
-                elif period == "yearly":
-                    cutoff = now - timedelta(days=365)
-                    df_filtered = df_filtered[df_filtered['compute_datetime'] >= cutoff]
-                    period_label = "Last Year"
-                else:
-                    period_label = "All Time"
-
-                # Calculate metrics from REAL data
-                total_companies = len(df_filtered)
-                successful_scrapes = len(df_filtered[df_filtered['status'] == 'done'])
-                success_rate = (successful_scrapes / total_companies * 100) if total_companies > 0 else 0
-                emergency_count = len(df_filtered[df_filtered['emergency'] == True])
-
-                # Calculate average processing time
-                df_filtered['processing_time'] = (df_filtered['last_update'] - df_filtered['compute_datetime']).dt.total_seconds() / 3600
-                df_valid_time = df_filtered[(df_filtered['processing_time'] > 0) & (df_filtered['processing_time'] <= MAX_PROCESSING_TIME)]
-                avg_processing_time = df_valid_time['processing_time'].mean() if len(df_valid_time) > 0 else 0
-
-                # Generate chart data from REAL data
-                df_status = df_filtered['status'].value_counts().reset_index()
-                df_status.columns = ['Status', 'Count']
-
-                df_scraper = df_filtered['scraper_status'].value_counts().reset_index()
-                df_scraper.columns = ['Scraper Status', 'Count']
-
-                df_filtered['date'] = df_filtered['compute_datetime'].dt.date
-                df_timeline = df_filtered.groupby('date').size().reset_index(name='Count')
-
-                df_processing = df_valid_time[['processing_time']].copy() if len(df_valid_time) > 0 else pd.DataFrame()
-
-                # Table data from REAL data
-                latest_df = df_filtered.sort_values(by='compute_datetime', ascending=False).head(LATEST_ENTRIES_LIMIT)
-                columns_to_drop = ['date', 'processing_time', 'ticker_eod', 'recycled_datetime_task', 'user_id', 'id']
-                latest_df = latest_df.drop(columns=[col for col in columns_to_drop if col in latest_df.columns])
-
-            # Period label for mock data
-            if use_mock_data:
-                if period == "daily":
-                    period_label = "Last 24 Hours"
-                elif period == "weekly":
-                    period_label = "Last Week"
-                elif period == "monthly":
-                    period_label = "Last 30 Days"
-                elif period == "quarterly":
-                    period_label = "Last Quarter"
-                elif period == "yearly":
-                    period_label = "Last Year"
-                else:
-                    period_label = "All Time"
-
             # Create Filter Buttons
-            periods = [
-                ("overall", "All Time"),
-                ("daily", "Daily"),
-                ("weekly", "Weekly"),
-                ("monthly", "Monthly"),
-                ("quarterly", "Quarterly"),
-                ("yearly", "Yearly")
-            ]
-
             filter_buttons = Div(
                 *[A(label,
                     href=f"/linkedin/dashboard?pool={pool}&period={p}&user_id={selected_user_id}",
                     cls=f"filter-btn {'active' if p == period else ''}")
-                  for p, label in periods],
+                  for p, label, _, _ in PERIODS],
                 cls="filter-buttons"
             )
 
@@ -230,157 +501,11 @@ def setup_linkedin_routes(rt):
             else:
                 user_selector = Div()  # No selector for shared pool
 
-            # Build Metrics
-            metrics_row_1 = Div(
-                Div(
-                    Div("Total Companies", cls="metric-label"),
-                    Div(f"{total_companies:,}", cls="metric-value"),
-                    cls="metric-card"
-                ),
-                Div(
-                    Div("Successfully Scraped", cls="metric-label"),
-                    Div(f"{successful_scrapes:,}", cls="metric-value"),
-                    cls="metric-card"
-                ),
-                Div(
-                    Div("Success Rate", cls="metric-label"),
-                    Div(f"{success_rate:.1f}%", cls="metric-value"),
-                    cls="metric-card"
-                ),
-                Div(
-                    Div("Emergency Tasks", cls="metric-label"),
-                    Div(f"{emergency_count:,}", cls="metric-value"),
-                    cls="metric-card"
-                ),
-                cls="grid-row"
-            )
-
-            metrics_row_2 = Div(
-                Div(
-                    Div("Avg Processing Time", cls="metric-label"),
-                    Div(f"{avg_processing_time:.2f}h", cls="metric-value"),
-                    cls="metric-card"
-                ),
-                Div(
-                    Div("Active Accounts", cls="metric-label"),
-                    Div(str(active_accounts), cls="metric-value"),
-                    cls="metric-card"
-                ),
-                Div(
-                    Div("Accounts On Hold", cls="metric-label"),
-                    Div(str(accounts_on_hold), cls="metric-value"),
-                    cls="metric-card"
-                ),
-                Div(
-                    Div("Active Workers", cls="metric-label"),
-                    Div(str(active_workers), cls="metric-value"),
-                    cls="metric-card"
-                ),
-                cls="grid-row"
-            )
-
-            # Create Charts (using pre-generated dataframes)
-            import plotly.express as px
-
-            fig_status = px.pie(df_status, values='Count', names='Status', hole=0.4,
-                               color_discrete_sequence=px.colors.qualitative.Pastel,
-                               title="Status Distribution")
-            fig_status.update_layout(margin=dict(t=40, b=0, l=0, r=0))
-
-            fig_scraper = px.bar(df_scraper, x='Scraper Status', y='Count',
-                                color='Scraper Status', text='Count',
-                                title="Scraper Status Breakdown")
-            fig_scraper.update_layout(margin=dict(t=40, b=0, l=0, r=0))
-
-            fig_infra = create_infrastructure_chart(active_accounts, accounts_on_hold, active_workers)
-
-            fig_timeline = px.line(df_timeline, x='date', y='Count', markers=True,
-                                  title=f"Scraped Companies Over Time ({period_label})")
-            fig_timeline.update_layout(margin=dict(t=40, b=0, l=0, r=0))
-
-            # Processing Time Distribution
-            if len(df_processing) > 0:
-                fig_processing = px.histogram(df_processing, x='processing_time',
-                                             nbins=30,
-                                             title="Processing Time Distribution (Hours)",
-                                             labels={'processing_time': 'Hours'})
-                fig_processing.update_layout(margin=dict(t=40, b=0, l=0, r=0))
-                processing_chart = Div(
-                    Div(Div(generate_plot_html(fig_processing)), cls="col-half chart-container"),
-                    Div(Div(generate_plot_html(fig_infra)), cls="col-half chart-container"),
-                    cls="grid-row"
-                )
+            if DASHBOARD_LAZY_SECTIONS:
+                # Sent before any query runs; each section fetches itself and the server computes them in parallel
+                sections = [section_placeholder(name, view) for name in DASHBOARD_SECTIONS]
             else:
-                processing_chart = Div(
-                    Div(Div(generate_plot_html(fig_infra)), cls="col-half chart-container"),
-                    cls="grid-row"
-                )
-
-            charts_row = Div(
-                Div(Div(generate_plot_html(fig_status)), cls="col-half chart-container"),
-                Div(Div(generate_plot_html(fig_scraper)), cls="col-half chart-container"),
-                cls="grid-row"
-            )
-
-            timeline_row = Div(
-                Div(generate_plot_html(fig_timeline)),
-                cls="chart-container"
-            )
-
-            # Table headers and rows
-            headers = [Th(col) for col in latest_df.columns]
-            rows = []
-            for _, row in latest_df.iterrows():
-                cells = [Td(str(val)) for val in row]
-                rows.append(Tr(*cells))
-
-            data_table = Div(
-                H3("Latest Entries"),
-                Div(
-                    Table(
-                        Thead(Tr(*headers)),
-                        Tbody(*rows)
-                    ),
-                    style="overflow-x: auto;"
-                ),
-                cls="chart-container"
-            )
-
-            # Health Check Data
-            try:
-                health_check_df = fetch_health_check_data()
-                if not health_check_df.empty:
-                    health_check_df['compute_datetime'] = pd.to_datetime(health_check_df['compute_datetime'])
-                    health_check_df['last_update'] = pd.to_datetime(health_check_df['last_update'])
-
-                    health_headers = [Th(col) for col in health_check_df.columns]
-                    health_rows = []
-                    for _, row in health_check_df.iterrows():
-                        cells = [Td(str(val)) for val in row]
-                        health_rows.append(Tr(*cells))
-
-                    health_check_table = Div(
-                        Div(
-                            H3("Infrastructure Health Check - Latest Entries", cls="health-check-title"),
-                            P("Verification scrapes to monitor infrastructure status", style="color: #666; font-size: 0.9em;"),
-                            Div(
-                                Table(
-                                    Thead(Tr(*health_headers)),
-                                    Tbody(*health_rows)
-                                ),
-                                style="overflow-x: auto;"
-                            ),
-                            cls="health-check-section"
-                        ),
-                        cls="chart-container"
-                    )
-                else:
-                    health_check_table = Div()
-            except Exception as e:
-                health_check_table = Div(
-                    P(f"Unable to load health check data: {e}", style="color: #ff6b6b; padding: 10px;"),
-                    cls="chart-container"
-                )
+                sections = await asyncio.gather(*[render_dashboard_section(name, view) for name in DASHBOARD_SECTIONS])
 
             # Pool display name
             pool_name = "Private Pool" if pool == "private" else "Shared Pool"
@@ -401,16 +526,175 @@ def setup_linkedin_routes(rt):
                         cls="user-selector-wrapper"
                     ),
                     filter_buttons,
-                    metrics_row_1,
-                    metrics_row_2,
-                    charts_row,
-                    processing_chart,
-                    timeline_row,
-                    data_table,
-                    health_check_table,
+                    *sections,
                     style="max-width: 1400px; margin: 0 auto; padding: 20px; font-family: sans-serif;"
-                )
+                ),
+                Script(src="/linkedin/chart-renderer") if CHART_RENDER_MODE == "client" else ""
             )
 
         except Exception as e:
             return Titled("KPI - Altsignals | Error", Div(f"An error occurred: {e}", style="color: red; padding: 20px;"))
+
+    @rt("/linkedin/dashboard/section/{name}")
+    async def linkedin_dashboard_section(name: str, period: str = "overall", pool: str = "private",
+                                         user_id: int = 11, sess: dict = None):
+        """One dashboard section as an HTMX partial"""
+        redirect = require_auth_partial(sess)
+        if redirect:
+            return redirect
+        if name not in DASHBOARD_SECTIONS:
+            return Response(f"Unknown section {name}", status_code=404)
+        return await render_dashboard_section(name, dashboard_view(pool, user_id, period))
+
+    @rt("/linkedin/latest-entries")
+    async def linkedin_latest_entries(period: str = "overall", pool: str = "private", user_id: int = 11,
+                                      cursor: str = None, direction: str = "next", status: str = None,
+                                      scraper_status: str = None, emergency: str = None, sess: dict = None):
+        """One page of the Latest Entries table as an HTMX partial"""
+        redirect = require_auth_partial(sess)
+        if redirect:
+            return redirect
+
+        view = dashboard_view(pool, user_id, period)
+        filters = {'status': status, 'scraper_status': scraper_status, 'emergency': emergency}
+        args = (view['user_id'], view['pool'], view['period'], view['use_mock_data'])
+        try:
+            page, data = await asyncio.gather(
+                get_latest_entries(*args, cursor, "prev" if direction == "prev" else "next", filters),
+                get_dashboard_data(*args)
+            )
+            with span("build.latest"):
+                return latest_entries_section(page, view, filters, data)
+        except Exception as e:
+            return Div(f"An error occurred: {e}", id="latest-entries", style="color: red; padding: 20px;")
+
+    @rt("/linkedin/entries")
+    def linkedin_entries(period: str = "overall", pool: str = "private", user_id: int = 11, status: str = None,
+                         scraper_status: str = None, emergency: str = None, sess: dict = None):
+        """All of a user's entries in a virtually scrolled table (rows stream in as it scrolls)"""
+        redirect = require_auth(sess)
+        if redirect:
+            return redirect
+
+        view = dashboard_view(pool, user_id, period)
+        filters = clean_filters({'status': status, 'scraper_status': scraper_status, 'emergency': emergency})
+        query = urlencode(dict(pool=pool, user_id=view['user_id'], period=period, **filters))
+        filter_text = ", ".join(f"{name} = {value}" for name, value in filters.items())
+        return Titled("KPI - Altsignals | Entries",
+            Div(
+                A("← Back to Dashboard", href=f"/linkedin/dashboard?{view['query']}", cls="logout-btn",
+                  style="top: 20px; right: 180px; background: #6c757d;"),
+                A("Logout", href="/logout", cls="logout-btn"),
+                H1("All Entries"),
+                Div(
+                    P(f"User ID: {view['user_id']} - {view['period_label']}" +
+                      (f" - {filter_text}" if filter_text else "")),
+                    cls="header-info"
+                ),
+                Div(
+                    A("Export CSV", href=f"/linkedin/export?{view['query']}&format=csv", cls="filter-btn"),
+                    A("Export Parquet", href=f"/linkedin/export?{view['query']}&format=parquet", cls="filter-btn"),
+                    cls="filter-buttons"
+                ) if not view['use_mock_data'] else Div(),
+                Div(
+                    Div("Loading...", cls="row-status"),
+                    Div(Table(Thead(Tr()), Tbody()), cls="row-viewport"),
+                    cls="row-browser chart-container",
+                    data_src=f"/linkedin/entries/stream?{query}"
+                ),
+                style="max-width: 1400px; margin: 0 auto; padding: 20px; font-family: sans-serif;"
+            ),
+            Script(src="/linkedin/row-browser")
+        )
+
+    @rt("/linkedin/entries/stream")
+    async def linkedin_entries_stream(period: str = "overall", pool: str = "private", user_id: int = 11,
+                                      cursor: str = None, format: str = "ndjson", status: str = None,
+                                      scraper_status: str = None, emergency: str = None, sess: dict = None):
+        """
+        A user's entries after `cursor`, newest first, streamed in keyset batches
+        (NDJSON lines for the row browser, or <tr> rows for HTMX with format=html)
+        """
+        if not sess or not sess.get('authenticated'):
+            return JSONResponse({'error': 'not authenticated'}, status_code=401)
+
+        view = dashboard_view(pool, user_id, period)
+        filters = clean_filters({'status': status, 'scraper_status': scraper_status, 'emergency': emergency})
+        pages = stream_entry_pages(view, cursor, filters)
+        if format == "html":
+            more_url = "/linkedin/entries/stream?" + urlencode(
+                dict(pool=pool, user_id=view['user_id'], period=period, format="html", **filters))
+            return StreamingResponse(entry_batches_html(pages, more_url), media_type="text/html")
+        return StreamingResponse(entry_batches_ndjson(pages), media_type="application/x-ndjson")
+
+    @rt("/linkedin/export")
+    async def linkedin_export(period: str = "overall", pool: str = "private", user_id: int = 11, format: str = "csv",
+                              gzip: bool = False, after_id: int = 0, max_id: int = None, cutoff: str = None,
+                              sess: dict = None):
+        """
+        A user's url_status_company rows for a period, in id order, streamed as CSV or Parquet
+        The X-Export-Max-Id and X-Export-Cutoff headers pin the end and the period window of the
+        export: resume an interrupted download with after_id=<last id received>&max_id=<X-Export-Max-Id>
+        &cutoff=<X-Export-Cutoff>
+        """
+        if not sess or not sess.get('authenticated'):
+            return JSONResponse({'error': 'not authenticated'}, status_code=401)
+        if format not in EXPORT_FORMATS:
+            return JSONResponse({'error': f'unknown format {format} (csv or parquet)'}, status_code=400)
+        try:
+            start = export_cutoff(period, cutoff)
+        except ValueError:
+            return JSONResponse({'error': f'invalid cutoff {cutoff} (ISO datetime)'}, status_code=400)
+
+        view = dashboard_view(pool, user_id, period)
+        if view['use_mock_data']:
+            return JSONResponse({'error': 'demo users have no rows to export'}, status_code=404)
+        if max_id is None:
+            max_id = await export_max_id_async(view['user_id'])
+
+        media_type, extension = EXPORT_FORMATS[format]
+        if gzip and format == "csv":
+            media_type, extension = "application/gzip", extension + ".gz"
+        filename = f"url_status_company_user{view['user_id']}_{period}_{after_id + 1}-{max_id}.{extension}"
+        return StreamingResponse(
+            export_rows(view['user_id'], start, format, max_id, after_id, gzip),
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Export-After-Id": str(after_id),
+                "X-Export-Max-Id": str(max_id),
+                "X-Export-Cutoff": start.isoformat() if start is not None else "",
+            }
+        )
+
+    @rt("/linkedin/row-browser")
+    def linkedin_row_browser_script():
+        """Client-side virtual scrolling for the all-entries view (static, cached by the browser)"""
+        return Response(ROW_BROWSER_SCRIPT, media_type="application/javascript",
+                        headers={"Cache-Control": "public, max-age=86400"})
+
+    @rt("/linkedin/chart-renderer")
+    def linkedin_chart_script():
+        """Client-side chart renderer (static, cached by the browser)"""
+        return Response(CHART_SCRIPT, media_type="application/javascript",
+                        headers={"Cache-Control": "public, max-age=86400"})
+
+    @rt("/linkedin/charts/{name}")
+    async def linkedin_chart_data(name: str, period: str = "overall", pool: str = "private", user_id: int = 11,
+                                  sess: dict = None):
+        """Aggregated series for one dashboard chart as compact JSON"""
+        if not sess or not sess.get('authenticated'):
+            return JSONResponse({'error': 'not authenticated'}, status_code=401)
+
+        selected_user_id, use_mock_data = resolve_dashboard_user(pool, user_id)
+        try:
+            data = await get_dashboard_data(selected_user_id, pool, period, use_mock_data)
+            if data is None:
+                return JSONResponse({'error': 'no data'}, status_code=404)
+            with span("chart_series"):
+                series = chart_series(name, data, get_period_label(period))
+        except KeyError:
+            return JSONResponse({'error': f'unknown chart {name}'}, status_code=404)
+        except Exception as e:
+            return JSONResponse({'error': str(e)}, status_code=500)
+        return Response(json.dumps(series, separators=(',', ':')), media_type="application/json")
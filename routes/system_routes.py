@@ -3,7 +3,14 @@ System health and monitoring routes
 """
 from fasthtml.common import *
 from auth import require_auth
-from db.queries import get_system_stats
+from db.async_queries import get_system_stats_async
+from db.connection import get_pool_stats
+from utils.cache import get_cache_stats, invalidate_all
+from components.charts import get_chart_render_stats
+from utils.frames import get_frame_memory_stats
+from utils.metrics import render_metrics
+from utils.tracing import get_route_timing_stats
+from db.query_stats import get_query_stats
 from config import ACTIVE_ACCOUNTS, ACCOUNTS_ON_HOLD, ACTIVE_WORKERS, APP_VERSION
 
 
@@ -11,20 +18,28 @@ def setup_system_routes(rt):
     """Setup system health routes"""
 
     @rt("/system-health")
-    def system_health(sess: dict = None):
+    async def system_health(sess: dict = None):
         """System Health Dashboard"""
         redirect = require_auth(sess)
         if redirect:
             return redirect
 
         try:
-            stats = get_system_stats()
+            stats = await get_system_stats_async()
 
             # Calculate health status
             success_count = sum(s['count'] for s in stats['status_distribution'] if s['status'] == 'done')
             total_count = sum(s['count'] for s in stats['status_distribution'])
             success_rate = (success_count / total_count * 100) if total_count > 0 else 0
 
+            # Fast mode: totals come from database statistics, not a count
+            approximate = stats.get('approximate', False)
+            approx = "≈ " if approximate else ""
+            approx_badge = ""
+            if approximate:
+                approx_badge = Span("Approximate", cls="status-badge warning", style="margin-left: 10px;",
+                                    title="From database statistics (last ANALYZE / sample), not an exact count")
+
             if success_rate >= 80:
                 overall_status = "healthy"
                 status_text = "Healthy"
@@ -42,7 +57,7 @@ def setup_system_routes(rt):
             metrics_row = Div(
                 Div(
                     Div("Total Records", cls="metric-label"),
-                    Div(f"{stats['total_records']:,}", cls="metric-value"),
+                    Div(f"{approx}{stats['total_records']:,}", cls="metric-value"),
                     cls="metric-card"
                 ),
                 Div(
@@ -52,12 +67,12 @@ def setup_system_routes(rt):
                 ),
                 Div(
                     Div("Unique Users", cls="metric-label"),
-                    Div(f"{stats['unique_users']:,}", cls="metric-value"),
+                    Div(f"{approx}{stats['unique_users']:,}", cls="metric-value"),
                     cls="metric-card"
                 ),
                 Div(
                     Div("Success Rate", cls="metric-label"),
-                    Div(f"{success_rate:.1f}%", cls="metric-value"),
+                    Div(f"{approx}{success_rate:.1f}%", cls="metric-value"),
                     cls="metric-card"
                 ),
                 cls="grid-row"
@@ -83,19 +98,173 @@ def setup_system_routes(rt):
                 cls="grid-row"
             )
 
+            # Connection Pool (stats are per gunicorn worker)
+            pool_stats = get_pool_stats()
+            if pool_stats:
+                pool_metrics = Div(
+                    H2("Connection Pool", style="margin-top: 40px;"),
+                    P(f"Worker pid {pool_stats['pid']} - max {pool_stats['max_size']} connections",
+                      style="color: #666;"),
+                    Div(
+                        Div(
+                            Div("In Use", cls="metric-label"),
+                            Div(str(pool_stats['in_use']), cls="metric-value"),
+                            cls="metric-card"
+                        ),
+                        Div(
+                            Div("Idle", cls="metric-label"),
+                            Div(str(pool_stats['idle']), cls="metric-value"),
+                            cls="metric-card"
+                        ),
+                        Div(
+                            Div("Avg Wait", cls="metric-label"),
+                            Div(f"{pool_stats['avg_wait_time'] * 1000:.1f}ms", cls="metric-value"),
+                            cls="metric-card"
+                        ),
+                        Div(
+                            Div("Max Wait", cls="metric-label"),
+                            Div(f"{pool_stats['max_wait_time'] * 1000:.1f}ms", cls="metric-value"),
+                            cls="metric-card"
+                        ),
+                        cls="grid-row"
+                    )
+                )
+            else:
+                pool_metrics = Div()
+
+            # Result caches (per gunicorn worker)
+            cache_rows = [
+                Tr(
+                    Td(c['name']),
+                    Td(f"{c['hits']:,}"),
+                    Td(f"{c['misses']:,}"),
+                    Td(f"{c['hit_rate'] * 100:.1f}%"),
+                    Td(f"{c['shared_hits']:,}"),
+                    Td(f"{c['coalesced']:,}"),
+                    Td(f"{c['entries']:,}"),
+                    Td(f"{c['bytes'] / (1024 * 1024):.1f} / {c['max_bytes'] / (1024 * 1024):.0f} MB")
+                )
+                for c in get_cache_stats()
+            ]
+            cache_table = Div(
+                H3("Result Cache"),
+                Table(
+                    Thead(Tr(Th("Cache"), Th("Hits"), Th("Misses"), Th("Hit Rate"),
+                             Th("Shared Hits"), Th("Coalesced"), Th("Entries"), Th("Memory"))),
+                    Tbody(*cache_rows)
+                ),
+                Form(
+                    Button("Clear Cache", type="submit", cls="filter-btn"),
+                    action="/system-health/cache/invalidate",
+                    method="post",
+                    style="margin-top: 15px;"
+                ),
+                cls="chart-container"
+            )
+
+            # Chart fragment rendering (per gunicorn worker)
+            chart_rows = [
+                Tr(
+                    Td(c['name']),
+                    Td(f"{c['renders']:,}"),
+                    Td(f"{c['hits']:,}"),
+                    Td(f"{c['hit_rate'] * 100:.1f}%"),
+                    Td(f"{c['avg_build_ms']:.1f} ms"),
+                    Td(f"{c['avg_serialize_ms']:.1f} ms"),
+                    Td(f"{c['last_build_ms'] + c['last_serialize_ms']:.1f} ms")
+                )
+                for c in get_chart_render_stats()
+            ]
+            chart_table = Div(
+                H3("Chart Rendering"),
+                Table(
+                    Thead(Tr(Th("Chart"), Th("Renders"), Th("Cache Hits"), Th("Hit Rate"),
+                             Th("Avg Build"), Th("Avg Serialize"), Th("Last Render"))),
+                    Tbody(*chart_rows)
+                ),
+                cls="chart-container"
+            ) if chart_rows else Div()
+
+            # DataFrames loaded from the database (per gunicorn worker)
+            frame_rows = [
+                Tr(
+                    Td(f['name']),
+                    Td(f"{f['loads']:,}"),
+                    Td(f"{f['last_rows']:,}"),
+                    Td(f"{f['last_bytes'] / (1024 * 1024):.1f} MB"),
+                    Td(f"{f['peak_bytes'] / (1024 * 1024):.1f} MB"),
+                    Td(f"{f['bytes_per_row']:.0f} B")
+                )
+                for f in get_frame_memory_stats()
+            ]
+            frame_table = Div(
+                H3("DataFrame Memory"),
+                Table(
+                    Thead(Tr(Th("Loader"), Th("Loads"), Th("Last Rows"), Th("Last Size"),
+                             Th("Peak Size"), Th("Avg per Row"))),
+                    Tbody(*frame_rows)
+                ),
+                cls="chart-container"
+            ) if frame_rows else Div()
+
+            # Request timings by route (per gunicorn worker; /metrics has them across workers)
+            route_rows = [
+                Tr(
+                    Td(f"{r['method']} {r['route']}"),
+                    Td(f"{r['requests']:,}"),
+                    Td(f"{r['avg_ms']:.1f} ms"),
+                    Td(f"{r['max_ms']:.1f} ms"),
+                    Td(f"{r['avg_sql_ms']:.1f} ms ({r['queries_per_request']:.1f})"),
+                    Td(f"{r['slowest_span']} ({r['slowest_span_ms']:.1f} ms)" if r['slowest_span'] else "-")
+                )
+                for r in get_route_timing_stats()
+            ]
+            route_table = Div(
+                H3("Request Timings"),
+                Table(
+                    Thead(Tr(Th("Route"), Th("Requests"), Th("Avg"), Th("Max"), Th("Avg SQL (statements)"),
+                             Th("Slowest Stage (avg)"))),
+                    Tbody(*route_rows)
+                ),
+                cls="chart-container"
+            ) if route_rows else Div()
+
+            # Statements by fingerprint (per gunicorn worker; query_report.py ranks the slow-query log)
+            statement_rows = [
+                Tr(
+                    Td(Code(r['fingerprint'])),
+                    Td(f"{r['calls']:,}"),
+                    Td(f"{r['total_ms']:,.1f} ms"),
+                    Td(f"{r['mean_ms']:.2f} ms"),
+                    Td(f"{r['p95_ms']:.2f} ms"),
+                    Td(f"{r['rows_per_call']:,.1f}"),
+                    Td(r['sql'][:80] + ("..." if len(r['sql']) > 80 else ""), title=r['sql'])
+                )
+                for r in get_query_stats()[:15]
+            ]
+            statement_table = Div(
+                H3("SQL Statements"),
+                Table(
+                    Thead(Tr(Th("Fingerprint"), Th("Calls"), Th("Total"), Th("Mean"), Th("p95"), Th("Rows/Call"),
+                             Th("Statement"))),
+                    Tbody(*statement_rows)
+                ),
+                cls="chart-container"
+            ) if statement_rows else Div()
+
             # Status Distribution Table
             status_rows = []
             for item in stats['status_distribution']:
                 status_rows.append(
                     Tr(
                         Td(item['status']),
-                        Td(f"{item['count']:,}"),
+                        Td(f"{approx}{item['count']:,}"),
                         Td(f"{(item['count'] / total_count * 100):.1f}%" if total_count > 0 else "0%")
                     )
                 )
 
             status_table = Div(
-                H3("Status Distribution"),
+                H3("Status Distribution", approx_badge),
                 Table(
                     Thead(
                         Tr(
@@ -127,14 +296,43 @@ def setup_system_routes(rt):
                         cls="header-info"
                     ),
                     health_banner,
-                    H2("Database Metrics"),
+                    H2("Database Metrics", approx_badge),
                     metrics_row,
                     H2("Infrastructure Status", style="margin-top: 40px;"),
                     infra_metrics,
+                    pool_metrics,
                     status_table,
+                    cache_table,
+                    chart_table,
+                    frame_table,
+                    route_table,
+                    statement_table,
                     cls="system-container"
                 )
             )
 
         except Exception as e:
             return Titled("KPI - Altsignals | Error", Div(f"An error occurred: {e}", style="color: red; padding: 20px;"))
+
+    @rt("/metrics")
+    def metrics():
+        """Prometheus metrics (all gunicorn workers)"""
+        rendered = render_metrics()
+        if rendered is None:
+            return Response("Metrics unavailable (disabled, or prometheus_client not installed)\n",
+                            status_code=503, media_type="text/plain")
+        body, content_type = rendered
+        return Response(body, media_type=content_type)
+
+    @rt("/system-health/cache/invalidate")
+    def post(sess: dict = None):
+        """
+        Drop cached dashboard results and statistics host-wide: the shared store is cleared and
+        its generation bumped, so every worker drops its local copies on its next lookup
+        """
+        redirect = require_auth(sess)
+        if redirect:
+            return redirect
+
+        invalidate_all()
+        return RedirectResponse("/system-health", status_code=303)
@@ -0,0 +1,310 @@
+"""
+Result cache for dashboard data and system statistics
+In-process LRU with per-entry TTLs, a memory bound and single-flight misses,
+backed by an optional store shared by all workers on the host
+"""
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from config import (
+    CACHE_MAX_BYTES, SHARED_CACHE_LOCK_TIMEOUT, SHARED_CACHE_POLL_INTERVAL, SHARED_CACHE_GENERATION_INTERVAL,
+    CHART_CACHE_MAX_BYTES, CHART_CACHE_TTL
+)
+from utils.shared_cache import create_shared_store, encode_key, dumps, loads, new_owner_id
+
+
+def estimate_size(value) -> int:
+    """Rough memory footprint of a cached value in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """
+    LRU cache with per-entry TTLs bounded by an approximate byte size
+    Concurrent misses for the same key share one computation; with a shared
+    store, concurrent misses in other workers share it too
+    """
+
+    def __init__(self, name: str, max_bytes: int = CACHE_MAX_BYTES, default_ttl: float = 60,
+                 shared_factory=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._inflight = {}  # key -> asyncio.Future
+        self._shared_factory = shared_factory
+        self._shared = None
+        self._generation = None
+        self._invalidation_seq = None
+        self._generation_checked_at = float('-inf')
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0,
+                       'invalidations': 0, 'coalesced': 0,
+                       'shared_hits': 0, 'shared_writes': 0, 'shared_waits': 0, 'shared_errors': 0}
+
+    @property
+    def shared(self):
+        """The shared store, created on first use (None if disabled or unavailable)"""
+        if self._shared is None and self._shared_factory is not None:
+            with self._lock:
+                if self._shared_factory is not None:
+                    try:
+                        self._shared = self._shared_factory()
+                    except Exception:
+                        self._stats['shared_errors'] += 1
+                    self._shared_factory = None
+        return self._shared
+
+    async def _shared_async(self):
+        """The shared store; created on the default executor, since opening it does I/O"""
+        if self._shared is None and self._shared_factory is not None:
+            return await asyncio.to_thread(lambda: self.shared)
+        return self._shared
+
+    async def _sync_invalidations(self, shared):
+        """
+        Drop the local entries another worker invalidated in the shared store (checked once per interval):
+        everything after a new generation, else the keys under each published prefix
+        """
+        now = time.monotonic()
+        if now - self._generation_checked_at < SHARED_CACHE_GENERATION_INTERVAL:
+            return
+        self._generation_checked_at = now
+        try:
+            generation, (seq, prefixes) = await asyncio.to_thread(
+                lambda: (shared.generation(), shared.invalidations_since(self._invalidation_seq)))
+        except Exception:
+            self._stats['shared_errors'] += 1
+            return
+        if generation != self._generation or prefixes is None:
+            if self._generation is not None:
+                with self._lock:
+                    self._entries.clear()
+                    self._bytes = 0
+        elif prefixes:
+            prefixes = tuple(prefixes)
+            self.invalidate(match=lambda k: encode_key(k).startswith(prefixes))
+        self._generation = generation
+        self._invalidation_seq = seq
+
+    def get(self, key):
+        """Return (found, value), counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return True, value
+                self._remove(key)
+                self._stats['expired'] += 1
+            self._stats['misses'] += 1
+            return False, None
+
+    def set(self, key, value, ttl: float = None):
+        """Store a value, evicting least recently used entries past the memory bound; ttl <= 0 stores nothing"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    async def get_or_compute_async(self, key, compute, ttl: float = None):
+        """
+        Return the cached value or await compute(), sharing one call between concurrent misses
+        Shared store calls block (a file lock, a network round trip), so they run on the default executor
+        """
+        shared = await self._shared_async()
+        if shared is not None:
+            await self._sync_invalidations(shared)
+
+        found, value = self.get(key)
+        if found:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(inflight)
+
+        ttl = self.default_ttl if ttl is None else ttl
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            if shared is not None and ttl > 0:
+                value, ttl = await self._compute_shared(shared, key, compute, ttl)
+            else:
+                value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; nobody else needs to retrieve it
+            raise
+        else:
+            self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _compute_shared(self, shared, key, compute, ttl: float):
+        """
+        Read the key from the shared store, or compute it while holding the
+        shared lock so other workers wait for the result instead of recomputing
+        Returns (value, remaining ttl)
+        """
+        skey = encode_key(key)
+        owner = new_owner_id()
+        deadline = time.monotonic() + SHARED_CACHE_LOCK_TIMEOUT
+        try:
+            while True:
+                data, remaining = await asyncio.to_thread(shared.get, skey)
+                if data is not None:
+                    self._stats['shared_hits'] += 1
+                    return await asyncio.to_thread(loads, data), remaining
+                if await asyncio.to_thread(shared.acquire_lock, skey, owner, SHARED_CACHE_LOCK_TIMEOUT):
+                    break
+                if time.monotonic() > deadline:
+                    # The owner is stuck; compute locally rather than fail the request
+                    return await compute(), ttl
+                self._stats['shared_waits'] += 1
+                await asyncio.sleep(SHARED_CACHE_POLL_INTERVAL)
+        except Exception:
+            self._stats['shared_errors'] += 1
+            return await compute(), ttl
+
+        try:
+            value = await compute()
+            try:
+                await asyncio.to_thread(lambda: shared.set(skey, dumps(value), ttl))
+                self._stats['shared_writes'] += 1
+            except Exception:
+                self._stats['shared_errors'] += 1
+            return value, ttl
+        finally:
+            try:
+                await asyncio.to_thread(shared.release_lock, skey, owner)
+            except Exception:
+                self._stats['shared_errors'] += 1
+
+    def invalidate(self, key=None, match=None) -> int:
+        """Drop one key, every key for which match(key) is true, or everything"""
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+            elif match is not None:
+                keys = [k for k in self._entries if match(k)]
+            else:
+                keys = list(self._entries)
+            for k in keys:
+                self._remove(k)
+            self._stats['invalidations'] += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['hits'] + stats['misses']
+            stats.update(
+                name=self.name,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=stats['hits'] / lookups if lookups else 0.0,
+            )
+        return stats
+
+
+_shared_store = None
+
+
+def get_shared_store():
+    """The configured cross-worker store, shared by every cache in this process"""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = create_shared_store()
+    return _shared_store
+
+
+# Dashboard data keyed by ('dashboard', user_id, pool, period) plus shared lookups
+dashboard_cache = TTLCache("dashboard", shared_factory=get_shared_store)
+
+# System health statistics keyed by ('system_stats',)
+stats_cache = TTLCache("system_stats", max_bytes=CACHE_MAX_BYTES // 16, shared_factory=get_shared_store)
+
+# Rendered Plotly HTML keyed by (chart name, data hash); content-addressed, so never stale
+chart_cache = TTLCache("chart_fragments", max_bytes=CHART_CACHE_MAX_BYTES, default_ttl=CHART_CACHE_TTL)
+
+
+def disable_shared_cache():
+    """Keep this process's caches local: no reads from or writes to the cross-worker store (benchmarks, scripts)"""
+    for cache in (dashboard_cache, stats_cache):
+        with cache._lock:
+            cache._shared_factory = None
+            cache._shared = None
+
+
+def _invalidate_shared(prefix: str = None):
+    """
+    Delete shared entries and tell the other workers to drop their local copies:
+    a new generation drops everything, a published prefix only the keys under it
+    """
+    shared = dashboard_cache.shared
+    if shared is None:
+        return
+    try:
+        if prefix is None:
+            shared.clear()
+            shared.bump_generation()
+        else:
+            shared.delete_prefix(prefix)
+            shared.publish_invalidation(prefix)
+    except Exception:
+        pass
+
+
+def invalidate_user(user_id: int) -> int:
+    """Drop cached dashboard data for one user (e.g. after new rows are loaded)"""
+    _invalidate_shared(encode_key(('dashboard', user_id)) + "|")
+    return dashboard_cache.invalidate(match=lambda k: k[0] == 'dashboard' and k[1] == user_id)
+
+
+def invalidate_all() -> int:
+    """Drop every cached dashboard result, system statistic and chart fragment"""
+    _invalidate_shared()
+    return dashboard_cache.invalidate() + stats_cache.invalidate() + chart_cache.invalidate()
+
+
+def get_cache_stats() -> list:
+    """Stats for every result cache in this process"""
+    return [dashboard_cache.stats(), stats_cache.stats(), chart_cache.stats()]
@@ -0,0 +1,79 @@
+"""
+Compact DataFrames for url_status_company rows
+
+The drivers hand back every column as Python objects. read_frame converts
+them as they are loaded: status columns to categoricals, flags to bools,
+timestamps to datetime64 (parsed once, here), URLs to Arrow-backed strings,
+and records the memory each load took (per worker) for the System Health page.
+"""
+import threading
+import pandas as pd
+
+# What fetch_user_data loads unless asked for more: ticker_eod, recycled_datetime_task and id are not shown
+USER_DATA_COLUMNS = ('compute_datetime', 'linkedin_url', 'status', 'last_update', 'user_id', 'emergency',
+                     'scraper_status')
+
+CATEGORY_COLUMNS = ('status', 'scraper_status')
+FLAG_COLUMNS = ('emergency',)
+NULLABLE_FLAG_COLUMNS = ('ticker_eod',)
+DATETIME_COLUMNS = ('compute_datetime', 'last_update', 'recycled_datetime_task')
+STRING_COLUMNS = ('linkedin_url',)
+INTEGER_COLUMNS = {'user_id': 'int32', 'id': 'int64'}
+
+_frame_stats = {}  # loader name -> load counters
+_frame_stats_lock = threading.Lock()
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the known url_status_company columns of df to compact dtypes (in place)"""
+    for column in df.columns:
+        if column in CATEGORY_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif column in FLAG_COLUMNS:
+            df[column] = df[column].astype('boolean').fillna(False).astype(bool)
+        elif column in NULLABLE_FLAG_COLUMNS:
+            df[column] = df[column].astype('boolean')
+        elif column in DATETIME_COLUMNS:
+            # PostgreSQL returns datetimes, SQLite ISO-8601 text
+            df[column] = pd.to_datetime(df[column], format='ISO8601')
+        elif column in STRING_COLUMNS:
+            df[column] = df[column].astype('string[pyarrow]')
+        elif column in INTEGER_COLUMNS:
+            df[column] = df[column].astype(INTEGER_COLUMNS[column])
+    return df
+
+
+def read_frame(name: str, query: str, conn, params=None) -> pd.DataFrame:
+    """pd.read_sql_query with compact dtypes; the load is recorded under `name`"""
+    df = compact_frame(pd.read_sql_query(query, conn, params=params))
+    record_frame(name, df)
+    return df
+
+
+def frame_memory(df: pd.DataFrame) -> dict:
+    """Bytes per column (deep, so strings count in full)"""
+    return {column: int(size) for column, size in df.memory_usage(index=False, deep=True).items()}
+
+
+def record_frame(name: str, df: pd.DataFrame):
+    """Add one loaded frame to the per-worker memory report"""
+    size = sum(frame_memory(df).values())
+    with _frame_stats_lock:
+        stats = _frame_stats.setdefault(name, {
+            'name': name, 'loads': 0, 'rows': 0, 'bytes': 0, 'last_rows': 0, 'last_bytes': 0, 'peak_bytes': 0
+        })
+        stats['loads'] += 1
+        stats['rows'] += len(df)
+        stats['bytes'] += size
+        stats['last_rows'] = len(df)
+        stats['last_bytes'] = size
+        stats['peak_bytes'] = max(stats['peak_bytes'], size)
+
+
+def get_frame_memory_stats() -> list:
+    """Per-loader frame sizes in this worker"""
+    with _frame_stats_lock:
+        rows = [dict(s) for s in _frame_stats.values()]
+    for row in rows:
+        row['bytes_per_row'] = row['bytes'] / row['rows'] if row['rows'] else 0.0
+    return sorted(rows, key=lambda r: r['name'])
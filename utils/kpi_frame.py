@@ -0,0 +1,130 @@
+"""
+Dashboard KPIs over DataFrames of url_status_company rows
+
+One vectorized pass per chunk: the columns are pulled out as numpy arrays
+once, and every count (statuses, days, histogram bins) is a bincount over
+integer codes, so no intermediate frame is built or copied, not even for
+the period filter. The result is the aggregate rows build_kpi_result
+takes, (kind, key, count, done, emergency, valid_count, valid_sum).
+"""
+from collections import Counter
+import numpy as np
+import pandas as pd
+from config import MAX_PROCESSING_TIME, PROCESSING_TIME_BINS
+from utils.kpis import PROCESSING_BIN_WIDTH
+
+KPI_COLUMNS = ['compute_datetime', 'last_update', 'status', 'scraper_status', 'emergency']
+
+_HOUR = np.timedelta64(1, 'h')
+
+
+def _datetimes(values: pd.Series) -> np.ndarray:
+    if values.dtype.kind != 'M':
+        values = pd.to_datetime(values)
+    return values.to_numpy()
+
+
+def _value_counts(values: pd.Series, mask=None) -> dict:
+    """{value: count} through the categorical codes (or one factorize), nulls left out"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    if mask is not None:
+        codes = codes[mask]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return {uniques[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+
+class KpiAccumulator:
+    """
+    Feed update() any number of chunks of KPI_COLUMNS rows, then rows()
+    gives the same aggregate rows as one pass over all of them. Optionally
+    keeps the `latest` newest rows by (compute_datetime, id), which needs
+    the id column in the chunks
+    """
+
+    def __init__(self, latest: int = 0):
+        self.total = self.done = self.emergency = self.valid_count = 0
+        self.valid_sum = 0.0
+        self.status = Counter()
+        self.scraper_status = Counter()
+        self.days = Counter()  # days since the epoch -> count
+        self.bins = np.zeros(PROCESSING_TIME_BINS, dtype=np.int64)
+        self.latest_limit = latest
+        self._latest = None
+
+    def update(self, df: pd.DataFrame, cutoff=None):
+        """Add a chunk; with a cutoff only its rows with compute_datetime >= cutoff count"""
+        if df.empty:
+            return self
+        computed = _datetimes(df['compute_datetime'])
+        mask = None
+        if cutoff is not None:
+            mask = computed >= np.datetime64(pd.Timestamp(cutoff))
+            computed = computed[mask]
+            if not len(computed):
+                return self
+        updated = _datetimes(df['last_update'])
+        emergency = df['emergency'].to_numpy(dtype=bool, na_value=False)
+        if mask is not None:
+            updated, emergency = updated[mask], emergency[mask]
+
+        hours = (updated - computed) / _HOUR
+        valid_hours = hours[(hours > 0) & (hours <= MAX_PROCESSING_TIME)]
+        # Truncation is floor for positive times
+        buckets = np.minimum((valid_hours / PROCESSING_BIN_WIDTH).astype(np.int64), PROCESSING_TIME_BINS - 1)
+        days = computed.astype('datetime64[D]').view(np.int64)
+        first_day = int(days.min())
+        day_counts = np.bincount(days - first_day)
+
+        status = _value_counts(df['status'], mask)
+        self.total += len(computed)
+        self.done += status.get('done', 0)
+        self.emergency += int(np.count_nonzero(emergency))
+        self.valid_count += len(valid_hours)
+        self.valid_sum += float(valid_hours.sum())
+        self.status.update(status)
+        self.scraper_status.update(_value_counts(df['scraper_status'], mask))
+        self.days.update({first_day + int(i): int(day_counts[i]) for i in np.flatnonzero(day_counts)})
+        self.bins += np.bincount(buckets, minlength=PROCESSING_TIME_BINS)
+
+        if self.latest_limit:
+            self._keep_latest(df, computed, mask)
+        return self
+
+    def _keep_latest(self, df: pd.DataFrame, computed: np.ndarray, mask):
+        """Merge the chunk's newest rows into the running top `latest_limit`"""
+        positions = np.flatnonzero(mask) if mask is not None else np.arange(len(df))
+        if len(positions) > self.latest_limit:
+            # Everything at or above the n-th newest timestamp (ties included), then exact order by id;
+            # partitioned as int64 since numpy takes a much slower path for datetime64
+            ticks = computed.view(np.int64)
+            nth = len(ticks) - self.latest_limit
+            positions = positions[ticks >= np.partition(ticks, nth)[nth]]
+        candidates = df.iloc[positions]
+        if self._latest is not None:
+            candidates = pd.concat([self._latest, candidates])
+        self._latest = candidates.sort_values(['compute_datetime', 'id'], ascending=False) \
+            .head(self.latest_limit).reset_index(drop=True)
+
+    def rows(self) -> list:
+        if not self.total:
+            return []
+        rows = [('total', None, self.total, self.done, self.emergency, self.valid_count, self.valid_sum)]
+        rows.extend(('status', key, count, None, None, None, None) for key, count in self.status.items())
+        rows.extend(('scraper_status', key, count, None, None, None, None)
+                    for key, count in self.scraper_status.items())
+        rows.extend(('day', str(np.datetime64(day, 'D')), count, None, None, None, None)
+                    for day, count in sorted(self.days.items()))
+        rows.extend(('bucket', int(i), int(self.bins[i]), None, None, None, None) for i in np.flatnonzero(self.bins))
+        return rows
+
+    def latest(self) -> pd.DataFrame:
+        """The newest rows seen, newest first"""
+        return self._latest if self._latest is not None else pd.DataFrame(columns=KPI_COLUMNS + ['id'])
+
+
+def kpi_rows_from_frame(df: pd.DataFrame, cutoff=None) -> list:
+    """Aggregate rows from a DataFrame of KPI_COLUMNS (only rows from cutoff on, if given)"""
+    return KpiAccumulator().update(df, cutoff).rows()
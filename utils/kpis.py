@@ -0,0 +1,115 @@
+"""
+Period filters and KPI result helpers shared by the query layers
+"""
+from datetime import datetime, timedelta
+import math
+import pandas as pd
+from config import MAX_PROCESSING_TIME, PROCESSING_TIME_BINS
+
+# (period, button label, header label, lookback)
+PERIODS = [
+    ("overall", "All Time", "All Time", None),
+    ("daily", "Daily", "Last 24 Hours", timedelta(days=1)),
+    ("weekly", "Weekly", "Last Week", timedelta(weeks=1)),
+    ("monthly", "Monthly", "Last 30 Days", timedelta(days=30)),
+    ("quarterly", "Quarterly", "Last Quarter", timedelta(days=90)),
+    ("yearly", "Yearly", "Last Year", timedelta(days=365)),
+]
+
+# Width of one processing time histogram bin (in hours)
+PROCESSING_BIN_WIDTH = MAX_PROCESSING_TIME / PROCESSING_TIME_BINS
+
+
+def get_period_label(period: str) -> str:
+    """Return the header label for a period filter"""
+    for p, _, label, _ in PERIODS:
+        if p == period:
+            return label
+    return "All Time"
+
+
+def get_period_cutoff(period: str, now: datetime = None):
+    """Return the compute_datetime cutoff for a period, or None for all time"""
+    for p, _, _, lookback in PERIODS:
+        if p == period and lookback is not None:
+            return (now or datetime.now()) - lookback
+    return None
+
+
+def bin_processing_times(times) -> pd.DataFrame:
+    """Bin raw processing times (hours) into the dashboard histogram bins"""
+    counts = [0] * PROCESSING_TIME_BINS
+    for t in times:
+        if 0 < t <= MAX_PROCESSING_TIME:
+            counts[min(int(math.floor(t / PROCESSING_BIN_WIDTH)), PROCESSING_TIME_BINS - 1)] += 1
+    return processing_bins_frame(counts)
+
+
+def processing_bins_frame(counts) -> pd.DataFrame:
+    """Build the histogram DataFrame from a list of per-bin counts"""
+    return pd.DataFrame({
+        'processing_time': [(i + 0.5) * PROCESSING_BIN_WIDTH for i in range(PROCESSING_TIME_BINS)],
+        'Count': list(counts)
+    })
+
+
+def merge_kpi_rows(*row_sets) -> list:
+    """Add up aggregate rows (see build_kpi_result) computed over disjoint sets of rows"""
+    merged = {}
+    for rows in row_sets:
+        for kind, key, *values in rows:
+            # Day keys come back as dates from PostgreSQL and as strings elsewhere
+            slot = (kind, str(key) if kind == 'day' else key)
+            if slot not in merged:
+                merged[slot] = list(values)
+                continue
+            merged[slot] = [a if b is None else b if a is None else a + b for a, b in zip(merged[slot], values)]
+    return [(kind, key, *values) for (kind, key), values in merged.items()]
+
+
+def build_kpi_result(rows) -> dict:
+    """
+    Build the dashboard KPI dict from aggregate rows
+    Each row is (kind, key, count, done, emergency, valid_count, valid_sum)
+    where kind is one of 'total', 'status', 'scraper_status', 'day', 'bucket'
+    """
+    total = (0, 0, 0, 0, 0.0)
+    status, scraper, timeline = [], [], []
+    bins = [0] * PROCESSING_TIME_BINS
+
+    for kind, key, count, done, emergency, valid_count, valid_sum in rows:
+        if kind == 'total':
+            total = (count or 0, done or 0, emergency or 0, valid_count or 0, valid_sum or 0.0)
+        elif kind == 'status':
+            status.append((key, count))
+        elif kind == 'scraper_status':
+            scraper.append((key, count))
+        elif kind == 'day':
+            timeline.append((key, count))
+        elif kind == 'bucket' and key is not None:
+            bins[int(key)] = count
+
+    total_companies, successful_scrapes, emergency_count, valid_count, valid_sum = total
+
+    df_status = pd.DataFrame(status, columns=['Status', 'Count'])
+    df_status = df_status.sort_values('Count', ascending=False, kind='stable').reset_index(drop=True)
+
+    df_scraper = pd.DataFrame(scraper, columns=['Scraper Status', 'Count'])
+    df_scraper = df_scraper.sort_values('Count', ascending=False, kind='stable').reset_index(drop=True)
+
+    df_timeline = pd.DataFrame(timeline, columns=['date', 'Count'])
+    if not df_timeline.empty:
+        df_timeline['date'] = pd.to_datetime(df_timeline['date']).dt.date
+        df_timeline = df_timeline.sort_values('date').reset_index(drop=True)
+
+    return {
+        'total_companies': int(total_companies),
+        'successful_scrapes': int(successful_scrapes),
+        'success_rate': (successful_scrapes / total_companies * 100) if total_companies > 0 else 0,
+        'emergency_count': int(emergency_count),
+        'avg_processing_time': float(valid_sum) / valid_count if valid_count > 0 else 0,
+        'status_counts': df_status,
+        'scraper_counts': df_scraper,
+        'timeline': df_timeline,
+        'processing_bins': processing_bins_frame(bins) if valid_count > 0 else pd.DataFrame(),
+    }
@@ -0,0 +1,75 @@
+"""
+Prometheus metrics, served at /metrics
+
+Histograms of request latency by route, of the named request stages
+(utils/tracing.py) and of database statements by SQL fingerprint. Under
+gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(prometheus_client's multiprocess mode, set up in gunicorn.conf.py) and
+/metrics merges all of them, so a scrape gets the totals of every worker
+whichever one answers it. Without prometheus_client installed nothing is
+collected and /metrics answers 503.
+"""
+import os
+import threading
+from config import METRICS_ENABLED
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics = None  # name -> Histogram, False once prometheus_client turned out to be missing
+_metrics_lock = threading.Lock()
+
+
+def _get_metrics():
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = _create_metrics() if METRICS_ENABLED else False
+    return _metrics or None
+
+
+def _create_metrics():
+    try:
+        from prometheus_client import Histogram
+    except ImportError:
+        return False
+    return {
+        'requests': Histogram('linkedin_kpi_request_duration_seconds', "HTTP request latency by route",
+                              ['route', 'method', 'status'], buckets=REQUEST_BUCKETS),
+        'spans': Histogram('linkedin_kpi_span_duration_seconds', "Duration of named request stages",
+                           ['span'], buckets=REQUEST_BUCKETS),
+        'queries': Histogram('linkedin_kpi_db_query_duration_seconds', "Database statement duration by SQL fingerprint",
+                             ['fingerprint'], buckets=QUERY_BUCKETS),
+    }
+
+
+def observe_request(route: str, method: str, status: int, seconds: float):
+    metrics = _get_metrics()
+    if metrics:
+        metrics['requests'].labels(route, method, str(status)).observe(seconds)
+
+
+def observe_span(name: str, seconds: float):
+    metrics = _get_metrics()
+    if metrics:
+        metrics['spans'].labels(name).observe(seconds)
+
+
+def observe_query(fingerprint_id: str, seconds: float):
+    metrics = _get_metrics()
+    if metrics:
+        metrics['queries'].labels(fingerprint_id).observe(seconds)
+
+
+def render_metrics():
+    """(body, content type) in the Prometheus text format, or None if metrics are unavailable"""
+    if not _get_metrics():
+        return None
+    from prometheus_client import CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,62 @@
+"""
+Keyset (seek) pagination over (compute_datetime, id)
+A cursor is the sort key of a boundary row, so each page is one index range
+scan no matter how deep it is, instead of an OFFSET over every earlier row
+"""
+import pandas as pd
+
+LATEST_ENTRY_FILTERS = ('status', 'scraper_status', 'emergency')
+
+
+def encode_cursor(compute_datetime, row_id) -> str:
+    """'2025-06-01 12:00:00|123' for the row with that sort key"""
+    return f"{pd.Timestamp(compute_datetime).isoformat(sep=' ')}|{int(row_id)}"
+
+
+def decode_cursor(cursor: str):
+    """Return (compute_datetime string, id), or None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    compute_datetime, _, row_id = cursor.rpartition('|')
+    try:
+        timestamp, row_id = pd.Timestamp(compute_datetime), int(row_id)
+    except ValueError:
+        return None
+    if pd.isna(timestamp):
+        return None  # An empty or "NaT" timestamp would reach the SQL as 'NaT'
+    return timestamp.isoformat(sep=' '), row_id
+
+
+def clean_filters(filters: dict = None) -> dict:
+    """Keep the supported column filters that are set; emergency becomes a bool"""
+    cleaned = {}
+    for name in LATEST_ENTRY_FILTERS:
+        value = (filters or {}).get(name)
+        if value in (None, ""):
+            continue
+        if name == 'emergency':
+            value = str(value).lower() in ("1", "true", "yes")
+        cleaned[name] = value
+    return cleaned
+
+
+def build_page(df: pd.DataFrame, limit: int, direction: str, has_cursor: bool) -> dict:
+    """
+    Turn the limit + 1 rows a seek query returned into a page, newest first
+    direction is "next" (older rows, fetched DESC) or "prev" (newer rows, fetched ASC)
+    """
+    has_more = len(df) > limit
+    rows = df.head(limit)
+    if direction == "prev":
+        rows = rows.iloc[::-1]
+    rows = rows.reset_index(drop=True)
+
+    if rows.empty:
+        return {'rows': rows, 'next_cursor': None, 'prev_cursor': None}
+
+    first = encode_cursor(rows['compute_datetime'].iloc[0], rows['id'].iloc[0])
+    last = encode_cursor(rows['compute_datetime'].iloc[-1], rows['id'].iloc[-1])
+    if direction == "prev":
+        # Came from an older page, so there is always a next one
+        return {'rows': rows, 'next_cursor': last, 'prev_cursor': first if has_more else None}
+    return {'rows': rows, 'next_cursor': last if has_more else None, 'prev_cursor': first if has_cursor else None}
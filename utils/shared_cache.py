@@ -0,0 +1,306 @@
+"""
+Cross-worker cache stores
+Every gunicorn worker on the host reads and writes the same store, so a
+(user, period) result is computed by one worker and read by the others
+
+Values are stored as JSON with DataFrames as Arrow IPC streams, never
+pickled: whoever can write to the store can change cached figures, but
+not run code in the workers. The SQLite file must also be private to the
+app user (checked when it is opened).
+"""
+import base64
+import json
+import math
+import os
+import sqlite3
+import stat
+import threading
+import time
+import uuid
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from config import SHARED_CACHE_BACKEND, SHARED_CACHE_PATH, REDIS_URL, SHARED_CACHE_INVALIDATION_LOG
+
+
+def _check_private(path: str, mode_mask: int):
+    """Refuse a path that is a symlink, owned by another user, or open to others beyond mode_mask"""
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode):
+        raise PermissionError(f"{path} is a symlink")
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by uid {info.st_uid}, not by this user")
+    if info.st_mode & mode_mask:
+        os.chmod(path, stat.S_IMODE(info.st_mode) & ~mode_mask)
+
+
+def private_path(path: str) -> str:
+    """Expand path and make sure it and its directory belong to this user and nobody else"""
+    path = os.path.abspath(os.path.expanduser(path))
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    _check_private(directory, 0o077)
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600))
+    _check_private(path, 0o077)
+    return path
+
+
+class SQLiteSharedStore:
+    """Shared store in a local SQLite file (WAL mode, one connection per thread)"""
+
+    def __init__(self, path: str = SHARED_CACHE_PATH):
+        self.path = private_path(str(path))
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_locks (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_invalidations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                prefix TEXT NOT NULL
+            );
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str):
+        """Return (value bytes, remaining ttl) or (None, 0)"""
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None, 0
+        return row[0], row[1] - now
+
+    def set(self, key: str, value: bytes, ttl: float):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl)
+        )
+
+    def delete_prefix(self, prefix: str):
+        self._conn().execute(
+            "DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        )
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache_entries")
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        """Take the compute lock for a key unless another live owner holds it"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("DELETE FROM cache_locks WHERE key = ? AND expires_at <= ?", (key, now))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache_locks (key, owner, expires_at) VALUES (?, ?, ?)",
+            (key, owner, now + ttl)
+        )
+        return cursor.rowcount == 1
+
+    def release_lock(self, key: str, owner: str):
+        self._conn().execute("DELETE FROM cache_locks WHERE key = ? AND owner = ?", (key, owner))
+
+    def generation(self) -> int:
+        row = self._conn().execute("SELECT value FROM cache_meta WHERE name = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self) -> int:
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO cache_meta (name, value) VALUES ('generation', 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+        )
+        return self.generation()
+
+    def publish_invalidation(self, prefix: str) -> int:
+        """Log that keys starting with prefix were deleted, for the other workers' local copies"""
+        conn = self._conn()
+        seq = conn.execute("INSERT INTO cache_invalidations (prefix) VALUES (?)", (prefix,)).lastrowid
+        conn.execute("DELETE FROM cache_invalidations WHERE seq <= ?", (seq - SHARED_CACHE_INVALIDATION_LOG,))
+        return seq
+
+    def invalidations_since(self, seq: int = None):
+        """(latest seq, prefixes published after seq); prefixes is None when the log no longer reaches back to seq"""
+        conn = self._conn()
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cache_invalidations'").fetchone()
+        latest = row[0] if row else 0
+        if seq is None or seq >= latest:
+            return latest, []
+        rows = conn.execute("SELECT seq, prefix FROM cache_invalidations WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        return latest, _contiguous(rows, seq)
+
+
+def _contiguous(entries: list, seq: int):
+    """Prefixes of the (seq, prefix) entries after seq, or None if some were already trimmed from the log"""
+    if not entries or entries[0][0] != seq + 1:
+        return None
+    return [prefix for _, prefix in entries]
+
+
+class RedisSharedStore:
+    """
+    Shared store over any redis-py compatible client
+    (get, set with nx/px, pttl, delete, scan_iter, incr, rpush, ltrim, lrange)
+    """
+
+    def __init__(self, client, prefix: str = "linkedin-kpi:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str):
+        name = self.prefix + "entry:" + key
+        value = self.client.get(name)
+        if value is None:
+            return None, 0
+        ttl_ms = self.client.pttl(name)
+        return value, max(ttl_ms, 0) / 1000
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + "entry:" + key, value, px=max(int(ttl * 1000), 1))
+
+    def delete_prefix(self, prefix: str):
+        for name in self.client.scan_iter(match=self.prefix + "entry:" + prefix + "*"):
+            self.client.delete(name)
+
+    def clear(self):
+        self.delete_prefix("")
+
+    def acquire_lock(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(self.client.set(self.prefix + "lock:" + key, owner, nx=True, px=max(int(ttl * 1000), 1)))
+
+    def release_lock(self, key: str, owner: str):
+        name = self.prefix + "lock:" + key
+        current = self.client.get(name)
+        if current is not None and (current.decode() if isinstance(current, bytes) else current) == owner:
+            self.client.delete(name)
+
+    def generation(self) -> int:
+        return int(self.client.get(self.prefix + "generation") or 0)
+
+    def bump_generation(self) -> int:
+        return int(self.client.incr(self.prefix + "generation"))
+
+    def publish_invalidation(self, prefix: str) -> int:
+        seq = int(self.client.incr(self.prefix + "invalidation_seq"))
+        self.client.rpush(self.prefix + "invalidations", f"{seq}|{prefix}")
+        self.client.ltrim(self.prefix + "invalidations", -SHARED_CACHE_INVALIDATION_LOG, -1)
+        return seq
+
+    def invalidations_since(self, seq: int = None):
+        latest = int(self.client.get(self.prefix + "invalidation_seq") or 0)
+        if seq is None or seq >= latest:
+            return latest, []
+        entries = []
+        for item in self.client.lrange(self.prefix + "invalidations", 0, -1):
+            number, _, prefix = (item.decode() if isinstance(item, bytes) else item).partition("|")
+            if int(number) > seq:
+                entries.append((int(number), prefix))
+        # Publishers append after taking their seq, so the list can be briefly out of order
+        return latest, _contiguous(sorted(entries), seq)
+
+
+def create_shared_store(backend: str = SHARED_CACHE_BACKEND):
+    """Build the configured shared store, or None when sharing is disabled"""
+    if backend == "sqlite":
+        return SQLiteSharedStore(SHARED_CACHE_PATH)
+    if backend == "redis":
+        import redis  # Optional dependency, only needed for this backend
+        return RedisSharedStore(redis.Redis.from_url(REDIS_URL))
+    return None
+
+
+def encode_key(key) -> str:
+    """Stable string form of a cache key tuple ('dashboard', 11, 'private', 'daily' -> 'dashboard|11|private|daily')"""
+    return "|".join(str(part) for part in key)
+
+
+def _encode(value):
+    """JSON-ready form of a cached value; TypeError for anything without a safe encoding"""
+    if value is None or isinstance(value, (bool, str, int)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else {'__float__': str(value)}
+    if isinstance(value, np.generic):
+        return _encode(value.item())
+    if isinstance(value, pd.DataFrame):
+        sink = pa.BufferOutputStream()
+        table = pa.Table.from_pandas(value)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return {'__frame__': base64.b64encode(sink.getvalue().to_pybytes()).decode('ascii')}
+    if isinstance(value, pd.Timestamp):
+        return {'__timestamp__': value.isoformat()}
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) and not k.startswith('__') for k in value):
+            return {k: _encode(v) for k, v in value.items()}
+        return {'__dict__': [[_encode(k), _encode(v)] for k, v in value.items()]}
+    raise TypeError(f"Cannot store {type(value).__name__} in the shared cache")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if '__frame__' in value:
+        with pa.ipc.open_stream(base64.b64decode(value['__frame__'])) as reader:
+            return reader.read_all().to_pandas()
+    if '__timestamp__' in value:
+        return pd.Timestamp(value['__timestamp__'])
+    if '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    if '__date__' in value:
+        return date.fromisoformat(value['__date__'])
+    if '__float__' in value:
+        return float(value['__float__'])
+    if '__tuple__' in value:
+        return tuple(_decode(v) for v in value['__tuple__'])
+    if '__dict__' in value:
+        return {_decode(k): _decode(v) for k, v in value['__dict__']}
+    return {k: _decode(v) for k, v in value.items()}
+
+
+def dumps(value) -> bytes:
+    """Serialize a cached value (JSON, DataFrames as Arrow IPC); no pickle, so loading runs no code"""
+    return json.dumps(_encode(value), separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def loads(data: bytes):
+    return _decode(json.loads(data))
+
+
+def new_owner_id() -> str:
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
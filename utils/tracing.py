@@ -0,0 +1,198 @@
+"""
+Per-request tracing
+
+TracingMiddleware starts a Trace for every HTTP request and keeps it in a
+context variable, so code anywhere below the route handler can add to it:
+span() times a named stage, record_query() one database statement. The
+totals go out in the response's Server-Timing header (browser dev tools
+show it per request), into the per-worker route timings on the System
+Health page and into the Prometheus histograms (utils/metrics.py).
+
+Statements are recorded by fingerprint: the SQL with literals and
+placeholders replaced and whitespace collapsed, so the same query with
+other parameters (or another period filter value) counts as one.
+"""
+import hashlib
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from config import TRACING_ENABLED, SERVER_TIMING_HEADER
+from utils import metrics
+
+_current = ContextVar("trace", default=None)
+
+_route_stats = {}  # (method, route) -> timing counters
+_route_stats_lock = threading.Lock()
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=512)
+def fingerprint(sql: str) -> tuple:
+    """(id, normalized SQL) of a statement; the id is a short stable hash of the normalized text"""
+    normalized = _COMMENTS.sub(" ", sql)
+    normalized = _STRINGS.sub("?", normalized)
+    normalized = _PLACEHOLDERS.sub("?", normalized)
+    normalized = _NUMBERS.sub("?", normalized)
+    normalized = _LISTS.sub("(?+)", normalized)
+    normalized = " ".join(normalized.split())
+    return hashlib.blake2b(normalized.encode(), digest_size=6).hexdigest(), normalized
+
+
+class Trace:
+    """Stage and statement timings of one request"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.start = time.perf_counter()
+        self.spans = {}  # name -> [seconds, count]
+        self.queries = 0
+        self.query_seconds = 0.0
+        self._lock = threading.Lock()  # Queries run on the DB executor threads
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def add_span(self, name: str, seconds: float):
+        with self._lock:
+            entry = self.spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def add_query(self, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: total, all SQL statements, then each stage (ms)"""
+        parts = [f"total;dur={self.elapsed() * 1000:.1f}"]
+        with self._lock:
+            if self.queries:
+                plural = "s" if self.queries != 1 else ""
+                parts.append(f'sql;dur={self.query_seconds * 1000:.1f};desc="{self.queries} statement{plural}"')
+            for name, (seconds, count) in self.spans.items():
+                desc = f';desc="x{count}"' if count > 1 else ""
+                parts.append(f"{name};dur={seconds * 1000:.1f}{desc}")
+        return ", ".join(parts)
+
+
+def current_path():
+    """Path of the request being handled (None outside a request)"""
+    trace = _current.get()
+    return trace.path if trace is not None else None
+
+
+def record_span(name: str, seconds: float):
+    """Add an already measured stage to the current request's trace"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(name, seconds)
+        metrics.observe_span(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """Time the block as stage `name` of the current request (a no-op outside a request)"""
+    if _current.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def record_query(sql: str, seconds: float):
+    """Add one database statement to the current request's trace and /metrics (see db/traced.py)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_query(seconds)
+    metrics.observe_query(fingerprint(sql)[0], seconds)
+
+
+def route_template(scope) -> str:
+    """The path pattern of the route that handled the request, e.g. /linkedin/charts/{name}"""
+    route = scope.get("route")  # Set by newer Starlette versions
+    if route is None:
+        for candidate in getattr(scope.get("app"), "routes", ()):
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _record_request(method: str, route: str, status: int, trace: Trace):
+    seconds = trace.elapsed()
+    metrics.observe_request(route, method, status, seconds)
+    with _route_stats_lock:
+        stats = _route_stats.setdefault((method, route), {
+            'route': route, 'method': method, 'requests': 0, 'errors': 0,
+            'seconds': 0.0, 'max_seconds': 0.0, 'query_seconds': 0.0, 'queries': 0, 'spans': {}
+        })
+        stats['requests'] += 1
+        stats['errors'] += status >= 500
+        stats['seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+        stats['query_seconds'] += trace.query_seconds
+        stats['queries'] += trace.queries
+        for name, (span_seconds, _) in trace.spans.items():
+            stats['spans'][name] = stats['spans'].get(name, 0.0) + span_seconds
+
+
+def get_route_timing_stats() -> list:
+    """Per-route request counts, latency and the stage that took longest on average, in this worker"""
+    with _route_stats_lock:
+        rows = [dict(s, spans=dict(s['spans'])) for s in _route_stats.values()]
+    for row in rows:
+        requests = row['requests']
+        row['avg_ms'] = row['seconds'] / requests * 1000
+        row['max_ms'] = row['max_seconds'] * 1000
+        row['avg_sql_ms'] = row['query_seconds'] / requests * 1000
+        row['queries_per_request'] = row['queries'] / requests
+        if row['spans']:
+            name = max(row['spans'], key=row['spans'].get)
+            row['slowest_span'], row['slowest_span_ms'] = name, row['spans'][name] / requests * 1000
+        else:
+            row['slowest_span'], row['slowest_span_ms'] = None, 0.0
+    return sorted(rows, key=lambda r: r['seconds'], reverse=True)
+
+
+class TracingMiddleware:
+    """ASGI middleware: one Trace per HTTP request, reported as it completes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["path"])
+        token = _current.set(trace)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_HEADER:
+                    MutableHeaders(scope=message).append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _record_request(scope["method"], route_template(scope), status, trace)